@@ -0,0 +1,140 @@
+"""
+Análisis de tableros de Escaleras y Serpientes.
+
+Para un tablero compilado (ver board.CompiledBoard) calcula cuántos turnos
+dura una partida: de forma exacta con una cadena de Markov absorbente y de
+forma aproximada con un simulador vectorizado que juega millones de partidas.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+DICE_FACES = 6
+DEFAULT_MAX_TURNS = 1000  # Horizonte máximo para distribuciones y simulaciones
+
+
+def transition_table(board) -> np.ndarray:
+    """Vista NumPy de la tabla destino[c] del tablero compilado"""
+    return np.frombuffer(board.dest, dtype=np.uint8).astype(np.int16)
+
+
+def transition_matrix(dest: np.ndarray, max_cell: int) -> np.ndarray:
+    """Matriz de transición de un turno; la última casilla es absorbente"""
+    size = max_cell + 1
+    cells = np.arange(max_cell)[:, None]
+    faces = np.arange(1, DICE_FACES + 1)[None, :]
+    # Si la tirada se pasa de la meta, el jugador se queda en la meta
+    targets = dest[np.minimum(cells + faces, max_cell)]
+
+    matrix = np.zeros((size, size))
+    rows = np.repeat(np.arange(max_cell), DICE_FACES)
+    np.add.at(matrix, (rows, targets.ravel()), 1.0 / DICE_FACES)
+    matrix[max_cell, max_cell] = 1.0
+    return matrix
+
+
+def expected_turns(matrix: np.ndarray, max_cell: int) -> Dict[str, np.ndarray]:
+    """Media y varianza exactas de turnos hasta la meta desde cada casilla"""
+    transient = matrix[:max_cell, :max_cell]
+    fundamental = np.linalg.inv(np.eye(max_cell) - transient)
+    mean = fundamental.sum(axis=1)
+    variance = (2 * fundamental - np.eye(max_cell)) @ mean - mean ** 2
+    return {"mean": mean, "variance": np.maximum(variance, 0.0)}
+
+
+def expected_turns_from(board, start: int = 1) -> float:
+    """Evaluador rápido: solo la media exacta desde `start` (un único sistema lineal)"""
+    max_cell = board.max_cell
+    matrix = transition_matrix(transition_table(board), max_cell)
+    transient = matrix[:max_cell, :max_cell]
+    mean = np.linalg.solve(np.eye(max_cell) - transient, np.ones(max_cell))
+    return float(mean[start])
+
+
+def length_distribution(matrix: np.ndarray, max_cell: int, start: int,
+                        max_turns: int = DEFAULT_MAX_TURNS, tolerance: float = 1e-9) -> np.ndarray:
+    """Probabilidad de terminar exactamente en el turno k (índice k) para un jugador"""
+    state = np.zeros(max_cell + 1)
+    state[start] = 1.0
+    finished = [0.0]
+    for _ in range(max_turns):
+        state = state @ matrix
+        finished.append(state[max_cell])
+        if state[max_cell] >= 1.0 - tolerance:
+            break
+    return np.diff(np.asarray(finished), prepend=0.0)
+
+
+def rounds_distribution(pmf: np.ndarray, players: int) -> np.ndarray:
+    """Duración en rondas con varios jugadores: termina cuando llega el primero"""
+    survival = 1.0 - np.cumsum(pmf)
+    game_survival = np.clip(survival, 0.0, 1.0) ** players
+    return np.diff(1.0 - game_survival, prepend=0.0)
+
+
+def percentile(pmf: np.ndarray, q: float) -> int:
+    """Primer turno en el que la probabilidad acumulada alcanza q"""
+    index = int(np.searchsorted(np.cumsum(pmf), q - 1e-12))
+    return min(index, len(pmf) - 1)
+
+
+def simulate(dest: np.ndarray, max_cell: int, games: int, start: int = 1,
+             seed: Optional[int] = None, max_turns: int = DEFAULT_MAX_TURNS) -> np.ndarray:
+    """Juega `games` partidas de un jugador a la vez; devuelve los turnos de cada una"""
+    rng = np.random.default_rng(seed)
+    turns = np.full(games, max_turns, dtype=np.int32)
+    positions = np.full(games, start, dtype=np.int16)
+    active = np.arange(games)
+
+    for turn in range(1, max_turns + 1):
+        rolls = rng.integers(1, DICE_FACES + 1, size=active.size, dtype=np.int16)
+        positions = dest[np.minimum(positions + rolls, max_cell)]
+        done = positions == max_cell
+        if done.any():
+            turns[active[done]] = turn
+            keep = ~done
+            active = active[keep]
+            positions = positions[keep]
+            if active.size == 0:
+                break
+    return turns
+
+
+def analyze_board(board, start: int = 1, players: int = 2,
+                  simulations: int = 0, seed: Optional[int] = None) -> Dict:
+    """Resumen del tablero: duración exacta y, opcionalmente, simulada"""
+    max_cell = board.max_cell
+    dest = transition_table(board)
+    matrix = transition_matrix(dest, max_cell)
+    moments = expected_turns(matrix, max_cell)
+    pmf = length_distribution(matrix, max_cell, start)
+    rounds_pmf = rounds_distribution(pmf, players)
+    turns_axis = np.arange(len(pmf))
+
+    result = {
+        "max_cell": max_cell,
+        "start": start,
+        "ladders": sum(1 for c in range(max_cell + 1) if board.dest[c] > c),
+        "snakes": sum(1 for c in range(max_cell + 1) if board.dest[c] < c),
+        "exact": {
+            "expected_turns": round(float(moments["mean"][start]), 3),
+            "std_turns": round(float(np.sqrt(moments["variance"][start])), 3),
+            "min_turns": int(np.argmax(pmf > 0)),
+            "percentiles": {f"p{q}": percentile(pmf, q / 100) for q in (10, 25, 50, 75, 90, 99)},
+            "distribution": [round(float(p), 6) for p in pmf],
+            "players": players,
+            "expected_rounds": round(float((turns_axis * rounds_pmf).sum()), 3),
+            "median_rounds": percentile(rounds_pmf, 0.5)
+        }
+    }
+
+    if simulations > 0:
+        turns = simulate(dest, max_cell, simulations, start=start, seed=seed)
+        result["simulation"] = {
+            "games": simulations,
+            "seed": seed,
+            "mean_turns": round(float(turns.mean()), 3),
+            "std_turns": round(float(turns.std()), 3),
+            "percentiles": {f"p{q}": int(np.percentile(turns, q)) for q in (10, 25, 50, 75, 90, 99)}
+        }
+    return result
@@ -1,21 +1,85 @@
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Depends, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from pathlib import Path
 import uvicorn
-import random
+import asyncio
+import uuid
 import json
+import hashlib
+import hmac
 import threading
+import os
 import re
-from typing import List, Dict, Optional
+import sys
+import time
+import gzip
+import base64
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from pydantic import BaseModel, Field, validator
-from datetime import datetime
+from datetime import datetime, timezone
+from array import array
 from fastapi.middleware.cors import CORSMiddleware
 
+from analysis import analyze_board
+from board import (
+    generate_board, load_layout_file, compile_board, layout_from_pairs, validate_layout,
+    EFFECT_LADDER, EFFECT_SNAKE, EFFECT_KIND_MASK, EFFECT_INDEX_MASK
+)
+import simulation
+from stats import GlobalStats
+from metrics import MetricsRegistry, RequestMetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiling import Profiler
+from serialization import dumps, loads
+from game_record import GameRecord, MAX_PLAYERS
+from assets import AssetStore, load_or_build_atlas, IMMUTABLE_CACHE
+from storage import create_backend
+import replay
+from dice import DiceStream, MASK64
+
 # ============ CONFIGURACIÓN DE SEGURIDAD Y CONCURRENCIA ============
 log_lock = threading.Lock()
 MAX_LOG_SIZE_MB = 5  # ✅ Límite de tamaño para archivo de logs
+LOG_QUERY_MAX_LIMIT = 1000  # ✅ Máximo de entradas por página en /api/game/logs
+LOG_QUEUE_SIZE = 10_000     # ✅ Entradas en espera antes de aplicar contrapresión
+LOG_BATCH_SIZE = 500        # ✅ Entradas máximas por escritura
+LOG_ENQUEUE_TIMEOUT_S = 1.0 # ✅ Espera máxima con la cola llena antes de responder 503
+ANALYSIS_MAX_SIMULATIONS = 5_000_000  # ✅ Tope de partidas simuladas por análisis
+SIMULATION_MAX_GAMES = 10_000_000     # ✅ Tope de partidas por petición a /api/simulate
+# ✅ Dado físico enviado por el cliente ("steps"): desactivado salvo SERPIENTES_CLIENT_DICE=1
+CLIENT_DICE_ALLOWED = os.environ.get("SERPIENTES_CLIENT_DICE", "0") == "1"
+
+# ============ MÉTRICAS (expuestas en /metrics) ============
+metrics = MetricsRegistry()
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "Peticiones HTTP por método, ruta y estado", ("method", "route", "status"))
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route"))
+PERSIST_SECONDS = metrics.histogram(
+    "persistence_write_seconds", "Duración de escrituras de estado (snapshot o diario)", ("kind",))
+PERSIST_FLUSH_SECONDS = metrics.histogram(
+    "persistence_flush_seconds", "Duración de cada volcado del escritor de estado")
+LOG_WRITE_SECONDS = metrics.histogram(
+    "log_write_batch_seconds", "Duración de cada lote escrito en el archivo de logs")
+LOG_ENTRIES = metrics.counter(
+    "log_entries_total", "Entradas de log por resultado", ("result",))
+GAME_EVICTIONS = metrics.counter(
+    "game_evictions_total", "Salas desalojadas de memoria por motivo", ("reason",))
+GAME_RELOAD_SECONDS = metrics.histogram(
+    "game_reload_seconds", "Latencia de recarga de salas desalojadas")
+STATE_CONFLICTS = metrics.counter(
+    "state_commit_conflicts_total", "Escrituras rechazadas porque otro worker cambió la partida")
+
+# ============ PERFILADO OPCIONAL (apagado por defecto, /api/profiling) ============
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.1   # ✅ Fracción de llamadas medidas con el perfilado activo
+PROFILING_FILE = Path("profiling_samples.jsonl")
+# ✅ Cambiar el perfilado en caliente exige SERPIENTES_ADMIN_TOKEN (sin token, POST /api/profiling da 403)
+ADMIN_TOKEN = os.environ.get("SERPIENTES_ADMIN_TOKEN") or None
+profiler = Profiler(PROFILING_FILE, PROFILING_SAMPLE_RATE)
 
 # ============ MODELOS PYDANTIC CON VALIDACIONES AVANZADAS ============
 class PlayerStats(BaseModel):
@@ -46,6 +110,8 @@ class Player(BaseModel):
 
 class StartGameRequest(BaseModel):
     players: List[Player]
+    seed: Optional[int] = None  # Semilla opcional para reproducir el tablero
+    dice_seed: Optional[int] = None  # Semilla opcional para reproducir los dados del servidor
 
     @validator('players')
     def validate_players_count(cls, v):
@@ -55,6 +121,12 @@ class StartGameRequest(BaseModel):
             raise ValueError('Máximo 6 jugadores permitidos')
         return v
 
+    @validator('dice_seed')
+    def validate_dice_seed(cls, v):
+        if v is not None and not 0 <= v <= MASK64:
+            raise ValueError('La semilla de los dados debe ser un entero de 64 bits sin signo')
+        return v
+
 class GameState(BaseModel):
     players: List[Player]
     current_player_index: int = 0
@@ -65,14 +137,41 @@ class GameState(BaseModel):
     start_time: Optional[datetime] = None
 
 class MoveRequest(BaseModel):
-    steps: int
+    steps: Optional[int] = None  # Sin valor tira el servidor con el dado de la partida
 
     @validator('steps')
     def validate_steps(cls, v):
-        if v < 1 or v > 6:
+        if v is not None and (v < 1 or v > 6):
             raise ValueError('El dado debe ser entre 1 y 6')
         return v
 
+class ProfilingRequest(BaseModel):
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = Field(None, ge=0.0, le=1.0)
+    trace_memory: Optional[bool] = None   # tracemalloc: más detalle, más coste
+    reset: bool = False                   # Descartar las muestras acumuladas
+
+class SimulateRequest(BaseModel):
+    games: int = 10_000
+    players: int = 2
+    seed: Optional[int] = None
+    game_id: Optional[str] = None               # Usar el tablero de esta partida
+    ladders: Optional[Dict[int, int]] = None    # Tablero propio, formato snakes_ladders.json
+    snakes: Optional[Dict[int, int]] = None
+    stream: bool = False                        # Emitir resultados parciales (NDJSON)
+
+    @validator('games')
+    def validate_games(cls, v):
+        if v < 1 or v > SIMULATION_MAX_GAMES:
+            raise ValueError(f'El número de partidas debe estar entre 1 y {SIMULATION_MAX_GAMES}')
+        return v
+
+    @validator('players')
+    def validate_players(cls, v):
+        if v < 2 or v > 6:
+            raise ValueError('La simulación admite de 2 a 6 jugadores')
+        return v
+
 class GameLog(BaseModel):
     status: str
     coordinates: Dict
@@ -97,6 +196,13 @@ COLOR_TO_CLASS = {
 VIRTUES = ["Oración", "Ayuda", "Perdón", "Generosidad"]
 SINS = ["Soberbia", "Envidia", "Ira", "Codicia"]
 
+BOARD_TARGET_TURNS = (18.0, 28.0)  # ✅ Turnos esperados por jugador para un tablero equilibrado
+BOARD_CANDIDATES = 8               # ✅ Tableros candidatos evaluados por partida
+BOARD_POOL_CAPACITY = 64           # ✅ Tableros pre-generados listos para start_game
+BOARD_POOL_LOW_WATER = 16          # ✅ Por debajo de este tamaño se rellena el pool
+BOARD_POOL_BATCH = 8               # ✅ Tableros generados por tanda en el hilo de relleno
+BOARD_POOL_FILES: List[str] = []   # Tableros fijos opcionales, p.ej. ["snakes_ladders.json"]
+
 COLOR_TO_AVATAR = {
     "ROJO": "JugadorRojo.png",
     "VERDE": "JugadorVerde.png",
@@ -106,93 +212,1521 @@ COLOR_TO_AVATAR = {
     "AZUL": "JugadorAzul.png"
 }
 
+# Orden de las filas según el diseño del tablero (fila 6 arriba, fila 0 abajo)
+BOARD_ROWS_ORDER = [
+    [73, 74, 75, 76, 77, 78, 79, 80, 81, 82],  # Fila 6 (índice 6)
+    [72, 71, 70, 69, 68, 67, 66, 65, 64, 63, 62, 61],  # Fila 5 (índice 5)
+    [49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59, 60],  # Fila 4 (índice 4)
+    [48, 47, 46, 45, 44, 43, 42, 41, 40, 39, 38, 37],  # Fila 3 (índice 3)
+    [25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36],  # Fila 2 (índice 2)
+    [24, 23, 22, 21, 20, 19, 18, 17, 16, 15, 14, 13],  # Fila 1 (índice 1)
+    [ 1,  2,  3,  4,  5,  6,  7,  8,  9, 10, 11, 12]   # Fila 0 (índice 0) - ¡Esta tiene 12 celdas!
+]
+
+BOARD_LAYOUT = {
+    "fila_6": "73-82",
+    "fila_5": "61-72",  # ← Nota: 61-72 no coincide con lo que generamos, pero es solo info visual
+    "fila_4": "49-60",
+    "fila_3": "37-48",
+    "fila_2": "25-36",
+    "fila_1": "13-24",
+    "fila_0": "1-12"
+}
+
+def build_board_rows() -> List[Dict]:
+    """Filas del tablero con sus celdas; no dependen de la partida"""
+    board_rows = []
+    for idx, row_numbers in enumerate(BOARD_ROWS_ORDER):
+        direction = "right" if idx % 2 == 0 else "left"  # Índice par: izq→der; impar: der→izq
+        cells = []
+        for num in row_numbers:
+            cells.append({
+                "number": num,
+                "image": f"/mapaCuadritos/{num:02d}.png",  # ✅ Relativa al servidor; con hash al publicarla
+                "sprite": None  # [x, y, ancho, alto] dentro del atlas, si está activado y ya existe
+            })
+        board_rows.append({
+            "row_index": idx,
+            "direction": direction,
+            "cells": cells,
+            "range": f"{cells[0]['number']}-{cells[-1]['number']}"
+        })
+    return board_rows
+
+# ✅ Se construye una sola vez al importar el módulo
+BOARD_ROWS_DATA = build_board_rows()
+
+# ============ RECURSOS ESTÁTICOS (atlas del tablero e imágenes con hash) ============
+ASSET_CACHE_DIR = Path("asset_cache")
+BOARD_IMAGE_CACHE = "public, max-age=86400"   # Rutas sin hash: pueden cambiar
+# ✅ Por defecto cada casilla se sirve tal cual con URL con hash (inmutable, sin pérdida).
+# SERPIENTES_BOARD_ATLAS=1 añade un atlas con paleta (menos bytes, con pérdida), construido en
+# segundo plano o antes del despliegue con `python app.py build-assets`
+BOARD_ATLAS_ENABLED = os.environ.get("SERPIENTES_BOARD_ATLAS", "0") == "1"
+asset_store = AssetStore()
+BOARD_ATLAS: Optional[Dict] = None   # {"url", "width", "height"} una vez construido
+atlas_task: Optional[asyncio.Future] = None
+
+# ============ SALAS DE JUEGO (MULTI-PARTIDA) ============
+DEFAULT_GAME_ID = "default"
+GAME_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def color_code(color: str) -> int:
+    """Color -> byte de la repetición"""
+    return PLAYER_COLORS.index(color) if color in PLAYER_COLORS else replay.NO_COLOR
+
+def new_game_state() -> GameRecord:
+    """Estado inicial de una partida: dos jugadores por defecto"""
+    game_state = GameRecord()
+    game_state.add_player("ROJO", "ROJO")
+    game_state.add_player("VERDE", "VERDE")
+    return game_state
+
+class GameRoom:
+    """Una partida independiente con sus jugadores, tablero, turno y lock propios"""
+
+    def __init__(self, game_id: str, game_state: Optional[GameRecord] = None,
+                 ladders: Optional[Dict] = None, snakes: Optional[Dict] = None):
+        self.game_id = game_id
+        self.game_state = game_state or new_game_state()
+        self.set_board(ladders or {}, snakes or {})
+        # ✅ Lock por sala: las partidas no se bloquean entre sí
+        self.lock = asyncio.Lock()
+        # ✅ Dado propio de la partida (reproducible y guardado con el estado)
+        self.dice = DiceStream()
+        # Última petición recibida: decide qué salas inactivas se desalojan
+        self.last_access = time.monotonic()
+        # Diario de movimientos: cada partida nueva abre una época distinta
+        self.epoch = 0
+        self.pending_events: List[Dict] = []
+        self.snapshot_turn = 0
+        self.needs_snapshot = False
+        # ✅ Versión confirmada en el backend: concurrencia optimista entre workers
+        self.version = 0
+        # Época ya contabilizada en las estadísticas globales (una victoria por partida)
+        self.stats_epoch = -1
+        # ✅ Virtudes y pecados de la partida en curso (índice → veces), sumados en cada movimiento
+        self.ladder_hits: Dict[int, int] = {}
+        self.snake_hits: Dict[int, int] = {}
+        # Documento /api/board ya serializado: (etag, bytes)
+        self.board_cache: Optional[tuple] = None
+        # ✅ Respuestas de estado ya codificadas: un fragmento por jugador y documentos completos
+        self.player_fragments: List[Optional[bytes]] = []
+        self.response_cache: Dict[str, bytes] = {}
+        # ✅ Repetición en vivo (un byte por tirada) que leen los espectadores sin tomar el lock
+        self.replay = replay.ReplayFeed()
+        self.replay_players: List[tuple] = []
+        self.start_replay()
+
+    def set_board(self, ladders: Dict, snakes: Dict, seed: Optional[int] = None):
+        """Instala un tablero nuevo, lo compila e invalida el documento cacheado"""
+        self.ladders: Dict[int, Dict] = ladders
+        self.snakes: Dict[int, Dict] = snakes
+        self.board = compile_board(ladders, snakes, MAX_CELL, VIRTUES, SINS)
+        self.board_seed = seed
+        self.board_cache = None
+
+    def invalidate_state(self, player_index: Optional[int] = None):
+        """Descarta respuestas cacheadas; con índice solo se recodifica ese jugador"""
+        self.response_cache.clear()
+        if player_index is None:
+            self.player_fragments = []
+        elif player_index < len(self.player_fragments):
+            self.player_fragments[player_index] = None
+
+    def player_fragment(self, index: int) -> bytes:
+        """JSON de un jugador, reutilizado hasta que ese jugador cambie"""
+        count = self.game_state.count
+        if len(self.player_fragments) != count:
+            self.player_fragments = [None] * count
+        fragment = self.player_fragments[index]
+        if fragment is None:
+            fragment = self.player_fragments[index] = dumps(self.game_state.player_dict(index))
+        return fragment
+
+    def state_document(self) -> bytes:
+        """Cuerpo de /api/game/state, montado con los fragmentos de cada jugador"""
+        body = self.response_cache.get("state")
+        if body is None:
+            game_state = self.game_state
+            fragments = [self.player_fragment(i) for i in range(game_state.count)]
+            head = dumps({"game_id": self.game_id})[:-1]
+            tail = dumps({
+                "current_player_index": game_state.current_player_index,
+                "game_started": game_state.game_started,
+                "total_turns": game_state.total_turns,
+                "ladders_climbed": game_state.ladders_climbed,
+                "snakes_found": game_state.snakes_found,
+                "start_time": game_state.start_time,
+                "max_cell": MAX_CELL,
+                "client_dice": CLIENT_DICE_ALLOWED,
+                "version": self.version  # Los deltas de movimiento se aplican sobre esta versión
+            })[1:]
+            current = fragments[game_state.current_player_index] if fragments else b"null"
+            body = b"".join((head, b',"players":[', b",".join(fragments),
+                             b'],"current_player":', current, b",", tail))
+            self.response_cache["state"] = body
+        return body
+
+    def current_player_document(self) -> bytes:
+        """Cuerpo de /api/game/current_player (requiere al menos un jugador)"""
+        body = self.response_cache.get("current_player")
+        if body is None:
+            game_state = self.game_state
+            index = game_state.current_player_index
+            tail = dumps({
+                "index": index,
+                "is_your_turn": True,  # Útil para frontend
+                "message": f"🎯 Es el turno de {game_state.names[index]} ({game_state.colors[index]})"
+            })[1:]
+            body = b"".join((b'{"current_player":', self.player_fragment(index), b",", tail))
+            self.response_cache["current_player"] = body
+        return body
+
+    def board_document(self) -> tuple:
+        """Devuelve (etag, bytes, bytes gzip) del tablero, construyéndolo solo si cambió"""
+        if self.board_cache is None:
+            body = dumps({
+                "game_id": self.game_id,
+                "rows": BOARD_ROWS_DATA,
+                "atlas": BOARD_ATLAS,
+                "assets": asset_store.manifest,
+                "ladders": self.ladders,
+                "snakes": self.snakes,
+                "seed": self.board_seed,
+                "max_cell": MAX_CELL,
+                "board_cols": BOARD_COLS,
+                "board_rows": BOARD_ROWS,
+                "layout": BOARD_LAYOUT
+            })
+            etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+            # ✅ Se comprime una vez por tablero, no en cada petición
+            self.board_cache = (etag, body, gzip.compress(body, compresslevel=6, mtime=0))
+        return self.board_cache
+
+    def start_replay(self, moves: bytes = b"", players: Optional[List[tuple]] = None):
+        """Reinicia la repetición con el tablero actual y los jugadores iniciales (por defecto, los actuales)"""
+        game_state = self.game_state
+        if players is None:
+            players = [(color_code(color), game_state.positions[i]) for i, color in enumerate(game_state.colors)]
+        self.replay_players = [tuple(player) for player in players]
+        self.replay.reset(self.epoch, replay.encode_header(self.board, self.board_seed, self.replay_players), moves)
+
+    def add_replay_player(self, index: int):
+        """Jugador añadido a mitad de partida: queda registrado en la secuencia de la repetición"""
+        self.replay.add_player(index, color_code(self.game_state.colors[index]), self.game_state.positions[index])
+
+    def memory_estimate(self) -> int:
+        """Bytes aproximados de la sala (constantes medidas con tracemalloc + cachés)"""
+        size = ROOM_BASE_BYTES + PLAYER_BYTES * self.game_state.count
+        size += EVENT_BYTES * len(self.pending_events) + len(self.replay.header) + len(self.replay.moves)
+        size += sum(len(fragment) for fragment in self.player_fragments if fragment)
+        size += sum(len(body) for body in self.response_cache.values())
+        if self.board_cache is not None:
+            size += len(self.board_cache[1]) + len(self.board_cache[2])
+        return size
+
+    def reset(self):
+        """Devuelve la sala a su estado inicial"""
+        self.game_state = new_game_state()
+        self.set_board({}, {})
+        self.invalidate_state()
+        self.epoch += 1
+        self.dice = DiceStream()
+        self.clear_effect_hits()
+        self.start_replay()
+
+    def clear_effect_hits(self):
+        """Partida nueva: los contadores de virtudes y pecados empiezan de cero"""
+        self.ladder_hits = {}
+        self.snake_hits = {}
+
+    def count_effect(self, effect: Optional[str], index: int):
+        """Suma una escalera ("L") o serpiente ("S") al contador de su virtud/pecado"""
+        target = self.ladder_hits if effect == "L" else self.snake_hits
+        target[index] = target.get(index, 0) + 1
+
+# ============ LÍMITES DEL REGISTRO DE SALAS ============
+REGISTRY_MAX_GAMES = 10_000        # ✅ Salas en memoria antes de desalojar las menos usadas
+REGISTRY_MEMORY_BUDGET_MB = 256    # ✅ Memoria estimada máxima de todas las salas
+GAME_IDLE_TTL_S = 30 * 60          # ✅ Una sala sin peticiones durante este tiempo se desaloja
+EVICTION_INTERVAL_S = 30.0         # ✅ Cada cuánto se revisan los límites
+ROOM_BASE_BYTES = 4_900            # Sala con tablero compilado, sin jugadores (tracemalloc)
+PLAYER_BYTES = 140                 # Por jugador en el GameRecord (nombre; color y avatar internados)
+EVENT_BYTES = 350                  # Por movimiento pendiente de volcar
+
+class GameRegistry:
+    """Registro de salas indexado por ID de partida (en orden LRU: la menos usada primero)"""
+
+    def __init__(self):
+        self.rooms: Dict[str, GameRoom] = OrderedDict()
+
+    @staticmethod
+    def validate_id(game_id: str) -> str:
+        """Valida el ID de partida (también se usa como nombre de archivo)"""
+        if not GAME_ID_PATTERN.match(game_id or ""):
+            raise HTTPException(status_code=400, detail="ID de partida inválido")
+        return game_id
+
+    def get(self, game_id: str) -> GameRoom:
+        """Obtiene una sala existente o responde 404"""
+        room = self.rooms.get(self.validate_id(game_id))
+        if room is None:
+            raise HTTPException(status_code=404, detail=f"Partida {game_id} no encontrada")
+        return room
+
+    def get_or_create(self, game_id: str) -> GameRoom:
+        """Obtiene una sala o la crea vacía si no existe"""
+        room = self.rooms.get(self.validate_id(game_id))
+        if room is None:
+            room = GameRoom(game_id)
+            self.rooms[game_id] = room
+            evictor.notify_added()
+        return room
+
+    def add(self, room: GameRoom):
+        self.rooms[room.game_id] = room
+        evictor.notify_added()
+
+    def touch(self, room: GameRoom):
+        """Marca la sala como usada ahora (pasa al final del orden LRU)"""
+        room.last_access = time.monotonic()
+        if room.game_id in self.rooms:
+            self.rooms.move_to_end(room.game_id)
+
+    def remove(self, game_id: str) -> Optional[GameRoom]:
+        return self.rooms.pop(game_id, None)
+
+    def __len__(self):
+        return len(self.rooms)
+
 # ============ GESTIÓN DE ESTADO Y PERSISTENCIA ============
+STATE_DIR = Path("game_states")
+LEGACY_STATE_FILE = Path("game_state_backup.json")
+PERSIST_INTERVAL_S = 1.0   # ✅ Cada cuánto se vuelcan las salas modificadas
+PERSIST_BATCH_SIZE = 100   # ✅ Salas pendientes que fuerzan un volcado anticipado
+SNAPSHOT_EVERY_MOVES = 50  # ✅ Movimientos en el diario entre snapshots completos
+JOURNAL_ARCHIVE_DIR = STATE_DIR / "archive"
+GLOBAL_STATS_FILE = Path("global_stats.json")  # Fuera de STATE_DIR: allí cada .json es una sala
+# Backend del estado: "json" (un proceso), "sqlite" (varios workers) o "redis" (varios nodos)
+STATE_BACKEND = os.environ.get("SERPIENTES_STATE_BACKEND", "json")
+STATE_SQLITE_PATH = Path(os.environ.get("SERPIENTES_SQLITE_PATH", "game_states.sqlite3"))
+STATE_REDIS_URL = os.environ.get("SERPIENTES_REDIS_URL", "redis://localhost:6379/0")
+COMMIT_RETRIES = 3         # ✅ Reintentos de un movimiento si otro worker cambió la partida
+
+SYNC_POLL_INTERVAL_S = 1.0  # ✅ Backend compartido: cada cuánto se buscan cambios de otros workers
+
+state_backend = create_backend(STATE_BACKEND, STATE_DIR, JOURNAL_ARCHIVE_DIR, LEGACY_STATE_FILE,
+                               sqlite_path=STATE_SQLITE_PATH, redis_url=STATE_REDIS_URL,
+                               counters_path=GLOBAL_STATS_FILE)
+
 class GameStateManager:
-    """Manager para persistencia del estado del juego"""
-    
+    """Manager para persistencia del estado de cada sala (delegada en `state_backend`)"""
+
     @staticmethod
-    def save_state():
-        """Guarda el estado actual del juego en JSON"""
+    def move_event(room: GameRoom, player_index: int, steps: int, effect: Optional[str],
+                   effect_index: int = 0) -> Dict:
+        """Evento compacto de un movimiento para el diario"""
+        event = {
+            "g": room.epoch,
+            "n": room.game_state.total_turns,
+            "p": player_index,
+            "s": steps,
+            "to": room.game_state.positions[player_index],
+            "fx": effect  # "L" escalera, "S" serpiente, None sin efecto
+        }
+        if effect:
+            event["i"] = effect_index  # Virtud o pecado de ese efecto
+        return event
+
+    @staticmethod
+    def apply_event(room: GameRoom, event: Dict):
+        """Reaplica un evento del diario sobre el estado de la sala"""
+        game_state = room.game_state
+        index = event["p"]
+        game_state.positions[index] = event["to"]
+        if event["fx"] == "L":
+            game_state.ladders[index] += 1
+            game_state.ladders_climbed += 1
+        elif event["fx"] == "S":
+            game_state.snakes[index] += 1
+            game_state.snakes_found += 1
+        if event["fx"] and "i" in event:
+            room.count_effect(event["fx"], event["i"])
+        game_state.total_turns = event["n"]
+        game_state.current_player_index = (index + 1) % game_state.count
+        if event["to"] == MAX_CELL:
+            room.stats_epoch = room.epoch  # Esa victoria ya se contó al confirmarse
+
+    @staticmethod
+    @profiler.profile("persistence.append_journal")
+    def append_journal(game_id: str, events: List[Dict]):
+        """Añade eventos al diario (append-only); una época nueva archiva el anterior"""
+        if not events:
+            return
         try:
-            state_data = {
-                "game_state": game_state.dict(),
-                "ladders": ladders,
-                "snakes": snakes,
-                "last_saved": datetime.utcnow().isoformat()
-            }
-            
-            with open("game_state_backup.json", "w", encoding="utf-8") as f:
-                json.dump(state_data, f, ensure_ascii=False, indent=2, default=str)
-            
-            print("💾 Estado del juego guardado")
+            with PERSIST_SECONDS.time("journal"):
+                state_backend.append_events(game_id, events)
         except Exception as e:
-            print(f"⚠️ Error guardando estado: {e}")
+            print(f"⚠️ Error escribiendo diario de {game_id}: {e}")
 
     @staticmethod
-    def load_state():
-        """Carga el estado del juego desde JSON si existe"""
-        global game_state, ladders, snakes
-        
+    def read_journal(game_id: str, epoch: int) -> List[Dict]:
+        """Lee los eventos de una época del diario de una sala"""
+        return state_backend.read_events(game_id, epoch)
+
+    @staticmethod
+    def snapshot(room: GameRoom) -> Dict:
+        """Copia serializable del estado de una sala (tomarla dentro del event loop)"""
+        return {
+            "game_id": room.game_id,
+            "epoch": room.epoch,
+            "version": room.version,
+            "game_state": room.game_state.to_dict(),
+            "ladders": dict(room.ladders),
+            "snakes": dict(room.snakes),
+            "board_seed": room.board_seed,
+            "stats_epoch": room.stats_epoch,
+            "effect_hits": {"ladders": room.ladder_hits, "snakes": room.snake_hits},
+            "dice": room.dice.to_dict(),
+            # Jugadores iniciales y secuencia completa: la repetición sobrevive a recargas y desalojos
+            "replay": {
+                "players": [list(player) for player in room.replay_players],
+                "moves": base64.b64encode(room.replay.moves).decode("ascii")
+            },
+            "last_saved": datetime.utcnow().isoformat()
+        }
+
+    @staticmethod
+    @profiler.profile("persistence.write_snapshot")
+    def write_snapshot(game_id: str, state_data: Dict) -> bool:
+        """Escribe un snapshot completo (atómico en todos los backends)"""
         try:
-            with open("game_state_backup.json", "r", encoding="utf-8") as f:
-                state_data = json.load(f)
-            
-            game_state = GameState(**state_data["game_state"])
-            ladders = state_data["ladders"]
-            snakes = state_data["snakes"]
-            
-            print("🔄 Estado del juego cargado desde backup")
+            with PERSIST_SECONDS.time("snapshot"):
+                state_backend.write_snapshot(game_id, state_data)
             return True
-        except FileNotFoundError:
-            print("📝 No se encontró backup previo, iniciando juego nuevo")
+        except Exception as e:
+            print(f"⚠️ Error guardando estado de {game_id}: {e}")
             return False
+
+    @staticmethod
+    @profiler.profile("GameStateManager.save_state")
+    def save_state(room: GameRoom) -> bool:
+        """Guarda el estado actual de una sala de forma síncrona"""
+        return GameStateManager.write_snapshot(room.game_id, GameStateManager.snapshot(room))
+
+    @staticmethod
+    @profiler.profile("persistence.commit")
+    def commit(game_id: str, expected_version: int, state_data: Dict, events: List[Dict]) -> bool:
+        """Snapshot + eventos solo si nadie cambió la partida desde `expected_version`"""
+        with PERSIST_SECONDS.time("commit"):
+            return state_backend.compare_and_set(game_id, expected_version, state_data, events)
+
+    @staticmethod
+    def restore(room: GameRoom, state_data: Dict, events: List[Dict]) -> int:
+        """Sustituye el estado de la sala por el snapshot más el diario posterior"""
+        # JSON convierte las claves a texto: se restauran como enteros
+        ladders = {int(k): v for k, v in state_data["ladders"].items()}
+        snakes = {int(k): v for k, v in state_data["snakes"].items()}
+        # Pydantic solo valida lo leído; en memoria se guarda el registro compacto
+        room.game_state = GameRecord.from_model(GameState(**state_data["game_state"]))
+        if ladders != room.ladders or snakes != room.snakes:
+            room.set_board(ladders, snakes)
+        room.board_seed = state_data.get("board_seed")
+        room.epoch = state_data.get("epoch", 0)
+        room.version = state_data.get("version", 0)
+        # Snapshots anteriores: una partida ya ganada se da por contada
+        won = MAX_CELL in room.game_state.positions
+        room.stats_epoch = state_data.get("stats_epoch", room.epoch if won else -1)
+        saved_hits = state_data.get("effect_hits")
+        if saved_hits is not None:
+            room.ladder_hits = {int(k): v for k, v in saved_hits["ladders"].items()}
+            room.snake_hits = {int(k): v for k, v in saved_hits["snakes"].items()}
+        else:
+            room.clear_effect_hits()
+        room.snapshot_turn = room.game_state.total_turns
+        room.pending_events = []
+        room.needs_snapshot = False
+        room.invalidate_state()
+
+        replayed = 0
+        for event in events:
+            if event["n"] > room.game_state.total_turns:
+                GameStateManager.apply_event(room, event)
+                replayed += 1
+        if replayed:
+            room.needs_snapshot = True
+        # Cada movimiento consume una tirada: el dado se adelanta lo reaplicado
+        room.dice = DiceStream.from_dict(state_data.get("dice"))
+        room.dice.skip(replayed)
+        saved_replay = state_data.get("replay")
+        if saved_replay is not None:
+            # Secuencia guardada con el snapshot + las tiradas del diario posteriores
+            moves = base64.b64decode(saved_replay["moves"])
+            players = saved_replay["players"]
+            since = state_data["game_state"]["total_turns"]
+        else:
+            # Snapshots anteriores: solo el diario, con todos los jugadores en la casilla 1
+            moves, since = b"", 0
+            players = [(color_code(color), 1) for color in room.game_state.colors]
+        moves += bytes(replay.encode_move(event["p"], event["s"])
+                       for event in sorted(events, key=lambda e: e["n"]) if event["n"] > since)
+        room.start_replay(moves, players)
+        if saved_hits is None or any(event["fx"] and "i" not in event for event in events):
+            # Snapshots o diarios anteriores sin índice de efecto: se recuentan una vez desde la repetición
+            room.ladder_hits, room.snake_hits = replayed_effect_hits(room)
+        return replayed
+
+    @staticmethod
+    def room_from_data(game_id: str, state_data: Dict, events: List[Dict]) -> GameRoom:
+        """Reconstruye una sala desde el snapshot más el diario posterior"""
+        room = GameRoom(game_id)
+        replayed = GameStateManager.restore(room, state_data, events)
+        if replayed:
+            print(f"🔁 {game_id}: {replayed} movimiento(s) reaplicados desde el diario")
+        return room
+
+    @staticmethod
+    def load_room(game_id: str) -> Optional[GameRoom]:
+        """Carga una sala guardada por cualquier worker (None si no existe)"""
+        loaded = state_backend.load(game_id)
+        return GameStateManager.room_from_data(game_id, *loaded) if loaded else None
+
+    @staticmethod
+    def load_state(registry: "GameRegistry", limit: Optional[int] = None) -> int:
+        """Carga las salas guardadas en el registro (las que pasen de `limit` se cargan al pedirlas)"""
+        loaded = 0
+        try:
+            for game_id, state_data, events in state_backend.load_all():
+                if limit is not None and loaded >= limit:
+                    break
+                if not GAME_ID_PATTERN.match(game_id):
+                    continue
+                try:
+                    registry.add(GameStateManager.room_from_data(game_id, state_data, events))
+                    loaded += 1
+                except Exception as e:
+                    print(f"⚠️ Error cargando estado de {game_id}: {e}")
+        except Exception as e:
+            print(f"⚠️ Error leyendo el backend de estado ({state_backend.name}): {e}")
+
+        if loaded:
+            print(f"🔄 {loaded} partida(s) cargada(s) desde backup ({state_backend.name})")
+        else:
+            print("📝 No se encontró backup previo, iniciando juego nuevo")
+        return loaded
+
+    @staticmethod
+    def delete_state(game_id: str):
+        """Elimina el backup de una sala (el diario se conserva archivado)"""
+        try:
+            state_backend.delete(game_id)
+        except Exception as e:
+            print(f"⚠️ Error eliminando estado de {game_id}: {e}")
+
+class PersistenceWriter:
+    """Escritor en segundo plano: agrupa las salas modificadas y las vuelca por lotes"""
+
+    def __init__(self, interval: float = PERSIST_INTERVAL_S, batch_size: int = PERSIST_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.dirty: Dict[str, GameRoom] = {}
+        self.deleted: set = set()
+        self.flushes = 0
+        self.rooms_written = 0
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _enqueue(self, room: GameRoom):
+        if state_backend.shared:
+            return  # Con backend compartido cada cambio se confirma en `commit`
+        self.deleted.discard(room.game_id)
+        self.dirty[room.game_id] = room
+        if len(self.dirty) >= self.batch_size:
+            self._wake.set()
+
+    def mark_dirty(self, room: GameRoom):
+        """Marca una sala para un snapshot completo en el próximo volcado"""
+        room.needs_snapshot = True
+        self._enqueue(room)
+
+    def record_move(self, room: GameRoom, event: Dict):
+        """Registra un movimiento: solo se añade al diario, sin reescribir el estado"""
+        room.pending_events.append(event)
+        if room.game_state.total_turns - room.snapshot_turn >= SNAPSHOT_EVERY_MOVES:
+            room.needs_snapshot = True
+        self._enqueue(room)
+
+    def mark_deleted(self, room: GameRoom):
+        """Programa el borrado del backup conservando los movimientos pendientes"""
+        self._enqueue(room)
+        if not state_backend.shared:
+            self.deleted.add(room.game_id)
+
+    async def commit(self, room: GameRoom) -> bool:
+        """Confirma los cambios de la sala (llamar con room.lock tomado)
+
+        Con archivos locales el volcado sigue siendo por lotes y siempre se acepta.
+        Con un backend compartido se escriben ya, con compare-and-set sobre la
+        versión: False si otro worker modificó la partida antes.
+        """
+        expected = room.version
+        room.version += 1
+        room.response_cache.pop("state", None)  # El documento de estado lleva la versión
+        if not state_backend.shared:
+            return True
+        events, room.pending_events = room.pending_events, []
+        state_data = GameStateManager.snapshot(room)
+        if await asyncio.to_thread(GameStateManager.commit, room.game_id, expected, state_data, events):
+            room.needs_snapshot = False
+            room.snapshot_turn = room.game_state.total_turns
+            self.rooms_written += 1
+            return True
+        STATE_CONFLICTS.inc()
+        return False
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.dirty) + len(self.deleted)
+
+    @property
+    def flushing(self) -> bool:
+        """Hay un volcado en curso (sus salas aún no están en disco)"""
+        return self._flush_lock.locked()
+
+    def is_saved(self, room: GameRoom) -> bool:
+        """La sala no tiene nada pendiente de escribir"""
+        return room.game_id not in self.dirty and not room.pending_events and not self.flushing
+
+    async def flush(self):
+        """Vuelca todas las salas pendientes sin bloquear el event loop"""
+        async with self._flush_lock:
+            if global_stats.dirty:
+                # ✅ Incrementos atómicos en el backend: varios workers suman, no se pisan
+                deltas = global_stats.take_pending()
+                global_stats.finish_pending(await asyncio.to_thread(self._write_counters, deltas))
+            if not self.dirty and not self.deleted:
+                return
+            dirty, self.dirty = self.dirty, {}
+            deleted, self.deleted = self.deleted, set()
+
+            # Eventos y snapshots se toman aquí para que sean consistentes; el disco va en un hilo
+            batch = []
+            for game_id, room in dirty.items():
+                events, room.pending_events = room.pending_events, []
+                state_data = None
+                if room.needs_snapshot and game_id not in deleted:
+                    state_data = GameStateManager.snapshot(room)
+                    room.needs_snapshot = False
+                    room.snapshot_turn = room.game_state.total_turns
+                batch.append((game_id, events, state_data))
+            with PERSIST_FLUSH_SECONDS.time():
+                await asyncio.to_thread(self._write_batch, batch, deleted)
+            self.flushes += 1
+            self.rooms_written += len(batch)
+
+    @staticmethod
+    def _write_counters(deltas: Dict[str, float]) -> bool:
+        try:
+            state_backend.increment_counters(deltas)
+            return True
         except Exception as e:
-            print(f"⚠️ Error cargando estado: {e}")
+            print(f"⚠️ Error guardando estadísticas globales: {e}")
             return False
 
+    @staticmethod
+    def _write_batch(batch, deleted):
+        for game_id, events, state_data in batch:
+            GameStateManager.append_journal(game_id, events)
+            if game_id in deleted:
+                GameStateManager.delete_state(game_id)
+            elif state_data is not None:
+                GameStateManager.write_snapshot(game_id, state_data)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Error en volcado de estado: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene el escritor garantizando un último volcado"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        print(f"💾 Estado guardado: {self.rooms_written} escrituras en {self.flushes} volcados")
+
+# ============ POOL DE TABLEROS PRE-GENERADOS ============
+def build_board(seed: Optional[int] = None) -> Dict:
+    """Genera un tablero equilibrado con la configuración del juego"""
+    return generate_board(
+        MAX_CELL, VIRTUES, SINS,
+        seed=seed,
+        target_turns=BOARD_TARGET_TURNS,
+        candidates=BOARD_CANDIDATES
+    )
+
+class BoardPool:
+    """Tableros validados listos para usar; una tarea en segundo plano lo mantiene lleno"""
+
+    def __init__(self, capacity: int = BOARD_POOL_CAPACITY, low_water: int = BOARD_POOL_LOW_WATER,
+                 batch: int = BOARD_POOL_BATCH):
+        self.capacity = capacity
+        self.low_water = low_water
+        self.batch = batch
+        self.boards: deque = deque()
+        self.served = 0
+        self.misses = 0
+        self.generated = 0
+        self.loaded = 0
+        self.refill_seconds = 0.0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def load_files(self, paths: List[str]):
+        """Añade tableros fijos desde archivos con el formato de snakes_ladders.json"""
+        for path in paths:
+            try:
+                self.boards.append(load_layout_file(path, MAX_CELL, VIRTUES, SINS))
+                self.loaded += 1
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Tablero {path} descartado: {e}")
+
+    def take(self) -> Optional[Dict]:
+        """Saca un tablero listo en O(1); None si el pool está vacío"""
+        if len(self.boards) <= self.low_water:
+            self._wake.set()
+        if not self.boards:
+            self.misses += 1
+            return None
+        self.served += 1
+        return self.boards.popleft()
+
+    def _generate_batch(self, count: int) -> List[Dict]:
+        return [build_board() for _ in range(count)]
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while len(self.boards) < self.capacity:
+                count = min(self.batch, self.capacity - len(self.boards))
+                started = time.perf_counter()
+                # La generación es CPU: se hace fuera del event loop
+                boards = await asyncio.to_thread(self._generate_batch, count)
+                self.refill_seconds += time.perf_counter() - started
+                self.boards.extend(boards)
+                self.generated += len(boards)
+
+    def start(self):
+        if self._task is None:
+            self._wake.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> Dict:
+        return {
+            "size": len(self.boards),
+            "capacity": self.capacity,
+            "low_water": self.low_water,
+            "served": self.served,
+            "misses": self.misses,
+            "generated": self.generated,
+            "loaded_from_files": self.loaded,
+            "refill_seconds": round(self.refill_seconds, 4),
+            "refill_rate_boards_per_s": round(self.generated / self.refill_seconds, 1) if self.refill_seconds else None
+        }
+
+# ============ EVENTOS EN TIEMPO REAL (SSE) ============
+SSE_QUEUE_SIZE = 100     # ✅ Eventos pendientes por cliente antes de desconectarlo
+SSE_KEEPALIVE_S = 15     # ✅ Comentario periódico para mantener viva la conexión
+
+class EventBroadcaster:
+    """Difunde deltas de cada sala a los clientes conectados por Server-Sent Events"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, set] = {}
+
+    def subscribe(self, game_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        self.subscribers.setdefault(game_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, game_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(game_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[game_id]
+
+    @property
+    def client_count(self) -> int:
+        return sum(len(queues) for queues in self.subscribers.values())
+
+    @staticmethod
+    def encode(event_type: str, data: Dict) -> bytes:
+        return b"".join((f"event: {event_type}\ndata: ".encode("utf-8"), dumps(data), b"\n\n"))
+
+    def publish(self, game_id: str, event_type: str, data: Dict):
+        """Codifica el delta una sola vez y lo reparte a todos los clientes de la sala"""
+        queues = self.subscribers.get(game_id)
+        if not queues:
+            return
+        message = self.encode(event_type, data)
+        for queue in list(queues):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Cliente demasiado lento: se vacía su cola y se cierra su stream
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.unsubscribe(game_id, queue)
+
+    async def stream(self, game_id: str, queue: asyncio.Queue):
+        """Generador SSE para un cliente suscrito"""
+        try:
+            yield self.encode("connected", {"game_id": game_id})
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(game_id, queue)
+
 # ============ GESTIÓN DE LOGS AVANZADA ============
+LOG_FILE = Path("game_logs.json")
+LOG_ARCHIVE_DIR = Path("log_archive")
+LOG_BACKUP_PATTERN = "game_logs_backup_*.json"
+
+def log_timestamp(value) -> float:
+    """Marca de tiempo UTC comparable (los logs guardan ISO sin zona horaria)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+class LogStore:
+    """Índice ligero del archivo de logs: lectura por offset, paginación y filtros"""
+
+    def __init__(self, path: Path = LOG_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.generation = -1
+        self.reset()
+
+    def reset(self):
+        """Vacía el índice (tras rotar el archivo); invalida los cursores anteriores"""
+        with self._lock:
+            self.generation += 1
+            # Arrays compactos: ~26 bytes por entrada en lugar de un dict por línea
+            self.offsets = array("Q")
+            self.timestamps = array("d")
+            self.status_ids = array("H")
+            self.winner_ids = array("H")
+            self.statuses: List[str] = []
+            self.winners: List[Optional[str]] = [None]
+            self._status_lookup: Dict[str, int] = {}
+            self._winner_lookup: Dict[Optional[str], int] = {None: 0}
+            self.indexed_size = 0
+
+    def _intern(self, value, table: List, lookup: Dict) -> int:
+        index = lookup.get(value)
+        if index is None:
+            index = len(table)
+            table.append(value)
+            lookup[value] = index
+        return index
+
+    def _add(self, offset: int, length: int, entry: Dict):
+        """Indexa una línea completa (llamar con el lock tomado)"""
+        if offset != self.indexed_size:
+            return  # Ya indexada o hay un hueco que cubrirá refresh()
+        try:
+            timestamp = log_timestamp(entry.get("timestamp"))
+        except (TypeError, ValueError):
+            timestamp = 0.0
+        self.offsets.append(offset)
+        self.timestamps.append(timestamp)
+        self.status_ids.append(self._intern(entry.get("status"), self.statuses, self._status_lookup))
+        self.winner_ids.append(self._intern(entry.get("winner"), self.winners, self._winner_lookup))
+        self.indexed_size = offset + length
+
+    def note_append(self, offset: int, length: int, entry: Dict):
+        """El escritor avisa de una línea recién añadida: se indexa sin releer el archivo"""
+        with self._lock:
+            self._add(offset, length, entry)
+
+    @staticmethod
+    def parse_line(line: bytes) -> Optional[Dict]:
+        try:
+            # Remover la coma final si existe
+            return loads(line.rstrip().rstrip(b","))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+
+    def refresh(self):
+        """Indexa lo que haya en el archivo después de lo ya indexado (sin bloquear escritores)"""
+        with self._lock:
+            start, generation = self.indexed_size, self.generation
+        parsed = []
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                offset = start
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Línea a medio escribir
+                    parsed.append((offset, len(line), self.parse_line(line) or {}))
+                    offset += len(line)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return  # El archivo rotó mientras se leía
+            for offset, length, entry in parsed:
+                self._add(offset, length, entry)
+
+    def _query_current(self, limit: int, cursor: Optional[str], status: Optional[str],
+                       winner: Optional[str], low: Optional[float], high: Optional[float]) -> tuple:
+        """Página del archivo actual (más recientes primero) y el cursor para seguir en él"""
+        for _ in range(3):
+            self.refresh()
+            with self._lock:
+                generation = self.generation
+                count = len(self.offsets)
+                offsets, timestamps = self.offsets, self.timestamps
+                status_ids, winner_ids = self.status_ids, self.winner_ids
+                status_id = self._status_lookup.get(status, -1) if status is not None else None
+                winner_id = self._winner_lookup.get(winner, -1) if winner is not None else None
+                # ✅ El archivo se abre junto con el índice: si luego rota, se sigue leyendo el mismo inodo
+                try:
+                    handle = open(self.path, "rb") if count else None
+                except FileNotFoundError:
+                    handle = None  # Renombrado pero aún sin reset(): el índice es del archivo rotado
+            if handle is not None or count == 0:
+                break
+            time.sleep(0.01)
+        else:
+            count = 0
+
+        try:
+            end = count
+            if cursor:
+                cursor_generation, _, position = cursor.partition(":")
+                if not position.isdigit() or cursor_generation != str(generation):
+                    raise ValueError("Cursor inválido o caducado (el log ha rotado)")
+                end = min(int(position), count)
+
+            selected = []
+            i = end - 1
+            while i >= 0 and len(selected) < limit:
+                if ((status_id is None or status_ids[i] == status_id) and
+                        (winner_id is None or winner_ids[i] == winner_id) and
+                        (low is None or timestamps[i] >= low) and
+                        (high is None or timestamps[i] <= high)):
+                    selected.append(i)
+                i -= 1
+
+            logs = self._read_entries(handle, offsets, selected) if selected else []
+        finally:
+            if handle is not None:
+                handle.close()
+
+        return logs, (f"{generation}:{i + 1}" if i >= 0 else None), count
+
+    def _read_entries(self, handle, offsets: array, selected: List[int]) -> List[Dict]:
+        """Lee las líneas indicadas desde el archivo abierto con el índice"""
+        logs = []
+        for position in selected:
+            handle.seek(offsets[position])
+            entry = self.parse_line(handle.readline())
+            if entry is not None:
+                logs.append(entry)
+        return logs
+
+    @profiler.profile("logs.query")
+    def query(self, limit: int = 10, cursor: Optional[str] = None, status: Optional[str] = None,
+              winner: Optional[str] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None) -> Dict:
+        """Entradas más recientes que cumplen los filtros: archivo actual y luego el archivo histórico"""
+        low = log_timestamp(since) if since else None
+        high = log_timestamp(until) if until else None
+
+        logs, next_cursor, count = [], None, None
+        archive_cursor = cursor if cursor and cursor.startswith("a:") else None
+        if archive_cursor is None:
+            logs, next_cursor, count = self._query_current(limit, cursor, status, winner, low, high)
+            if next_cursor is None:
+                archive_cursor = "a::"  # El archivo actual se agotó: seguir por los segmentos
+
+        if next_cursor is None and len(logs) < limit:
+            older, next_cursor = log_archive.query(limit - len(logs), archive_cursor, status, winner, low, high)
+            logs.extend(older)
+        elif next_cursor is None and log_archive.segments:
+            next_cursor = archive_cursor
+
+        logs.reverse()  # Orden cronológico dentro de la página
+        return {
+            "logs": logs,
+            "total": len(logs),
+            "next_cursor": next_cursor,
+            "indexed_entries": count
+        }
+
+log_store = LogStore()
+
+class LogArchive:
+    """Segmentos de log rotados, comprimidos con gzip y con un índice pequeño por segmento"""
+
+    def __init__(self, directory: Path = LOG_ARCHIVE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.segments: List[Dict] = []  # Más recientes primero
+        # Un solo hilo comprime en segundo plano para no frenar al escritor de logs
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-archive")
+
+    def load(self):
+        """Carga los índices de segmentos existentes y comprime backups pendientes"""
+        segments = []
+        for idx_path in self.directory.glob("*.idx.json"):
+            try:
+                with open(idx_path, "r", encoding="utf-8") as f:
+                    segments.append(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Índice de log ilegible {idx_path}: {e}")
+        with self._lock:
+            self.segments = sorted(segments, key=lambda meta: meta["segment"], reverse=True)
+        for raw_path in sorted(Path(".").glob(LOG_BACKUP_PATTERN)):
+            self.schedule(raw_path)
+
+    def schedule(self, raw_path: Path):
+        """Programa la compresión de un log rotado"""
+        self._executor.submit(self.archive_segment, Path(raw_path))
+
+    @profiler.profile("logs.archive_segment")
+    def archive_segment(self, raw_path: Path):
+        """Comprime un log rotado y escribe su índice (tiempo, cantidad, estados, ganadores)"""
+        stamp = raw_path.stem.replace("game_logs_backup_", "")
+        gz_path = self.directory / f"game_logs_{stamp}.json.gz"
+        idx_path = self.directory / f"game_logs_{stamp}.idx.json"
+        meta = {
+            "segment": gz_path.name,
+            "count": 0,
+            "min_ts": None,
+            "max_ts": None,
+            "statuses": {},
+            "winners": {},
+            "raw_bytes": 0,
+            "compressed_bytes": 0
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = gz_path.with_suffix(".tmp")
+            with open(raw_path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+                for line in src:
+                    dst.write(line)
+                    meta["raw_bytes"] += len(line)
+                    entry = LogStore.parse_line(line)
+                    if entry is None:
+                        continue
+                    meta["count"] += 1
+                    try:
+                        ts = log_timestamp(entry.get("timestamp"))
+                        meta["min_ts"] = ts if meta["min_ts"] is None else min(meta["min_ts"], ts)
+                        meta["max_ts"] = ts if meta["max_ts"] is None else max(meta["max_ts"], ts)
+                    except (TypeError, ValueError):
+                        pass
+                    status = str(entry.get("status"))
+                    meta["statuses"][status] = meta["statuses"].get(status, 0) + 1
+                    if entry.get("winner") is not None:
+                        winner = str(entry["winner"])
+                        meta["winners"][winner] = meta["winners"].get(winner, 0) + 1
+            os.replace(tmp_path, gz_path)
+            meta["compressed_bytes"] = gz_path.stat().st_size
+
+            with open(idx_path.with_suffix(".tmp"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(idx_path.with_suffix(".tmp"), idx_path)
+            raw_path.unlink()
+
+            with self._lock:
+                self.segments.append(meta)
+                self.segments.sort(key=lambda m: m["segment"], reverse=True)
+            print(f"🗜️ Log archivado: {gz_path.name} ({meta['raw_bytes']} → {meta['compressed_bytes']} bytes)")
+        except Exception as e:
+            print(f"⚠️ Error archivando {raw_path}: {e}")
+
+    @staticmethod
+    def _may_match(meta: Dict, status, winner, low, high) -> bool:
+        """Descarta segmentos completos usando solo su índice"""
+        if status is not None and status not in meta["statuses"]:
+            return False
+        if winner is not None and winner not in meta["winners"]:
+            return False
+        if low is not None and (meta["max_ts"] is None or meta["max_ts"] < low):
+            return False
+        if high is not None and (meta["min_ts"] is None or meta["min_ts"] > high):
+            return False
+        return True
+
+    def _scan(self, meta: Dict, bound: Optional[int], needed: int, status, winner, low, high) -> tuple:
+        """Descomprime un segmento en streaming y guarda solo las últimas `needed` coincidencias"""
+        matches = deque(maxlen=needed)
+        total = 0
+        with gzip.open(self.directory / meta["segment"], "rb") as f:
+            for line_number, line in enumerate(f):
+                if bound is not None and line_number >= bound:
+                    break
+                entry = LogStore.parse_line(line)
+                if entry is None:
+                    continue
+                if status is not None and entry.get("status") != status:
+                    continue
+                if winner is not None and entry.get("winner") != winner:
+                    continue
+                if low is not None or high is not None:
+                    try:
+                        ts = log_timestamp(entry.get("timestamp"))
+                    except (TypeError, ValueError):
+                        continue
+                    if (low is not None and ts < low) or (high is not None and ts > high):
+                        continue
+                matches.append((line_number, entry))
+                total += 1
+        return list(reversed(matches)), total > len(matches)
+
+    def query(self, limit: int, cursor: Optional[str], status, winner, low, high) -> tuple:
+        """Entradas de los segmentos (más recientes primero) y el cursor siguiente"""
+        with self._lock:
+            segments = list(self.segments)
+        start, bound = 0, None
+        if cursor and cursor != "a::":
+            _, name, position = cursor.split(":", 2)
+            names = [meta["segment"] for meta in segments]
+            if name not in names or (position and not position.isdigit()):
+                raise ValueError("Cursor de archivo inválido")
+            start, bound = names.index(name), (int(position) if position else None)
+
+        results = []
+        for k in range(start, len(segments)):
+            meta = segments[k]
+            if not self._may_match(meta, status, winner, low, high):
+                continue
+            matches, more = self._scan(meta, bound if k == start else None, limit - len(results),
+                                       status, winner, low, high)
+            results.extend(entry for _, entry in matches)
+            if len(results) >= limit:
+                if more:
+                    return results, f"a:{meta['segment']}:{matches[-1][0]}"
+                if k + 1 < len(segments):
+                    return results, f"a:{segments[k + 1]['segment']}:"
+                return results, None
+        return results, None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+log_archive = LogArchive()
+
 class LogManager:
     """Manager avanzado para gestión de logs"""
-    
+
     @staticmethod
-    def rotate_logs_if_needed():
-        """Rota el archivo de logs si es demasiado grande"""
+    def rotate_log_file():
+        """Rota el archivo de logs (llamar con log_lock tomado y el archivo cerrado)"""
         try:
-            log_path = Path("game_logs.json")
-            if log_path.exists():
-                size_mb = log_path.stat().st_size / (1024 * 1024)
-                if size_mb > MAX_LOG_SIZE_MB:
-                    backup_name = f"game_logs_backup_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
-                    log_path.rename(backup_name)
-                    print(f"📦 Log rotado: {backup_name}")
+            if LOG_FILE.exists():
+                backup_name = f"game_logs_backup_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}.json"
+                LOG_FILE.rename(backup_name)
+                print(f"📦 Log rotado: {backup_name}")
+                log_archive.schedule(Path(backup_name))
         except Exception as e:
             print(f"⚠️ Error rotando logs: {e}")
+        log_store.reset()
 
-    @staticmethod
-    def save_log_entry(log_entry: dict):
-        """Guarda una entrada de log de forma segura"""
-        LogManager.rotate_logs_if_needed()
-        
+class LogWriter:
+    """Ingesta de logs por lotes: cola en memoria y un escritor con el archivo siempre abierto"""
+
+    def __init__(self, max_bytes: int = MAX_LOG_SIZE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.errors = 0
+        self._file = None
+        self._size = 0  # ✅ Contador de bytes: la rotación no necesita stat() por escritura
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, log_entry: Dict) -> bool:
+        """Encola una entrada; con la cola llena espera un poco y luego la rechaza"""
         try:
-            with log_lock:
-                with open("game_logs.json", "a", encoding="utf-8") as f:
-                    # ✅ Formato mejorado para análisis
-                    f.write(json.dumps(log_entry, ensure_ascii=False) + ",\n")
+            await asyncio.wait_for(self.queue.put(log_entry), timeout=LOG_ENQUEUE_TIMEOUT_S)
             return True
-        except Exception as e:
-            print(f"⚠️ Error guardando log: {e}")
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            LOG_ENTRIES.inc("rejected")
             return False
 
-# ============ ESTADO GLOBAL DEL JUEGO ============
-game_state = GameState(
-    players=[
-        Player(name="ROJO", color="ROJO"),
-        Player(name="VERDE", color="VERDE")
-    ]
-)
+    def _open(self):
+        self._file = open(LOG_FILE, "ab")
+        self._size = self._file.tell()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _publish(self, written: List[tuple]):
+        """Vuelca el archivo y entonces indexa las líneas escritas"""
+        self._file.flush()
+        for offset, length, entry in written:
+            log_store.note_append(offset, length, entry)
+        written.clear()
+
+    @profiler.profile("logs.write_batch")
+    def _write_batch(self, batch: List[Dict]):
+        """Escribe un lote completo (se ejecuta en un hilo)"""
+        with log_lock, LOG_WRITE_SECONDS.time():
+            if self._file is None:
+                self._open()
+            written = []
+            for log_entry in batch:
+                if self._size > self.max_bytes:
+                    self._publish(written)
+                    self._close()
+                    LogManager.rotate_log_file()
+                    self._open()
+                # ✅ Formato mejorado para análisis
+                line = dumps(log_entry) + b",\n"
+                self._file.write(line)
+                written.append((self._size, len(line), log_entry))
+                self._size += len(line)
+            self._publish(written)
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < LOG_BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                self.written += len(batch)
+                self.batches += 1
+                LOG_ENTRIES.inc("written", amount=len(batch))
+            except Exception as e:
+                self.errors += len(batch)
+                LOG_ENTRIES.inc("error", amount=len(batch))
+                self._close()
+                print(f"⚠️ Error guardando {len(batch)} logs: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Escribe lo que quede en la cola y cierra el archivo"""
+        if self._task is not None:
+            await self.queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self._close)
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+log_writer = LogWriter()
+
+# ============ DESALOJO DE SALAS INACTIVAS ============
+class RoomEvictor:
+    """Mantiene acotado el registro: desaloja salas inactivas o poco usadas a la persistencia
+
+    Una sala solo se desaloja si no tiene nada pendiente de escribir, nadie tiene su
+    lock y no hay clientes SSE ni espectadores conectados; la siguiente petición la
+    vuelve a cargar desde el backend de estado.
+    """
+
+    def __init__(self, max_games: int = REGISTRY_MAX_GAMES,
+                 memory_budget: int = REGISTRY_MEMORY_BUDGET_MB * 1024 * 1024,
+                 idle_ttl: float = GAME_IDLE_TTL_S, interval: float = EVICTION_INTERVAL_S):
+        self.max_games = max_games
+        self.memory_budget = memory_budget
+        self.idle_ttl = idle_ttl
+        self.interval = interval
+        self.evicted = 0
+        self.reloaded = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify_added(self):
+        if len(registry.rooms) > self.max_games:
+            self._wake.set()
+
+    def memory_estimate(self) -> int:
+        return sum(room.memory_estimate() for room in registry.rooms.values())
 
-ladders = {}
-snakes = {}
+    @staticmethod
+    def evictable(room: GameRoom) -> bool:
+        return (persistence.is_saved(room) and not room.lock.locked()
+                and not room.replay.spectators and not broadcaster.subscribers.get(room.game_id))
+
+    def _evict(self, room: GameRoom, reason: str):
+        registry.remove(room.game_id)
+        self.evicted += 1
+        GAME_EVICTIONS.inc(reason)
+
+    async def run_once(self) -> int:
+        """Una pasada: inactivas por TTL, luego por número de salas y por memoria"""
+        await persistence.flush()
+        if persistence.flushing:
+            return 0  # Otro volcado empezó entretanto: se reintenta en la próxima pasada
+        # Sin await a partir de aquí: las comprobaciones y los desalojos son atómicos
+        evicted = 0
+        now = time.monotonic()
+        for room in list(registry.rooms.values()):
+            if now - room.last_access < self.idle_ttl:
+                break  # Orden LRU: las siguientes se usaron más recientemente
+            if self.evictable(room):
+                self._evict(room, "idle")
+                evicted += 1
+
+        excess = len(registry.rooms) - self.max_games
+        if excess > 0:
+            for room in list(registry.rooms.values()):
+                if excess <= 0:
+                    break
+                if self.evictable(room):
+                    self._evict(room, "count")
+                    evicted += 1
+                    excess -= 1
+
+        total = self.memory_estimate()
+        if total > self.memory_budget:
+            for room in list(registry.rooms.values()):
+                if total <= self.memory_budget:
+                    break
+                if self.evictable(room):
+                    total -= room.memory_estimate()
+                    self._evict(room, "memory")
+                    evicted += 1
+        return evicted
+
+    async def reload(self, game_id: str) -> Optional[GameRoom]:
+        """Carga bajo demanda una sala desalojada (o guardada por otro worker)"""
+        start = time.perf_counter()
+        room = await asyncio.to_thread(GameStateManager.load_room, game_id)
+        if room is None:
+            return None
+        existing = registry.rooms.get(game_id)
+        if existing is not None:
+            return existing  # Otra petición la cargó mientras tanto
+        registry.add(room)
+        self.reloaded += 1
+        GAME_RELOAD_SECONDS.observe(time.perf_counter() - start)
+        return room
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"⚠️ Error desalojando salas: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+evictor = RoomEvictor()
+
+class BackendSync:
+    """Backend compartido: lleva a los clientes SSE y espectadores los cambios de otros workers
+
+    `EventBroadcaster` y la repetición viven en este proceso; un movimiento confirmado en
+    otro worker solo sube la versión en el backend. Cada `interval` se consultan las
+    versiones de las salas con clientes conectados y las que cambiaron se recargan:
+    `reload_room` publica "sync" y la nueva repetición despierta a los espectadores.
+    """
+
+    def __init__(self, interval: float = SYNC_POLL_INTERVAL_S):
+        self.interval = interval
+        self.synced = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def watched() -> List[GameRoom]:
+        return [room for room in registry.rooms.values()
+                if room.replay.spectators or broadcaster.subscribers.get(room.game_id)]
+
+    @staticmethod
+    def _versions(game_ids: List[str]) -> List[int]:
+        return [state_backend.version(game_id) for game_id in game_ids]
+
+    async def run_once(self) -> int:
+        """Una pasada: recarga las salas vigiladas cuya versión cambió en el backend"""
+        rooms = self.watched()
+        if not rooms:
+            return 0
+        versions = await asyncio.to_thread(self._versions, [room.game_id for room in rooms])
+        synced = 0
+        for room, version in zip(rooms, versions):
+            if room.version == version:
+                continue
+            async with room.lock:
+                # La lectura pudo quedar atrás de un commit de este mismo worker
+                if room.version != await asyncio.to_thread(state_backend.version, room.game_id):
+                    await reload_room(room)
+                    synced += 1
+        self.synced += synced
+        return synced
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"⚠️ Error sincronizando salas con el backend: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+backend_sync = BackendSync()
+
+# ============ REGISTRO GLOBAL DE SALAS ============
+registry = GameRegistry()
+registry.add(GameRoom(DEFAULT_GAME_ID))
+persistence = PersistenceWriter()
+broadcaster = EventBroadcaster()
+board_pool = BoardPool()
+global_stats = GlobalStats(VIRTUES, SINS, PLAYER_COLORS)
+
+metrics.gauge("games_active", "Partidas en memoria", lambda: len(registry))
+metrics.gauge("games_memory_estimate_bytes", "Memoria estimada de las partidas en memoria",
+              lambda: evictor.memory_estimate())
+metrics.gauge("sse_clients", "Clientes conectados al canal de eventos", lambda: broadcaster.client_count)
+metrics.gauge("spectators", "Espectadores conectados",
+              lambda: sum(room.replay.spectators for room in registry.rooms.values()))
+metrics.gauge("persistence_queue_depth", "Salas pendientes de volcar a disco", lambda: persistence.queue_depth)
+metrics.gauge("log_queue_depth", "Entradas de log en cola", lambda: log_writer.queue_depth)
+metrics.gauge("board_pool_size", "Tableros pre-generados disponibles", lambda: len(board_pool.boards))
+
+async def reload_room(room: GameRoom):
+    """Recarga la sala desde el backend tras un conflicto (llamar con room.lock tomado)"""
+    loaded = await asyncio.to_thread(state_backend.load, room.game_id)
+    if loaded is None:
+        room.reset()
+        room.version = 0
+    else:
+        GameStateManager.restore(room, *loaded)
+    broadcaster.publish(room.game_id, "sync", {"version": room.version})
+
+async def refresh_room(game_id: str):
+    """Backend compartido: trae la última versión si otro worker cambió (o creó) la partida"""
+    version = await asyncio.to_thread(state_backend.version, game_id)
+    room = registry.rooms.get(game_id)
+    if room is None:
+        if version:
+            await evictor.reload(game_id)
+        return
+    if room.version != version:
+        async with room.lock:
+            if room.version != version:
+                await reload_room(room)
+
+async def fetch_room(game_id: str, create: bool = False) -> GameRoom:
+    """Sala indicada (recargada si se desalojó), sincronizada con el backend compartido"""
+    GameRegistry.validate_id(game_id)
+    if state_backend.shared:
+        await refresh_room(game_id)
+    elif game_id not in registry.rooms:
+        await evictor.reload(game_id)
+    # La sala por defecto siempre existe, aunque se desalojara antes de guardarse
+    if create or game_id == DEFAULT_GAME_ID:
+        room = registry.get_or_create(game_id)
+    else:
+        room = registry.get(game_id)
+    registry.touch(room)
+    return room
+
+async def get_room(game_id: str = Query(DEFAULT_GAME_ID, description="ID de la partida")) -> GameRoom:
+    """Dependencia FastAPI: resuelve la sala indicada en la petición"""
+    return await fetch_room(game_id)
+
+async def commit_or_conflict(room: GameRoom):
+    """Confirma los cambios; si otro worker ganó la carrera recarga la sala y responde 409"""
+    if not await persistence.commit(room):
+        await reload_room(room)
+        raise HTTPException(status_code=409, detail="La partida cambió en otro servidor, vuelve a intentarlo")
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match: lista separada por comas, etiquetas débiles (W/) o `*`"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
 
 # ============ INICIALIZACIÓN FASTAPI ============
 app = FastAPI(
@@ -222,97 +1756,122 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# 📊 Conteo y latencia por ruta (plantilla, no URL real, para acotar las series)
+app.add_middleware(RequestMetricsMiddleware, requests=HTTP_REQUESTS, latency=HTTP_LATENCY)
+
 # ============ FUNCIONES DEL JUEGO - OPTIMIZADAS ============
-def generate_game_elements():
-    """Genera escaleras y serpientes aleatorias"""
-    global ladders, snakes
-    ladders = {}
-    snakes = {}
-
-    escaleras_generadas = 0
-    intentos = 0
-    max_intentos = 100
-    
-    while escaleras_generadas < 6 and intentos < max_intentos:
-        start = random.randint(5, MAX_CELL - 20)
-        end = min(start + random.randint(10, 25), MAX_CELL)
-        if (start not in ladders and start not in snakes and 
-            start < MAX_CELL and end <= MAX_CELL and start != end and
-            end not in ladders and end not in snakes):
-            ladders[start] = {
-                "end": end, 
-                "virtue": random.choice(VIRTUES)
-            }
-            escaleras_generadas += 1
-        intentos += 1
-
-    serpientes_generadas = 0
-    intentos = 0
-    
-    while serpientes_generadas < 6 and intentos < max_intentos:
-        start = random.randint(15, MAX_CELL - 20)
-        end = max(start - random.randint(5, 20), 1)
-        if (start not in ladders and start not in snakes and 
-            start < MAX_CELL and start != end and
-            end not in ladders and end not in snakes):
-            snakes[start] = {
-                "end": end,
-                "sin": random.choice(SINS)
-            }
-            serpientes_generadas += 1
-        intentos += 1
-
-def move_player(steps: int) -> Dict:
-    """Mueve al jugador actual y aplica efectos"""
-    player = game_state.players[game_state.current_player_index]
+@profiler.profile("generate_game_elements")
+def generate_game_elements(room: GameRoom, seed: Optional[int] = None) -> Dict:
+    """Asigna escaleras y serpientes a una sala (reproducible con la semilla)"""
+    # ✅ Sin semilla explícita se usa un tablero ya validado del pool (O(1))
+    board = board_pool.take() if seed is None else None
+    if board is None:
+        board = build_board(seed)
+    room.set_board(board["ladders"], board["snakes"], board["seed"])
+    return board
+
+def record_stats(room: GameRoom, result: Dict, finished: bool):
+    """Estadísticas globales de un movimiento ya confirmado (nunca de un intento descartado)"""
+    # ✅ Contadores globales incrementales: consultarlos no recorre el historial
+    global_stats.record_move()
+    if finished:
+        # ✅ Virtudes y pecados se suman por movimiento en la sala y se vuelcan al cerrar la partida
+        game_state = room.game_state
+        duration = None
+        if game_state.start_time:
+            duration = (datetime.utcnow() - game_state.start_time).total_seconds()
+        global_stats.record_finish(list(game_state.colors), result["player_index"],
+                                   game_state.total_turns, duration, room.ladder_hits, room.snake_hits)
+
+def replayed_effect_hits(room: GameRoom) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """Escaleras y serpientes recontadas desde la repetición (solo para partidas guardadas antes del conteo)"""
+    played = replay.Replay(MAX_CELL, room.board_seed, room.replay_players, room.board, bytes(room.replay.moves))
+    ladder_hits: Dict[int, int] = {}
+    snake_hits: Dict[int, int] = {}
+    for code, hits in played.effect_hits().items():
+        target = ladder_hits if code & EFFECT_KIND_MASK == EFFECT_LADDER else snake_hits
+        index = code & EFFECT_INDEX_MASK
+        target[index] = target.get(index, 0) + hits
+    return ladder_hits, snake_hits
+
+@profiler.profile("move_player")
+def move_player(room: GameRoom, steps: Optional[int] = None) -> Dict:
+    """Mueve al jugador actual de la sala y aplica efectos (sin `steps` tira el servidor)"""
+    # Siempre se consume una tirada: así el dado se puede adelantar al reaplicar el diario
+    rolled = room.dice.roll()
+    dice_source = "client"
+    if steps is None:
+        steps, dice_source = rolled, "server"
+    game_state = room.game_state
+    player_index = game_state.current_player_index
+    name, color = game_state.names[player_index], game_state.colors[player_index]
     game_state.total_turns += 1
 
-    old_position = player.position
-    player.position += steps
-    
-    if player.position > MAX_CELL:
-        player.position = MAX_CELL
+    old_position = game_state.positions[player_index]
+    # ✅ Una sola consulta a la tabla compilada resuelve destino y efecto
+    _, position, code = room.board.resolve(old_position, steps)
+    game_state.positions[player_index] = position
 
     # ✅ Mensajes mejorados con emojis
-    message = f"🎲 {player.name} ({player.color}) avanza {steps} casillas."
-
-    if player.position in ladders:
-        ladder = ladders[player.position]
-        message += f"\n🪜 ¡Escalera! Subes a {ladder['end']}. Virtud: {ladder['virtue']}"
-        player.position = ladder["end"]
-        player.stats.ladders += 1
-        game_state.ladders_climbed += 1
-
-    elif player.position in snakes:
-        snake = snakes[player.position]
-        message += f"\n🐍 ¡Serpiente! Bajas a {snake['end']}. Pecado: {snake['sin']}"
-        player.position = snake["end"]
-        player.stats.snakes += 1
-        game_state.snakes_found += 1
+    message = f"🎲 {name} ({color}) avanza {steps} casillas."
+    effect = None
+    kind, index = code & EFFECT_KIND_MASK, code & EFFECT_INDEX_MASK
+
+    if code:
+        if kind == EFFECT_LADDER:
+            virtue = VIRTUES[index] if index < len(VIRTUES) else "?"
+            message += f"\n🪜 ¡Escalera! Subes a {position}. Virtud: {virtue}"
+            game_state.ladders[player_index] += 1
+            game_state.ladders_climbed += 1
+            room.count_effect("L", index)
+            effect = "L"
+        elif kind == EFFECT_SNAKE:
+            sin = SINS[index] if index < len(SINS) else "?"
+            message += f"\n🐍 ¡Serpiente! Bajas a {position}. Pecado: {sin}"
+            game_state.snakes[player_index] += 1
+            game_state.snakes_found += 1
+            room.count_effect("S", index)
+            effect = "S"
 
     victory = None
-    if player.position == MAX_CELL:
+    if position == MAX_CELL:
         victory = {
-            "winner": player.color,
-            "player_name": player.name,
-            "stats": player.stats.dict(),
+            "winner": color,
+            "player_name": name,
+            "stats": {"ladders": game_state.ladders[player_index], "snakes": game_state.snakes[player_index]},
             "total_turns": game_state.total_turns,
-            "final_position": player.position,
-            "message": f"🏆 ¡{player.name} ha ganado el juego!"  # ✅ Mensaje de victoria mejorado
+            "final_position": position,
+            "message": f"🏆 ¡{name} ha ganado el juego!"  # ✅ Mensaje de victoria mejorado
         }
 
-    game_state.current_player_index = (game_state.current_player_index + 1) % len(game_state.players)
-    
-    # ✅ Guardar estado después de cada movimiento
-    GameStateManager.save_state()
+    if victory:
+        # La primera victoria de la época cierra la partida (viaja en el snapshot)
+        room.stats_epoch = room.epoch
+
+    game_state.current_player_index = (player_index + 1) % game_state.count
+    room.invalidate_state(player_index)
+    room.replay.append(player_index, steps)
+
+    # ✅ Registrar en el diario (el escritor en segundo plano agrupa los cambios)
+    persistence.record_move(room, GameStateManager.move_event(room, player_index, steps, effect, index))
 
     return {
         "message": message,
         "victory": victory,
-        "player_moved": player.color,
-        "player_name": player.name,
-        "new_position": player.position,
-        "old_position": old_position
+        "player_index": player_index,
+        "player_moved": color,
+        "player_name": name,
+        "steps": steps,
+        "dice": dice_source,
+        "effect": {"L": "ladder", "S": "snake"}.get(effect),
+        "new_position": position,
+        "old_position": old_position,
+        # ✅ Todo lo que cambia con el movimiento: el cliente lo aplica sin pedir /state
+        "stats": {"ladders": game_state.ladders[player_index], "snakes": game_state.snakes[player_index]},
+        "current_player_index": game_state.current_player_index,
+        "total_turns": game_state.total_turns,
+        "ladders_climbed": game_state.ladders_climbed,
+        "snakes_found": game_state.snakes_found
     }
 
 # ============ ENDPOINTS API - MEJORADOS ============
@@ -328,52 +1887,78 @@ async def root():
             "Persistencia automática del estado",
             "Gestión de logs con rotación",
             "Mensajes con emojis",
-            "Arquitectura modular preparada"
+            "Arquitectura modular preparada",
+            "Múltiples partidas simultáneas por proceso"
         ],
         "configuración": {
             "max_jugadores": 6,
             "celdas_tablero": MAX_CELL,
             "filas": BOARD_ROWS,
-            "columnas": BOARD_COLS
+            "columnas": BOARD_COLS,
+            "partidas_activas": len(registry),
+            "dado_cliente": CLIENT_DICE_ALLOWED
         },
-        "advertencia": "⚠️ Estado en memoria - usar single worker en producción"
+        "backend_estado": state_backend.name,
+        "advertencia": None if state_backend.shared else
+            "⚠️ Estado en archivos locales - usar single worker o SERPIENTES_STATE_BACKEND=sqlite/redis"
     }
 
+@app.get("/api/games")
+async def list_games():
+    """Lista las partidas: las alojadas en este proceso y las guardadas en el backend"""
+    games = [
+        {
+            "game_id": room.game_id,
+            "total_players": room.game_state.count,
+            "game_started": room.game_state.game_started,
+            "total_turns": room.game_state.total_turns,
+            "loaded": True
+        } for room in registry.rooms.values()
+    ]
+    # ✅ Desalojar una sala no la hace desaparecer del listado: el backend guarda un
+    # resumen por partida, así que listar no lee snapshots ni diarios
+    skip = set(registry.rooms) | persistence.deleted
+    stored = await asyncio.to_thread(state_backend.summaries)
+    games += [
+        {
+            "game_id": game_id,
+            "total_players": summary["total_players"],
+            "game_started": summary["game_started"],
+            "total_turns": summary["total_turns"],
+            "loaded": False
+        } for game_id, summary in sorted(stored.items())
+        if game_id not in skip and GAME_ID_PATTERN.match(game_id)
+    ]
+    return {"games": games, "total": len(games)}
+
+@app.post("/api/games")
+async def create_game():
+    """Crea una sala nueva con un ID generado"""
+    game_id = uuid.uuid4().hex[:12]
+    room = registry.get_or_create(game_id)
+    async with room.lock:
+        persistence.mark_dirty(room)
+        await commit_or_conflict(room)
+    return {"message": "🆕 Partida creada", "game_id": room.game_id}
+
 @app.get("/api/game/state")
-async def get_game_state():
+async def get_game_state(room: GameRoom = Depends(get_room)):
     """Obtiene el estado completo del juego"""
-    return {
-        "players": [player.dict() for player in game_state.players],
-        "current_player_index": game_state.current_player_index,
-        "current_player": game_state.players[game_state.current_player_index].dict() if game_state.players else None,
-        "game_started": game_state.game_started,
-        "total_turns": game_state.total_turns,
-        "ladders_climbed": game_state.ladders_climbed,
-        "snakes_found": game_state.snakes_found,
-        "start_time": game_state.start_time.isoformat() if game_state.start_time else None,
-        "max_cell": MAX_CELL
-    }
+    # ✅ Bytes ya codificados: solo se recodifica lo que cambió desde la última consulta
+    return Response(content=room.state_document(), media_type="application/json")
 
 # ✅ NUEVO ENDPOINT - Jugador actual específico
 @app.get("/api/game/current_player")
-async def get_current_player():
+async def get_current_player(room: GameRoom = Depends(get_room)):
     """Obtiene información específica del jugador actual"""
-    if not game_state.players:
+    if not room.game_state.count:
         raise HTTPException(status_code=404, detail="No hay jugadores en el juego")
-    
-    player = game_state.players[game_state.current_player_index]
-    return {
-        "current_player": player.dict(),
-        "index": game_state.current_player_index,
-        "is_your_turn": True,  # Útil para frontend
-        "message": f"🎯 Es el turno de {player.name} ({player.color})"
-    }
+    return Response(content=room.current_player_document(), media_type="application/json")
 
 @app.get("/api/game/start")
-async def start_game(request: StartGameRequest):
+async def start_game(request: StartGameRequest,
+                     game_id: str = Query(DEFAULT_GAME_ID, description="ID de la partida")):
     """Inicia un nuevo juego con los jugadores proporcionados"""
-    global game_state
-    
     # Las validaciones ahora están en el modelo Pydantic
     updated_players = []
     colors_usados = set()
@@ -385,81 +1970,111 @@ async def start_game(request: StartGameRequest):
         colors_usados.add(player.color)
         avatar_filename = COLOR_TO_AVATAR.get(player.color, "JugadorRojo.png")
         avatar_url = f"/img/{avatar_filename}"
-        updated_players.append(
-            Player(
-                name=player.name,
-                color=player.color,
-                position=1,
-                stats=PlayerStats(),
-                avatar=avatar_url
-            )
-        )
-    
-    game_state.players = updated_players
-    game_state.current_player_index = 0
-    game_state.total_turns = 0
-    game_state.ladders_climbed = 0
-    game_state.snakes_found = 0
-    game_state.game_started = True
-    game_state.start_time = datetime.utcnow()
-    
-    generate_game_elements()
-    
-    # ✅ Guardar estado inicial
-    GameStateManager.save_state()
+        updated_players.append((player.name, player.color, avatar_url))
     
+    room = await fetch_room(game_id, create=True)
+    async with room.lock:
+        await archive_replay(room)
+        game_state = room.game_state
+        game_state.clear_players()
+        for name, color, avatar_url in updated_players:
+            game_state.add_player(name, color, avatar_url, position=1)
+        game_state.current_player_index = 0
+        game_state.total_turns = 0
+        game_state.ladders_climbed = 0
+        game_state.snakes_found = 0
+        game_state.game_started = True
+        game_state.start_time = datetime.utcnow()
+        room.epoch += 1
+        room.invalidate_state()
+        room.dice = DiceStream(request.dice_seed)
+        room.clear_effect_hits()
+
+        board = generate_game_elements(room, request.seed)
+        room.start_replay()
+
+        # ✅ Guardar estado inicial
+        persistence.mark_dirty(room)
+        await commit_or_conflict(room)
+        broadcaster.publish(room.game_id, "start", {
+            "total_players": game_state.count,
+            "start_time": game_state.start_time.isoformat()
+        })
+
     return {
         "message": "🎮 ¡Juego iniciado con éxito!",
-        "total_players": len(game_state.players),
-        "players": [p.dict() for p in game_state.players],
-        "ladders": ladders,
-        "snakes": snakes,
+        "game_id": room.game_id,
+        "total_players": game_state.count,
+        "players": [game_state.player_dict(i) for i in range(game_state.count)],
+        "ladders": room.ladders,
+        "snakes": room.snakes,
+        "board_seed": board["seed"],
+        "expected_turns": board["expected_turns"],
         "board_size": MAX_CELL,
         "start_time": game_state.start_time.isoformat()
     }
 
 @app.post("/api/game/add_player")
-async def add_player():
+async def add_player(room: GameRoom = Depends(get_room)):
     """Añade un nuevo jugador"""
-    if len(game_state.players) >= 6:
-        raise HTTPException(status_code=400, detail="Máximo 6 jugadores")
-    
-    available_colors = [color for color in PLAYER_COLORS if color not in [p.color for p in game_state.players]]
-    if not available_colors:
-        raise HTTPException(status_code=400, detail="No hay colores disponibles")
-    
-    color = available_colors[0]
-    avatar_filename = COLOR_TO_AVATAR.get(color, "JugadorRojo.png")
-    avatar_url = f"/img/{avatar_filename}"
-    
-    new_player = Player(name=color, color=color, avatar=avatar_url)
-    game_state.players.append(new_player)
-    
-    GameStateManager.save_state()
-    
+    async with room.lock:
+        game_state = room.game_state
+        if game_state.count >= MAX_PLAYERS:
+            raise HTTPException(status_code=400, detail="Máximo 6 jugadores")
+
+        available_colors = [color for color in PLAYER_COLORS if color not in game_state.colors]
+        if not available_colors:
+            raise HTTPException(status_code=400, detail="No hay colores disponibles")
+
+        color = available_colors[0]
+        avatar_filename = COLOR_TO_AVATAR.get(color, "JugadorRojo.png")
+        avatar_url = f"/img/{avatar_filename}"
+
+        index = game_state.add_player(color, color, avatar_url)
+        new_player = game_state.player_dict(index)
+        room.invalidate_state()
+        room.add_replay_player(index)
+
+        persistence.mark_dirty(room)
+        await commit_or_conflict(room)
+        broadcaster.publish(room.game_id, "add_player", {
+            "player": new_player,
+            "total_players": game_state.count
+        })
+
     return {
         "message": f"👤 Jugador {color} añadido", 
-        "total_players": len(game_state.players),
-        "player": new_player.dict()
+        "total_players": game_state.count,
+        "player": new_player
     }
 
 @app.post("/api/game/remove_player")
-async def remove_player():
+async def remove_player(room: GameRoom = Depends(get_room)):
     """Elimina el último jugador"""
-    if len(game_state.players) <= 2:
-        raise HTTPException(status_code=400, detail="Mínimo 2 jugadores")
-    
-    removed_player = game_state.players.pop()
-    
-    if game_state.current_player_index >= len(game_state.players):
-        game_state.current_player_index = 0
-    
-    GameStateManager.save_state()
-    
+    async with room.lock:
+        game_state = room.game_state
+        if game_state.count <= 2:
+            raise HTTPException(status_code=400, detail="Mínimo 2 jugadores")
+
+        removed_player = game_state.pop_player()
+        room.replay.remove_player(game_state.count)
+
+        if game_state.current_player_index >= game_state.count:
+            game_state.current_player_index = 0
+        room.invalidate_state()
+
+        persistence.mark_dirty(room)
+        await commit_or_conflict(room)
+        broadcaster.publish(room.game_id, "remove_player", {
+            "color": removed_player["color"],
+            "total_players": game_state.count,
+            "current_player_index": game_state.current_player_index
+        })
+
     return {
-        "message": f"❌ Jugador {removed_player.color} eliminado", 
-        "total_players": len(game_state.players),
-        "removed_player": removed_player.dict()
+        "message": f"❌ Jugador {removed_player['color']} eliminado", 
+        "total_players": game_state.count,
+        "removed_player": removed_player
     }
 
 @app.get("/api/avatars/{color}")
@@ -484,104 +2099,210 @@ async def get_avatar_image(filename: str):
     if not img_path.exists() or not img_path.is_file() or img_path.parent != IMG_DIR:
         raise HTTPException(status_code=404, detail="Avatar no encontrado")
     
-    return FileResponse(img_path)
+    return FileResponse(img_path, headers={"Cache-Control": BOARD_IMAGE_CACHE})
 
 @app.post("/api/game/move")
-async def make_move(move: MoveRequest):
+async def make_move(move: MoveRequest, room: GameRoom = Depends(get_room)):
     """Realiza un movimiento con el dado"""
-    if not game_state.game_started:
-        raise HTTPException(status_code=400, detail="El juego no ha comenzado")
-    
-    # La validación del rango ahora está en el modelo Pydantic
-    result = move_player(move.steps)
+    if move.steps is not None and not CLIENT_DICE_ALLOWED:
+        raise HTTPException(status_code=400, detail="El dado lo tira el servidor: no envíes 'steps'")
+    async with room.lock:
+        # ✅ Si otro worker movió antes, se recarga la partida y se reintenta sobre el estado nuevo
+        for attempt in range(COMMIT_RETRIES):
+            if not room.game_state.game_started:
+                raise HTTPException(status_code=400, detail="El juego no ha comenzado")
+
+            # La validación del rango ahora está en el modelo Pydantic
+            counted = room.stats_epoch == room.epoch
+            result = move_player(room, move.steps)
+            if await persistence.commit(room):
+                break
+            await reload_room(room)
+        else:
+            raise HTTPException(status_code=409, detail="La partida cambió en otro servidor, vuelve a intentarlo")
+
+        # ✅ Solo el intento confirmado suma en las estadísticas
+        record_stats(room, result, finished=result["victory"] is not None and not counted)
+        result["version"] = room.version
+
+        broadcaster.publish(room.game_id, "move", {
+            "player_index": result["player_index"],
+            "color": result["player_moved"],
+            "steps": result["steps"],
+            "old_position": result["old_position"],
+            "new_position": result["new_position"],
+            "effect": result["effect"],
+            "victory": result["victory"],
+            "stats": result["stats"],
+            "current_player_index": result["current_player_index"],
+            "total_turns": result["total_turns"],
+            "ladders_climbed": result["ladders_climbed"],
+            "snakes_found": result["snakes_found"],
+            "version": result["version"]
+        })
     return result
 
 @app.get("/api/board")
-async def get_board():
+async def get_board(room: GameRoom = Depends(get_room),
+                    if_none_match: Optional[str] = Header(None),
+                    accept_encoding: Optional[str] = Header(None)):
     """Devuelve la estructura del tablero con el orden correcto (82→1)"""
-    # Definimos el orden de las filas según tu diseño
-    rows_order = [
-        [73, 74, 75, 76, 77, 78, 79, 80, 81, 82],  # Fila 6 (índice 6)
-        [72, 71, 70, 69, 68, 67, 66, 65, 64, 63, 62, 61],  # Fila 5 (índice 5)
-        [49, 50, 51, 52, 53, 54, 55, 56, 57, 58, 59, 60],  # Fila 4 (índice 4)
-        [48, 47, 46, 45, 44, 43, 42, 41, 40, 39, 38, 37],  # Fila 3 (índice 3)
-        [25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36],  # Fila 2 (índice 2)
-        [24, 23, 22, 21, 20, 19, 18, 17, 16, 15, 14, 13],  # Fila 1 (índice 1)
-        [ 1,  2,  3,  4,  5,  6,  7,  8,  9, 10, 11, 12]   # Fila 0 (índice 0) - ¡Esta tiene 12 celdas!
+    # ✅ Documento serializado una vez por tablero generado; se valida con ETag
+    etag, body, gzipped = room.board_document()
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if accept_encoding and "gzip" in accept_encoding:
+        headers["Content-Encoding"] = "gzip"
+        body = gzipped
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/board/analysis")
+async def get_board_analysis(room: GameRoom = Depends(get_room),
+                             simulations: int = Query(0, ge=0, le=ANALYSIS_MAX_SIMULATIONS),
+                             seed: Optional[int] = None):
+    """Duración esperada y distribución de turnos del tablero de la partida"""
+    # Cálculo CPU: se ejecuta fuera del event loop
+    result = await asyncio.to_thread(
+        analyze_board, room.board, 1, max(room.game_state.count, 1), simulations, seed
+    )
+    result["game_id"] = room.game_id
+    return result
+
+@app.get("/api/board/pool")
+async def get_board_pool():
+    """Métricas del pool de tableros pre-generados"""
+    return board_pool.metrics()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas del servidor en formato de texto de Prometheus"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/profiling")
+async def get_profiling():
+    """Resumen del perfilado: percentiles por función de las muestras recientes"""
+    return profiler.summary()
+
+@app.post("/api/profiling")
+async def configure_profiling(request: ProfilingRequest, x_admin_token: Optional[str] = Header(None)):
+    """Activa o desactiva el perfilado en caliente (solo con el token de administración)"""
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Perfilado en caliente desactivado: define SERPIENTES_ADMIN_TOKEN")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+    if request.reset:
+        profiler.reset()
+    profiler.configure(request.enabled, request.sample_rate, request.trace_memory)
+    print(f"🔬 Perfilado {'activo' if profiler.enabled else 'inactivo'} (muestreo {profiler.sample_rate:.0%})")
+    return profiler.summary()
+
+def resolve_simulation_board(request: SimulateRequest, room: Optional[GameRoom] = None) -> tuple:
+    """Tablero a simular: uno dado, el de una partida o uno generado con la semilla"""
+    if request.ladders is not None or request.snakes is not None:
+        ladders, snakes = layout_from_pairs(
+            {"ladders": request.ladders, "snakes": request.snakes}, VIRTUES, SINS
+        )
+        try:
+            validate_layout(ladders, snakes, MAX_CELL, allow_chains=True)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Tablero inválido: {e}")
+        return compile_board(ladders, snakes, MAX_CELL, VIRTUES, SINS), {"source": "request"}
+    if room is not None:
+        return room.board, {"source": "game", "game_id": room.game_id, "seed": room.board_seed}
+    board = build_board(request.seed)
+    return (
+        compile_board(board["ladders"], board["snakes"], MAX_CELL, VIRTUES, SINS),
+        {"source": "generated", "seed": board["seed"], "ladders": board["ladders"], "snakes": board["snakes"]}
+    )
+
+async def run_simulation_chunks(board, request: SimulateRequest):
+    """Reparte los bloques en el pool de procesos y entrega cada uno al terminar"""
+    loop = asyncio.get_running_loop()
+    plan = simulation.chunk_plan(request.games, request.seed)
+    # Un solo bloque no compensa el coste de enviarlo a otro proceso
+    executor = simulation.get_pool() if len(plan) > 1 else None
+    futures = [
+        loop.run_in_executor(executor, simulation.simulate_chunk, board, size, request.players, chunk_seed)
+        for size, chunk_seed in plan
     ]
+    for future in asyncio.as_completed(futures):
+        yield await future
 
-    board_rows = []
-    for idx, row_numbers in enumerate(rows_order):
-        direction = "right" if idx % 2 == 0 else "left"  # Índice par: izq→der; impar: der→izq
-        cells = []
-        for num in row_numbers:
-            cells.append({
-                "number": num,
-                "image": f"http://localhost:3000/mapaCuadritos/{num:02d}.png"  # ← Ruta correcta para FastAPI
-            })
-        board_rows.append({
-            "row_index": idx,
-            "direction": direction,
-            "cells": cells,
-            "range": f"{cells[0]['number']}-{cells[-1]['number']}"
-        })
+@app.post("/api/simulate")
+async def simulate_games(request: SimulateRequest):
+    """Juega N partidas completas en el servidor y devuelve estadísticas agregadas"""
+    room = None
+    if request.game_id is not None and request.ladders is None and request.snakes is None:
+        room = await fetch_room(request.game_id)
+    board, board_info = resolve_simulation_board(request, room)
+
+    if not request.stream:
+        total = simulation.empty_stats(request.players)
+        async for part in run_simulation_chunks(board, request):
+            simulation.merge_stats(total, part)
+        return {"board": board_info, "seed": request.seed, **simulation.summarize(total)}
+
+    async def stream():
+        total = simulation.empty_stats(request.players)
+        async for part in run_simulation_chunks(board, request):
+            simulation.merge_stats(total, part)
+            yield json.dumps({"type": "progress", **simulation.summarize(total)}) + "\n"
+        yield json.dumps({"type": "done", "board": board_info, "seed": request.seed,
+                          **simulation.summarize(total)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-    return {
-        "rows": board_rows,
-        "ladders": ladders,
-        "snakes": snakes,
-        "max_cell": MAX_CELL,
-        "board_cols": BOARD_COLS,
-        "board_rows": BOARD_ROWS,
-        "layout": {
-            "fila_6": "73-82",
-            "fila_5": "61-72",  # ← Nota: 61-72 no coincide con lo que generamos, pero es solo info visual
-            "fila_4": "49-60",
-            "fila_3": "37-48",
-            "fila_2": "25-36",
-            "fila_1": "13-24",
-            "fila_0": "1-12"
-        }
-    }
 @app.get("/mapaCuadritos/{filename}")
 async def get_board_image(filename: str):
-    image_path = MAPA_DIR / filename
-    if not image_path.exists():
+    """Casilla suelta sin hash (los clientes nuevos usan las URLs de /api/board)"""
+    image_path = MAPA_DIR / Path(filename).name
+    if not image_path.is_file():
         raise HTTPException(status_code=404, detail="Imagen no encontrada")
-    return FileResponse(image_path)
+    return FileResponse(image_path, headers={"Cache-Control": BOARD_IMAGE_CACHE})
+
+@app.get("/assets/{filename}")
+async def get_asset(filename: str, if_none_match: Optional[str] = Header(None),
+                    accept_encoding: Optional[str] = Header(None)):
+    """Recursos con hash de contenido en el nombre: cacheables para siempre"""
+    asset = asset_store.get(filename)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Recurso no encontrado")
+    headers = {"ETag": asset.etag, "Cache-Control": IMMUTABLE_CACHE, "Vary": "Accept-Encoding"}
+    if etag_matches(if_none_match, asset.etag):
+        return Response(status_code=304, headers=headers)
+    body = asset.content
+    if asset.gzipped is not None and accept_encoding and "gzip" in accept_encoding:
+        headers["Content-Encoding"] = "gzip"
+        body = asset.gzipped
+    return Response(content=body, media_type=asset.media_type, headers=headers)
 
 @app.get("/api/game/elements")
-async def get_game_elements():
+async def get_game_elements(room: GameRoom = Depends(get_room)):
     """Obtiene las escaleras y serpientes generadas"""
     return {
-        "ladders": ladders,
-        "snakes": snakes,
-        "total_ladders": len(ladders),
-        "total_snakes": len(snakes),
+        "game_id": room.game_id,
+        "ladders": room.ladders,
+        "snakes": room.snakes,
+        "total_ladders": len(room.ladders),
+        "total_snakes": len(room.snakes),
+        "board_seed": room.board_seed,
         "virtues": VIRTUES,
         "sins": SINS
     }
 
 @app.post("/api/game/reset")
-async def reset_game():
+async def reset_game(room: GameRoom = Depends(get_room)):
     """Reinicia el juego completamente"""
-    global game_state, ladders, snakes
-    
-    game_state = GameState(
-        players=[
-            Player(name="ROJO", color="ROJO"),
-            Player(name="VERDE", color="VERDE")
-        ]
-    )
-    ladders = {}
-    snakes = {}
-    
-    # ✅ Limpiar también el backup de estado
-    try:
-        Path("game_state_backup.json").unlink(missing_ok=True)
-    except:
-        pass
-    
+    async with room.lock:
+        await archive_replay(room)
+        room.reset()
+
+        # ✅ Limpiar también el backup de estado (con backend compartido se guarda la sala vacía)
+        persistence.mark_deleted(room)
+        await commit_or_conflict(room)
+        broadcaster.publish(room.game_id, "reset", {"game_id": room.game_id})
+
     return {"message": "🔄 Juego reiniciado exitosamente"}
 
 # ============ SERVIR ARCHIVOS ESTÁTICOS ============
@@ -604,55 +2325,55 @@ async def save_game_log(log_data: GameLog):
         "winner": log_data.winner
     }
     
-    success = LogManager.save_log_entry(log_entry)
-    
-    if not success:
-        raise HTTPException(status_code=500, detail="Error guardando log")
-    
+    # ✅ Solo se encola: el escritor dedicado lo guarda en el próximo lote
+    accepted = await log_writer.submit(log_entry)
+
+    if not accepted:
+        raise HTTPException(
+            status_code=503,
+            detail="Cola de logs llena, reintenta en unos segundos",
+            headers={"Retry-After": "1"}
+        )
+
     return {"message": "📝 Log guardado exitosamente", "log_entry": log_entry}
 
 @app.get("/api/game/logs")
-async def get_game_logs(limit: int = 10):
-    """Obtiene los últimos logs del juego"""
+async def get_game_logs(limit: int = Query(10, ge=1, le=LOG_QUERY_MAX_LIMIT),
+                        cursor: Optional[str] = None,
+                        status: Optional[str] = None,
+                        winner: Optional[str] = None,
+                        since: Optional[datetime] = None,
+                        until: Optional[datetime] = None):
+    """Obtiene los últimos logs del juego, con paginación por cursor y filtros"""
     try:
-        with log_lock:
-            with open("game_logs.json", "r", encoding="utf-8") as f:
-                lines = f.readlines()
-        
-        logs = []
-        for line in lines[-limit:]:
-            try:
-                # Remover la coma final si existe
-                clean_line = line.rstrip().rstrip(',')
-                logs.append(json.loads(clean_line))
-            except json.JSONDecodeError:
-                continue
-        
-        return {"logs": logs, "total": len(logs)}
-    except FileNotFoundError:
-        return {"logs": [], "total": 0}
+        # Lectura por offsets fuera del event loop; no bloquea a los escritores
+        return await asyncio.to_thread(log_store.query, limit, cursor, status, winner, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error leyendo logs: {str(e)}")
 
 # ✅ NUEVO ENDPOINT - Estadísticas del juego
 @app.get("/api/game/stats")
-async def get_game_stats():
+async def get_game_stats(room: GameRoom = Depends(get_room)):
     """Obtiene estadísticas avanzadas del juego"""
-    if not game_state.players:
+    game_state = room.game_state
+    if not game_state.count:
         return {"message": "No hay juego activo"}
-    
+
     stats = {
+        "game_id": room.game_id,
         "total_turns": game_state.total_turns,
         "ladders_climbed": game_state.ladders_climbed,
         "snakes_found": game_state.snakes_found,
         "players_stats": [
             {
-                "name": p.name,
-                "color": p.color,
-                "position": p.position,
-                "ladders": p.stats.ladders,
-                "snakes": p.stats.snakes
-            } for p in game_state.players
+                "name": game_state.names[i],
+                "color": game_state.colors[i],
+                "position": game_state.positions[i],
+                "ladders": game_state.ladders[i],
+                "snakes": game_state.snakes[i]
+            } for i in range(game_state.count)
         ],
         "game_duration": None
     }
@@ -664,27 +2385,235 @@ async def get_game_stats():
     
     return stats
 
+@app.get("/api/stats/global")
+async def get_global_stats():
+    """Estadísticas acumuladas de todas las partidas terminadas"""
+    if state_backend.shared:
+        # Los totales incluyen lo que sumaron los demás workers
+        global_stats.load_counters(await asyncio.to_thread(state_backend.load_counters))
+    return global_stats.summary()
+
+@app.get("/api/game/events")
+async def game_events(room: GameRoom = Depends(get_room)):
+    """Canal SSE con los cambios de la partida (sustituye el polling de /api/game/state)"""
+    queue = broadcaster.subscribe(room.game_id)
+    return StreamingResponse(
+        broadcaster.stream(room.game_id, queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/game/history")
+async def get_game_history(room: GameRoom = Depends(get_room)):
+    """Historial completo de movimientos de la partida actual (diario + pendientes)"""
+    epoch = room.epoch
+    pending = [event for event in room.pending_events if event["g"] == epoch]
+    events = await asyncio.to_thread(GameStateManager.read_journal, room.game_id, epoch)
+    flushed = {event["n"] for event in events}
+    events.extend(event for event in pending if event["n"] not in flushed)
+    return {"game_id": room.game_id, "moves": events, "total": len(events)}
+
+# ============ REPETICIONES Y ESPECTADORES ============
+REPLAY_DIR = Path("replays")  # Partidas anteriores de cada sala, ya codificadas
+
+def replay_path(game_id: str, epoch: int) -> Path:
+    return REPLAY_DIR / f"{game_id}-g{epoch}.replay"
+
+def write_replay(path: Path, data: bytes):
+    REPLAY_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+async def archive_replay(room: GameRoom):
+    """Guarda la repetición de la partida que se va a reemplazar (llamar con room.lock)"""
+    if not room.replay.moves:
+        return
+    try:
+        await asyncio.to_thread(write_replay, replay_path(room.game_id, room.epoch), room.replay.encoded())
+    except OSError as e:
+        print(f"⚠️ Error archivando repetición de {room.game_id}: {e}")
+
+async def load_replay(room: GameRoom, epoch: Optional[int]) -> tuple:
+    """(bytes, es_definitiva) de la partida actual o de una época archivada"""
+    if epoch is None or epoch == room.epoch:
+        return room.replay.encoded(), False
+    path = replay_path(room.game_id, epoch)
+    try:
+        return await asyncio.to_thread(path.read_bytes), True
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No hay repetición de la partida {epoch}")
+
+@app.get("/api/game/replay")
+async def get_replay(room: GameRoom = Depends(get_room),
+                     epoch: Optional[int] = Query(None, description="Partida anterior (por defecto la actual)"),
+                     format: str = Query("binary", pattern="^(binary|json)$"),
+                     if_none_match: Optional[str] = Header(None)):
+    """Repetición compacta: cabecera del tablero + un byte por tirada"""
+    data, archived = await load_replay(room, epoch)
+    if format == "json":
+        return {"game_id": room.game_id, "epoch": room.epoch if epoch is None else epoch,
+                **replay.decode(data).to_dict(PLAYER_COLORS)}
+
+    etag = f'"{hashlib.sha1(data).hexdigest()[:20]}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE if archived else "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=replay.MEDIA_TYPE, headers=headers)
+
+@app.get("/api/game/replay/seek")
+async def seek_replay(turn: int = Query(..., ge=0, description="Tiradas a reproducir"),
+                      room: GameRoom = Depends(get_room),
+                      epoch: Optional[int] = Query(None, description="Partida anterior (por defecto la actual)")):
+    """Estado de la partida tras N tiradas, calculado sobre el tablero compilado"""
+    data, _ = await load_replay(room, epoch)
+    try:
+        played = replay.decode(data)
+        total = replay.count_moves(played.moves)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Repetición no válida: {e}")
+    if turn > total:
+        raise HTTPException(status_code=404, detail=f"La repetición solo tiene {total} tiradas")
+    state = played.seek(turn)
+    return {"game_id": room.game_id, "epoch": room.epoch if epoch is None else epoch, **state}
+
+async def spectator_stream(room: GameRoom):
+    """SSE de espectadores: la repetición completa al conectar y luego solo las tiradas nuevas"""
+    feed = room.replay
+    feed.spectators += 1
+    generation = None
+    cursor = 0
+    try:
+        while True:
+            if generation != feed.generation:
+                # Partida nueva o recargada: se reenvía entera
+                generation, cursor = feed.generation, len(feed.moves)
+                yield EventBroadcaster.encode("replay", {
+                    "game_id": room.game_id,
+                    "epoch": feed.epoch,
+                    "turn": feed.turns,
+                    "data": base64.b64encode(feed.encoded()).decode("ascii")
+                })
+            elif cursor < len(feed.moves):
+                message = feed.delta(cursor, EventBroadcaster.encode)
+                cursor = len(feed.moves)
+                yield message
+            elif not await feed.wait(SSE_KEEPALIVE_S):
+                yield b": keepalive\n\n"
+    finally:
+        feed.spectators -= 1
+
+@app.get("/api/game/spectate")
+async def spectate_game(room: GameRoom = Depends(get_room)):
+    """Canal para espectadores: no toca el lock ni el estado de la partida"""
+    return StreamingResponse(
+        spectator_stream(room),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- Static files ---
 # app.mount("/mapaCuadritos", StaticFiles(directory=MAPA_DIR), name="mapaCuadritos")
 app.mount("/img", StaticFiles(directory=IMG_DIR), name="img")
 app.mount("/", StaticFiles(directory=PUBLIC_DIR, html=True), name="public")
 
+def invalidate_board_documents():
+    """Los documentos de tablero ya construidos llevan las URLs anteriores"""
+    for room in list(registry.rooms.values()):
+        room.board_cache = None
+
+def publish_static_assets():
+    """Publica img/ y las casillas con hash de contenido (solo lee los archivos: no bloquea el arranque)"""
+    start = time.perf_counter()
+    images = asset_store.add_directory(IMG_DIR)
+    tiles = asset_store.add_directory(MAPA_DIR, "[0-9][0-9].png")
+    for row in BOARD_ROWS_DATA:
+        for cell in row["cells"]:
+            cell["image"] = asset_store.url(f"{cell['number']:02d}.png") or cell["image"]
+    invalidate_board_documents()
+    print(f"🖼️ Recursos estáticos: {images} imágenes y {tiles} casillas con hash "
+          f"({time.perf_counter() - start:.2f}s)")
+
+def build_board_atlas():
+    """Atlas con paleta (en un hilo); hasta que exista el cliente usa las casillas sueltas"""
+    global BOARD_ATLAS
+    start = time.perf_counter()
+    try:
+        atlas = load_or_build_atlas(MAPA_DIR, BOARD_ROWS_ORDER, ASSET_CACHE_DIR, quantize=True)
+    except Exception as e:
+        print(f"⚠️ Error construyendo el atlas del tablero: {e}")
+        return
+    if atlas is None:
+        return
+    url = asset_store.add("board-atlas.png", atlas["png"], "image/png")
+    for row in BOARD_ROWS_DATA:
+        for cell in row["cells"]:
+            cell["sprite"] = atlas["cells"].get(cell["number"])
+    BOARD_ATLAS = {"url": url, "width": atlas["width"], "height": atlas["height"]}
+    invalidate_board_documents()
+    print(f"🧩 Atlas del tablero listo ({len(atlas['png']) // 1024} KB, "
+          f"{time.perf_counter() - start:.2f}s)")
+
 # ============ INICIALIZACIÓN AL ARRANCAR ============
 @app.on_event("startup")
 async def startup_event():
     """Ejecuta tareas al iniciar la aplicación"""
+    global atlas_task
     print("🚀 Iniciando Juego de Escaleras y Serpientes v2.0...")
     print("📁 Directorio base:", BASE_DIR)
     
-    # ✅ Intentar cargar estado previo
-    GameStateManager.load_state()
+    # ✅ Intentar cargar estado previo de todas las salas
+    GameStateManager.load_state(registry, limit=REGISTRY_MAX_GAMES)
+    try:
+        global_stats.load_counters(state_backend.load_counters())
+        print(f"📈 Estadísticas globales cargadas: {global_stats.games_finished} partidas")
+    except Exception as e:
+        print(f"⚠️ Estadísticas globales ilegibles, se empieza de cero: {e}")
+    await asyncio.to_thread(publish_static_assets)
+    if BOARD_ATLAS_ENABLED:
+        # ✅ Fuera del camino de arranque: si no se preconstruyó, se genera en segundo plano
+        atlas_task = asyncio.ensure_future(asyncio.to_thread(build_board_atlas))
+    persistence.start()
+    evictor.start()
+    if state_backend.shared:
+        backend_sync.start()
+    log_writer.start()
+    log_archive.load()
+    profiler.configure(enabled=PROFILING_ENABLED)
+    profiler.start()
+    board_pool.load_files(BOARD_POOL_FILES)
+    board_pool.start()
     
     print("🎯 Configuración:")
     print(f"   - Tablero: {MAX_CELL} celdas ({BOARD_ROWS}x{BOARD_COLS})")
-    print(f"   - Jugadores: {len(game_state.players)}")
+    print(f"   - Partidas: {len(registry)} (máx. {REGISTRY_MAX_GAMES} en memoria, "
+          f"{REGISTRY_MEMORY_BUDGET_MB} MB, inactivas {GAME_IDLE_TTL_S // 60} min)")
     print(f"   - Límite logs: {MAX_LOG_SIZE_MB} MB")
-    print("⚠️  ADVERTENCIA: Estado en memoria - usar single worker en producción")
+    print(f"   - Backend de estado: {state_backend.name}")
+    if not state_backend.shared:
+        print("⚠️  ADVERTENCIA: Estado en archivos locales - usar single worker en producción")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Vuelca el estado pendiente antes de cerrar"""
+    await board_pool.stop()
+    await backend_sync.stop()
+    await evictor.stop()
+    await persistence.stop()
+    await log_writer.stop()
+    await asyncio.to_thread(log_archive.shutdown)
+    await profiler.stop()
+    simulation.shutdown_pool()
+    state_backend.close()
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["loadtest"]:
+        # python app.py loadtest [--clients N ...]: prueba de carga (ver loadtest.py)
+        import loadtest
+        sys.exit(loadtest.main(sys.argv[2:]))
+    if sys.argv[1:2] == ["build-assets"]:
+        # python app.py build-assets: deja el atlas en asset_cache/ antes del despliegue
+        build_board_atlas()
+        sys.exit(0 if BOARD_ATLAS else 1)
     uvicorn.run(app, host="0.0.0.0", port=3000, reload=True)
     #uvicorn app:app --reload --host 0.0.0.0 --port 3000
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Recursos estáticos del tablero: archivos con hash de contenido y atlas opcional.
+
+Las imágenes de `img/` y las 82 casillas de `mapaCuadritos/` se sirven desde
+memoria con un hash en el nombre, así que se pueden cachear como inmutables;
+los que ganan algo con gzip se guardan también comprimidos. Las casillas ya
+son PNG con paleta (1,27 MB en total): servirlas sueltas es sin pérdida y el
+navegador las descarga en paralelo.
+
+El atlas (una franja por fila del tablero, con las coordenadas de cada casilla
+en `/api/board`) es opcional. Con una paleta común de 256 colores ocupa ~0,9 MB
+con un error medio de ~3/255 por canal; sin paleta pasaría de 4 MB, más que las
+casillas sueltas. Se guarda en caché en disco para poder construirlo antes del
+despliegue en lugar de al arrancar.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import warnings
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from PIL import Image
+
+ATLAS_NAME = "board-atlas"
+MIN_GZIP_SAVING = 0.10    # Solo se guarda la versión gzip si ahorra al menos un 10%
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def hashed_name(name: str, digest: str) -> str:
+    """JugadorROJO.png -> JugadorROJO.<hash>.png"""
+    path = Path(name)
+    return f"{path.stem}.{digest}{path.suffix}"
+
+
+class Asset:
+    """Archivo servido desde memoria, con su variante gzip si compensa"""
+
+    __slots__ = ("name", "content", "gzipped", "media_type", "etag")
+
+    def __init__(self, name: str, content: bytes, media_type: Optional[str] = None):
+        self.name = name
+        self.content = content
+        self.media_type = media_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.etag = f'"{content_hash(content)}"'
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        self.gzipped = compressed if len(compressed) <= len(content) * (1 - MIN_GZIP_SAVING) else None
+
+
+class AssetStore:
+    """Recursos publicados bajo /assets/<nombre>.<hash>.<ext>"""
+
+    def __init__(self, url_prefix: str = "/assets"):
+        self.url_prefix = url_prefix
+        self.assets: Dict[str, Asset] = {}     # nombre con hash -> recurso
+        self.manifest: Dict[str, str] = {}     # nombre original -> URL con hash
+
+    def add(self, name: str, content: bytes, media_type: Optional[str] = None) -> str:
+        public_name = hashed_name(name, content_hash(content))
+        self.assets[public_name] = Asset(public_name, content, media_type)
+        url = f"{self.url_prefix}/{public_name}"
+        self.manifest[name] = url
+        return url
+
+    def add_directory(self, directory: Path, pattern: str = "*") -> int:
+        added = 0
+        for path in sorted(directory.glob(pattern)):
+            if path.is_file():
+                self.add(path.name, path.read_bytes())
+                added += 1
+        return added
+
+    def get(self, public_name: str) -> Optional[Asset]:
+        return self.assets.get(public_name)
+
+    def url(self, name: str) -> Optional[str]:
+        return self.manifest.get(name)
+
+
+def build_atlas(source_dir: Path, rows: Sequence[Sequence[int]], quantize: bool = False) -> Optional[Dict]:
+    """Empaqueta las casillas en un PNG (una franja por fila del tablero)"""
+    placements: Dict[int, List[int]] = {}
+    images = []
+    y = width = 0
+    for row in rows:
+        x = shelf_height = 0
+        for number in row:
+            path = source_dir / f"{number:02d}.png"
+            if not path.exists():
+                continue
+            image = Image.open(path)
+            image.load()
+            images.append((image, x, y))
+            placements[number] = [x, y, image.width, image.height]
+            x += image.width
+            shelf_height = max(shelf_height, image.height)
+        width = max(width, x)
+        y += shelf_height
+    if not images:
+        return None
+
+    atlas = Image.new("RGBA", (width, y), (0, 0, 0, 0))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # Paletas con transparencia: se convierten igual
+        for image, x, top in images:
+            atlas.paste(image.convert("RGBA"), (x, top))
+            image.close()
+
+    if quantize:
+        # Opcional y con pérdida: paleta adaptativa común a todas las casillas
+        atlas = atlas.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+    buffer = BytesIO()
+    atlas.save(buffer, format="PNG", optimize=True)
+    return {"png": buffer.getvalue(), "width": width, "height": y, "cells": placements}
+
+
+def source_fingerprint(source_dir: Path, quantize: bool = False) -> str:
+    """Huella de los archivos fuente (nombre, tamaño, fecha) y del modo para reutilizar el atlas"""
+    digest = hashlib.sha1(b"quantize;" if quantize else b"rgba;")
+    for path in sorted(source_dir.glob("[0-9][0-9].png")):
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_or_build_atlas(source_dir: Path, rows: Sequence[Sequence[int]], cache_dir: Path,
+                        quantize: bool = False) -> Optional[Dict]:
+    """Atlas desde la caché en disco si las fuentes no cambiaron; si no, se regenera"""
+    fingerprint = source_fingerprint(source_dir, quantize)
+    manifest_path = cache_dir / f"{ATLAS_NAME}.json"
+    png_path = cache_dir / f"{ATLAS_NAME}.png"
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("fingerprint") == fingerprint and png_path.exists():
+            manifest["png"] = png_path.read_bytes()
+            manifest["cells"] = {int(k): v for k, v in manifest["cells"].items()}
+            return manifest
+    except (OSError, json.JSONDecodeError, KeyError):
+        pass
+
+    atlas = build_atlas(source_dir, rows, quantize)
+    if atlas is None:
+        return None
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        png_path.write_bytes(atlas["png"])
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "width": atlas["width"], "height": atlas["height"],
+                       "cells": atlas["cells"]}, f)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el atlas en caché: {e}")
+    return atlas
@@ -0,0 +1,396 @@
+"""
+Benchmarks reproducibles del motor y de la API de Escaleras y Serpientes.
+
+Uso (desde backend/, con las dependencias de desarrollo: pip install -r requirements-dev.txt):
+    python benchmark.py                       # suite completa, resultados en benchmark_results.json
+    python benchmark.py --quick               # tamaños reducidos para una comprobación rápida
+    python benchmark.py --only moves,api      # solo algunos grupos
+    python benchmark.py --save-baseline       # guarda los resultados como referencia
+    python benchmark.py --baseline benchmark_baseline.json --fail-on-regression
+
+Todo se ejecuta en un directorio temporal: los archivos de estado y de logs
+del servidor real no se tocan. La API se mide en proceso con httpx y el
+transporte ASGI, sin red de por medio.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import httpx
+
+import app as server
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.20   # Empeorar más de un 20% cuenta como regresión
+GROUPS = ("moves", "generation", "api", "persistence", "logs")
+PLAYERS = [
+    {"name": f"Jugador {i + 1}", "color": color} for i, color in enumerate(server.PLAYER_COLORS)
+]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 en milisegundos"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(q):
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 4)
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def new_room(game_id: str, players: int, seed: int) -> server.GameRoom:
+    """Sala con partida iniciada y tablero reproducible"""
+    room = server.GameRoom(game_id)
+    room.game_state.clear_players()
+    for p in PLAYERS[:players]:
+        room.game_state.add_player(p["name"], p["color"], position=1)
+    room.game_state.game_started = True
+    room.game_state.start_time = datetime.utcnow()
+    server.generate_game_elements(room, seed)
+    return room
+
+
+# ============ GRUPOS DE BENCHMARKS ============
+def bench_moves(quick: bool) -> Dict:
+    """Throughput de move_player (sin HTTP): tirada, tabla compilada, diario y estadísticas"""
+    moves = 20_000 if quick else 200_000
+    room = new_room("bench-moves", 4, seed=1)
+    rng = random.Random(42)
+    victories = 0
+
+    start = time.perf_counter()
+    for i in range(moves):
+        counted = room.stats_epoch == room.epoch
+        result = server.move_player(room, rng.randint(1, 6))
+        server.record_stats(room, result, finished=result["victory"] is not None and not counted)
+        if result["victory"]:
+            victories += 1
+            room.game_state.positions[:room.game_state.count] = bytes([1]) * room.game_state.count
+        if i % 1000 == 0:
+            room.pending_events.clear()  # El escritor no corre aquí: evita acumular eventos
+    elapsed = time.perf_counter() - start
+    room.pending_events.clear()
+    return {
+        "moves": moves,
+        "games_finished": victories,
+        "moves_per_s": round(moves / elapsed, 1),
+        "us_per_move": round(elapsed / moves * 1e6, 3)
+    }
+
+
+def bench_generation(quick: bool) -> Dict:
+    """Tiempo de generate_game_elements con semilla (sin pool) y tasa de tableros en objetivo"""
+    boards = 30 if quick else 200
+    room = server.GameRoom("bench-generation")
+    times, in_target = [], 0
+    for seed in range(boards):
+        start = time.perf_counter()
+        board = server.generate_game_elements(room, seed)
+        times.append(time.perf_counter() - start)
+        in_target += bool(board.get("in_target"))
+    return {
+        "boards": boards,
+        "mean_ms": round(sum(times) / boards * 1000, 4),
+        **percentiles(times),
+        "success_rate": round(in_target / boards, 4)
+    }
+
+
+async def _api_load(client: httpx.AsyncClient, rooms: List[str], concurrency: int,
+                    requests_per_worker: int) -> Dict:
+    """Trabajadores concurrentes alternando movimientos y lecturas del tablero"""
+    latencies: Dict[str, List[float]] = {"move": [], "board": []}
+    errors = 0
+
+    async def worker(index: int):
+        nonlocal errors
+        game_id = rooms[index % len(rooms)]
+        etag = None
+        for i in range(requests_per_worker):
+            if i % 2 == 0:
+                kind = "move"
+                # Dado del servidor: "steps" se rechaza salvo con SERPIENTES_CLIENT_DICE=1
+                request = client.post("/api/game/move", params={"game_id": game_id}, json={})
+            else:
+                kind = "board"
+                headers = {"If-None-Match": etag} if etag and i % 4 == 1 else {}
+                request = client.get("/api/board", params={"game_id": game_id}, headers=headers)
+            start = time.perf_counter()
+            response = await request
+            latencies[kind].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            elif kind == "board":
+                etag = response.headers.get("etag", etag)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    total = sum(len(samples) for samples in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "requests_per_s": round(total / elapsed, 1),
+        "errors": errors,
+        "move": percentiles(latencies["move"]),
+        "board": percentiles(latencies["board"])
+    }
+
+
+async def _bench_api(quick: bool) -> Dict:
+    await server.startup_event()
+    try:
+        rooms = []
+        for i in range(8):
+            room = new_room(f"bench-api-{i}", 4, seed=100 + i)
+            server.registry.add(room)
+            rooms.append(room.game_id)
+        transport = httpx.ASGITransport(app=server.app)
+        results = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for concurrency in ((1, 16) if quick else (1, 16, 64)):
+                per_worker = (200 if quick else 1000) // max(concurrency // 8, 1)
+                results[f"c{concurrency}"] = await _api_load(client, rooms, concurrency, per_worker)
+        return results
+    finally:
+        await server.shutdown_event()
+
+
+def bench_api(quick: bool) -> Dict:
+    """Latencia de /api/game/move y /api/board con carga concurrente (ASGI en proceso)"""
+    return asyncio.run(_bench_api(quick))
+
+
+def bench_persistence(quick: bool) -> Dict:
+    """Guardado y carga de muchas salas de 6 jugadores con su diario de movimientos"""
+    room_count = 100 if quick else 1000
+    rooms = []
+    for i in range(room_count):
+        room = new_room(f"bench-state-{i}", 6, seed=i)
+        for _ in range(30):
+            server.move_player(room, 3)
+        rooms.append(room)
+
+    start = time.perf_counter()
+    for room in rooms:
+        server.GameStateManager.save_state(room)
+    save_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for room in rooms:
+        server.GameStateManager.append_journal(room.game_id, room.pending_events)
+        room.pending_events = []
+    journal_elapsed = time.perf_counter() - start
+
+    registry = server.GameRegistry()
+    start = time.perf_counter()
+    loaded = server.GameStateManager.load_state(registry)
+    load_elapsed = time.perf_counter() - start
+    return {
+        "rooms": room_count,
+        "loaded": loaded,
+        "save_ms_per_room": round(save_elapsed / room_count * 1000, 4),
+        "journal_ms_per_room": round(journal_elapsed / room_count * 1000, 4),
+        "load_all_s": round(load_elapsed, 4),
+        "load_ms_per_room": round(load_elapsed / max(loaded, 1) * 1000, 4)
+    }
+
+
+def _log_entry(i: int) -> Dict:
+    winner = server.PLAYER_COLORS[i % len(server.PLAYER_COLORS)] if i % 3 == 0 else None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "status": "finished" if winner else "in_progress",
+        "winner": winner,
+        "players": PLAYERS[:4],
+        "total_turns": 20 + i % 40,
+        "message": f"Partida de prueba {i}"
+    }
+
+
+def bench_logs(quick: bool) -> Dict:
+    """Ingesta por lotes y consultas del índice de logs a distintos tamaños de archivo"""
+    results = {}
+    for size_mb in ((1, 5) if quick else (1, 5, 50)):
+        if server.LOG_FILE.exists():
+            server.LOG_FILE.unlink()
+        server.log_store.reset()
+        writer = server.LogWriter(max_bytes=10 ** 12)  # Sin rotación: se mide el tamaño pedido
+        target = size_mb * 1024 * 1024
+        written = 0
+        start = time.perf_counter()
+        while writer._size < target:
+            batch = [_log_entry(written + k) for k in range(server.LOG_BATCH_SIZE)]
+            writer._write_batch(batch)
+            written += len(batch)
+        ingest_elapsed = time.perf_counter() - start
+        writer._close()
+
+        # Índice reconstruido desde cero, como tras un reinicio
+        server.log_store.reset()
+        start = time.perf_counter()
+        server.log_store.refresh()
+        index_elapsed = time.perf_counter() - start
+
+        queries = {}
+        for name, kwargs in (
+            ("latest_page", {"limit": 50}),
+            ("filter_winner", {"limit": 50, "winner": "AZUL"}),
+            ("filter_rare", {"limit": 50, "status": "unknown"})   # Recorre todo el índice
+        ):
+            times = []
+            for _ in range(5 if quick else 20):
+                start = time.perf_counter()
+                server.log_store.query(**kwargs)
+                times.append(time.perf_counter() - start)
+            queries[name] = percentiles(times)
+
+        results[f"{size_mb}mb"] = {
+            "entries": written,
+            "ingest_entries_per_s": round(written / ingest_elapsed, 1),
+            "index_build_s": round(index_elapsed, 4),
+            "query": queries
+        }
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[bool], Dict]] = {
+    "moves": bench_moves,
+    "generation": bench_generation,
+    "api": bench_api,
+    "persistence": bench_persistence,
+    "logs": bench_logs
+}
+
+
+# ============ COMPARACIÓN CON LA REFERENCIA ============
+def flatten(data: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def metric_direction(name: str) -> int:
+    """+1 si más es mejor, -1 si menos es mejor, 0 si es solo informativo"""
+    leaf = name.rsplit(".", 1)[-1]
+    if leaf.endswith("_per_s") or leaf == "success_rate":
+        return 1
+    if leaf.endswith(("_ms", "_s", "_per_move")) or leaf.startswith("us_"):
+        return -1
+    return 0
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Cambios relativos frente a la referencia; marca las regresiones por encima del umbral"""
+    current, previous = flatten(results["results"]), flatten(baseline["results"])
+    rows = []
+    for name, value in current.items():
+        direction = metric_direction(name)
+        old = previous.get(name)
+        if not direction or not old:
+            continue
+        change = (value - old) / old
+        rows.append({
+            "metric": name,
+            "baseline": old,
+            "current": value,
+            "change": round(change, 4),
+            "regression": change * direction < -threshold
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict]):
+    for row in rows:
+        mark = "❌" if row["regression"] else "  "
+        print(f"{mark} {row['metric']:<45} {row['baseline']:>12g} → {row['current']:>12g} ({row['change']:+.1%})")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks del juego de Escaleras y Serpientes")
+    parser.add_argument("--quick", action="store_true", help="tamaños reducidos")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"grupos separados por comas ({', '.join(GROUPS)})")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="archivo JSON de resultados")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="resultados de referencia")
+    parser.add_argument("--save-baseline", action="store_true", help="guardar los resultados como referencia")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="umbral de regresión (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="salir con código 1 si hay regresiones")
+    args = parser.parse_args(argv)
+
+    groups = [g.strip() for g in args.only.split(",") if g.strip()]
+    unknown = set(groups) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"grupos desconocidos: {', '.join(sorted(unknown))}")
+
+    output = Path(args.output).resolve()
+    baseline_path = Path(args.baseline).resolve()
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick
+        },
+        "results": {}
+    }
+
+    workdir = Path(tempfile.mkdtemp(prefix="serpientes-bench-"))
+    original_cwd = os.getcwd()
+    try:
+        for group in groups:
+            print(f"⏱️  {group}...", flush=True)
+            # Las rutas del servidor son relativas: cada grupo trabaja en su propio temporal
+            (workdir / group).mkdir()
+            os.chdir(workdir / group)
+            with contextlib.redirect_stdout(io.StringIO()):
+                results["results"][group] = BENCHMARKS[group](args.quick)
+            print(json.dumps(results["results"][group], ensure_ascii=False, indent=2))
+    finally:
+        os.chdir(original_cwd)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"📄 Resultados guardados en {output}")
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📌 Referencia guardada en {baseline_path}")
+        return 0
+
+    if baseline_path.exists():
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("quick") != args.quick:
+            print("⚠️ La referencia se tomó con otro tamaño (--quick): la comparación no es fiable")
+        rows = compare(results, baseline, args.threshold)
+        print_comparison(rows)
+        regressions = [row for row in rows if row["regression"]]
+        print(f"{'❌' if regressions else '✅'} {len(regressions)} regresión(es) sobre {len(rows)} métricas")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
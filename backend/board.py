@@ -0,0 +1,205 @@
+"""
+Generación y compilación de tableros de Escaleras y Serpientes.
+
+Construye tableros válidos en tiempo acotado a partir del conjunto de casillas
+libres (sin reintentos al azar) y, si se pide, elige entre varios candidatos
+el que mejor se ajusta a una duración de partida objetivo.
+
+Cada tablero se compila a dos tablas planas de MAX_CELL + 1 bytes (destino y
+código de efecto) que usan por igual la API, el simulador y el analizador.
+"""
+import json
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from analysis import expected_turns_from
+
+LADDER_LENGTH = (10, 25)   # Casillas que sube una escalera
+SNAKE_LENGTH = (5, 20)     # Casillas que baja una serpiente
+LADDER_MIN_START = 5
+SNAKE_MIN_START = 15
+GOAL_MARGIN = 20           # Ningún elemento empieza en las últimas 20 casillas
+
+# Código de efecto por casilla: tipo en el nibble alto, índice de virtud/pecado en el bajo
+EFFECT_NONE = 0x00
+EFFECT_LADDER = 0x10
+EFFECT_SNAKE = 0x20
+EFFECT_KIND_MASK = 0xF0
+EFFECT_INDEX_MASK = 0x0F
+
+
+class CompiledBoard:
+    """Tablero compilado: la casilla en la que se cae indexa destino y efecto"""
+
+    __slots__ = ("max_cell", "dest", "effect")
+
+    def __init__(self, max_cell: int, dest: bytes, effect: bytes):
+        self.max_cell = max_cell
+        self.dest = dest
+        self.effect = effect
+
+    def resolve(self, position: int, steps: int) -> Tuple[int, int, int]:
+        """(casilla alcanzada, casilla final, código de efecto) para una tirada"""
+        landing = position + steps
+        if landing > self.max_cell:
+            landing = self.max_cell
+        return landing, self.dest[landing], self.effect[landing]
+
+
+def compile_board(ladders: Dict, snakes: Dict, max_cell: int,
+                  virtues: Sequence[str], sins: Sequence[str]) -> CompiledBoard:
+    """Compila escaleras y serpientes a tablas de bytes (82 casillas caben en un byte)"""
+    if max_cell > 255:
+        raise ValueError("El tablero compilado admite como máximo 255 casillas")
+    dest = bytearray(range(max_cell + 1))
+    effect = bytearray(max_cell + 1)
+    for start, ladder in ladders.items():
+        dest[int(start)] = ladder["end"]
+        virtue = ladder.get("virtue")
+        effect[int(start)] = EFFECT_LADDER | (virtues.index(virtue) if virtue in virtues else EFFECT_INDEX_MASK)
+    for start, snake in snakes.items():
+        dest[int(start)] = snake["end"]
+        sin = snake.get("sin")
+        effect[int(start)] = EFFECT_SNAKE | (sins.index(sin) if sin in sins else EFFECT_INDEX_MASK)
+    return CompiledBoard(max_cell, bytes(dest), bytes(effect))
+
+
+def new_seed() -> int:
+    """Semilla aleatoria para tableros no reproducidos explícitamente"""
+    return random.SystemRandom().getrandbits(32)
+
+
+def _place(rng: random.Random, free: set, starts: Sequence[int], count: int,
+           end_range) -> List[Tuple[int, int]]:
+    """Coloca hasta `count` elementos usando solo casillas libres (una pasada)"""
+    placed = []
+    for start in starts:
+        if len(placed) == count:
+            break
+        if start not in free:
+            continue
+        ends = [end for end in end_range(start) if end in free and end != start]
+        if not ends:
+            continue
+        end = rng.choice(ends)
+        # Inicio y fin quedan ocupados: imposible encadenar elementos
+        free.discard(start)
+        free.discard(end)
+        placed.append((start, end))
+    return placed
+
+
+def generate_layout(rng: random.Random, max_cell: int, virtues: Sequence[str], sins: Sequence[str],
+                    ladder_count: int = 6, snake_count: int = 6) -> Tuple[Dict, Dict]:
+    """Genera un tablero válido: cada casilla participa como mucho en un elemento"""
+    free = set(range(2, max_cell))  # La salida y la meta nunca tienen elementos
+    last_start = max_cell - GOAL_MARGIN
+
+    ladder_starts = list(range(LADDER_MIN_START, last_start + 1))
+    snake_starts = list(range(SNAKE_MIN_START, last_start + 1))
+    rng.shuffle(ladder_starts)
+    rng.shuffle(snake_starts)
+
+    ladder_cells = _place(
+        rng, free, ladder_starts, ladder_count,
+        lambda start: range(start + LADDER_LENGTH[0], min(start + LADDER_LENGTH[1], max_cell - 1) + 1)
+    )
+    snake_cells = _place(
+        rng, free, snake_starts, snake_count,
+        lambda start: range(max(start - SNAKE_LENGTH[1], 2), start - SNAKE_LENGTH[0] + 1)
+    )
+    if len(ladder_cells) < ladder_count or len(snake_cells) < snake_count:
+        raise ValueError("El tablero no tiene casillas libres suficientes")
+
+    ladders = {start: {"end": end, "virtue": rng.choice(virtues)} for start, end in ladder_cells}
+    snakes = {start: {"end": end, "sin": rng.choice(sins)} for start, end in snake_cells}
+    return ladders, snakes
+
+
+def _score(turns: float, target_turns: Optional[Tuple[float, float]]) -> float:
+    """Menor es mejor: dentro del rango cuenta la distancia al centro; fuera, penaliza"""
+    if target_turns is None:
+        return 0.0
+    low, high = target_turns
+    score = abs(turns - (low + high) / 2)
+    if not low <= turns <= high:
+        score += 1000 + min(abs(turns - low), abs(turns - high))
+    return score
+
+
+def generate_board(max_cell: int, virtues: Sequence[str], sins: Sequence[str],
+                   seed: Optional[int] = None, target_turns: Optional[Tuple[float, float]] = None,
+                   candidates: int = 1, ladder_count: int = 6, snake_count: int = 6) -> Dict:
+    """Genera `candidates` tableros con la semilla dada y devuelve el mejor para el objetivo"""
+    seed = new_seed() if seed is None else seed
+    rng = random.Random(seed)
+    best = None
+
+    for _ in range(max(candidates, 1)):
+        ladders, snakes = generate_layout(rng, max_cell, virtues, sins, ladder_count, snake_count)
+        turns = expected_turns_from(compile_board(ladders, snakes, max_cell, virtues, sins))
+        score = _score(turns, target_turns)
+        if best is None or score < best["score"]:
+            best = {"ladders": ladders, "snakes": snakes, "expected_turns": turns, "score": score}
+        if target_turns is None:
+            break
+
+    return {
+        "ladders": best["ladders"],
+        "snakes": best["snakes"],
+        "seed": seed,
+        "expected_turns": round(best["expected_turns"], 3),
+        "in_target": target_turns is None or target_turns[0] <= best["expected_turns"] <= target_turns[1]
+    }
+
+
+def validate_layout(ladders: Dict, snakes: Dict, max_cell: int, allow_chains: bool = False):
+    """Comprueba límites y sentido; sin `allow_chains` ninguna casilla se comparte"""
+    starts, used = set(), set()
+    for kind, elements, goes_up in (("escalera", ladders, True), ("serpiente", snakes, False)):
+        for start, element in elements.items():
+            start, end = int(start), int(element["end"])
+            if not (1 < start < max_cell and 1 <= end <= max_cell):
+                raise ValueError(f"{kind} {start}->{end} fuera del tablero")
+            if (end > start) != goes_up:
+                raise ValueError(f"{kind} {start}->{end} en sentido incorrecto")
+            if start in starts:
+                raise ValueError(f"{kind} {start}->{end} empieza en una casilla ya ocupada")
+            if not allow_chains and (start in used or end in used):
+                raise ValueError(f"{kind} {start}->{end} comparte casilla con otro elemento")
+            starts.add(start)
+            used.update((start, end))
+
+
+def layout_from_pairs(data: Dict, virtues: Sequence[str], sins: Sequence[str]) -> Tuple[Dict, Dict]:
+    """Convierte {"ladders": {"5": 25}, "snakes": {...}} al formato del juego"""
+    def ordered(pairs):
+        return sorted((pairs or {}).items(), key=lambda kv: int(kv[0]))
+
+    ladders = {
+        int(start): {"end": int(end), "virtue": virtues[i % len(virtues)]}
+        for i, (start, end) in enumerate(ordered(data.get("ladders")))
+    }
+    snakes = {
+        int(start): {"end": int(end), "sin": sins[i % len(sins)]}
+        for i, (start, end) in enumerate(ordered(data.get("snakes")))
+    }
+    return ladders, snakes
+
+
+def load_layout_file(path, max_cell: int, virtues: Sequence[str], sins: Sequence[str]) -> Dict:
+    """Lee un tablero con el formato de snakes_ladders.json ({"ladders": {"5": 25}, ...})"""
+    with open(path, "r", encoding="utf-8") as f:
+        # El formato admite líneas de comentario estilo // al inicio
+        text = "".join(line for line in f if not line.lstrip().startswith("//"))
+    ladders, snakes = layout_from_pairs(json.loads(text), virtues, sins)
+
+    # Los tableros diseñados a mano pueden encadenar elementos a propósito
+    validate_layout(ladders, snakes, max_cell, allow_chains=True)
+    return {
+        "ladders": ladders,
+        "snakes": snakes,
+        "seed": None,
+        "expected_turns": round(expected_turns_from(compile_board(ladders, snakes, max_cell, virtues, sins)), 3),
+        "source": str(path)
+    }
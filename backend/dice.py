@@ -0,0 +1,88 @@
+"""
+Dados del servidor: un flujo pseudoaleatorio reproducible por partida.
+
+Cada partida tiene su propio generador SplitMix64, cuyo estado completo es un
+entero de 64 bits: se guarda con el snapshot y no comparte nada con el módulo
+`random` global, así que no hay contención entre salas. El estado avanza una
+constante por tirada, de modo que `skip` salta las tiradas ya reaplicadas del
+diario con una multiplicación. Las tiradas se sortean por lotes vectorizados
+con NumPy: de 64 en 64 para las partidas en vivo (`roll`) y de una ronda
+entera para la simulación masiva (`draw`); los dos caminos dan la misma
+secuencia para la misma semilla.
+"""
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+DICE_FACES = 6
+BATCH_SIZE = 64           # Tiradas que se generan de una vez para las partidas en vivo
+GAMMA = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+
+_GAMMA_U64 = np.uint64(GAMMA)
+_SHIFTS = (np.uint64(30), np.uint64(27), np.uint64(31), np.uint64(32))
+_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+def new_seed() -> int:
+    """Semilla de 64 bits del sistema operativo"""
+    return int.from_bytes(os.urandom(8), "big")
+
+
+def draw_batch(state: int, count: int) -> np.ndarray:
+    """Las `count` tiradas siguientes a `state`, vectorizadas (uint8)"""
+    with np.errstate(over="ignore"):
+        z = np.uint64(state) + _GAMMA_U64 * np.arange(1, count + 1, dtype=np.uint64)
+        z = (z ^ (z >> _SHIFTS[0])) * _MUL1
+        z = (z ^ (z >> _SHIFTS[1])) * _MUL2
+        z ^= z >> _SHIFTS[2]
+        return (((z >> _SHIFTS[3]) * np.uint64(DICE_FACES)) >> _SHIFTS[3]).astype(np.uint8) + 1
+
+
+class DiceStream:
+    """Dado de una partida: semilla, estado y tiradas consumidas"""
+
+    __slots__ = ("seed", "state", "rolled", "_buffer", "_offset")
+
+    def __init__(self, seed: Optional[int] = None, state: Optional[int] = None, rolled: int = 0):
+        self.seed = new_seed() if seed is None else seed & MASK64
+        self.state = self.seed if state is None else state & MASK64
+        self.rolled = rolled
+        self._buffer = b""
+        self._offset = 0
+
+    def roll(self) -> int:
+        """Siguiente tirada; se sirve de un lote pre-generado"""
+        if self._offset >= len(self._buffer):
+            self._buffer = draw_batch(self.state, BATCH_SIZE).tobytes()
+            self._offset = 0
+        value = self._buffer[self._offset]
+        self._offset += 1
+        self.state = (self.state + GAMMA) & MASK64
+        self.rolled += 1
+        return value
+
+    def draw(self, count: int) -> np.ndarray:
+        """Las `count` tiradas siguientes de golpe (uint8), para simular partidas en bloque"""
+        rolls = draw_batch(self.state, count)
+        self.skip(count)
+        return rolls
+
+    def skip(self, count: int):
+        """Avanza `count` tiradas sin generarlas (al reaplicar el diario)"""
+        if count:
+            self.state = (self.state + GAMMA * count) & MASK64
+            self.rolled += count
+            self._buffer = b""
+            self._offset = 0
+
+    def to_dict(self) -> Dict:
+        return {"seed": self.seed, "state": self.state, "rolled": self.rolled}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "DiceStream":
+        if not data:
+            return cls()
+        return cls(data["seed"], data.get("state"), data.get("rolled", 0))
@@ -0,0 +1,106 @@
+"""
+Representación compacta en memoria del estado de una partida.
+
+Los modelos Pydantic (`Player`, `GameState`) solo se usan en los bordes: al
+validar las peticiones y al leer un snapshot. Dentro del servidor cada
+partida es un GameRecord con `__slots__`: posiciones en un bytearray (82
+casillas caben en un byte), estadísticas en arrays de tamaño fijo para los 6
+jugadores posibles y textos internados (colores y avatares se comparten
+entre todas las partidas). `move_player` muta esos arrays directamente.
+"""
+import sys
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional
+
+MAX_PLAYERS = 6
+
+
+class GameRecord:
+    """Estado de una partida: jugadores por índice en arrays paralelos"""
+
+    __slots__ = ("count", "positions", "ladders", "snakes", "names", "colors", "avatars",
+                 "current_player_index", "total_turns", "ladders_climbed", "snakes_found",
+                 "game_started", "start_time")
+
+    def __init__(self):
+        self.count = 0
+        self.positions = bytearray(MAX_PLAYERS)
+        self.ladders = array("I", bytes(4 * MAX_PLAYERS))
+        self.snakes = array("I", bytes(4 * MAX_PLAYERS))
+        self.names: List[str] = []
+        self.colors: List[str] = []
+        self.avatars: List[str] = []
+        self.current_player_index = 0
+        self.total_turns = 0
+        self.ladders_climbed = 0
+        self.snakes_found = 0
+        self.game_started = False
+        self.start_time: Optional[datetime] = None
+
+    def add_player(self, name: str, color: str, avatar: str = "", position: int = 0,
+                   ladders: int = 0, snakes: int = 0) -> int:
+        """Añade un jugador al final y devuelve su índice"""
+        if self.count >= MAX_PLAYERS:
+            raise ValueError(f"Máximo {MAX_PLAYERS} jugadores")
+        index = self.count
+        self.positions[index] = position
+        self.ladders[index] = ladders
+        self.snakes[index] = snakes
+        self.names.append(name)
+        self.colors.append(sys.intern(color))
+        self.avatars.append(sys.intern(avatar))
+        self.count += 1
+        return index
+
+    def pop_player(self) -> Dict:
+        """Quita el último jugador y lo devuelve como dict"""
+        index = self.count - 1
+        player = self.player_dict(index)
+        self.names.pop()
+        self.colors.pop()
+        self.avatars.pop()
+        self.positions[index] = self.ladders[index] = self.snakes[index] = 0
+        self.count -= 1
+        return player
+
+    def clear_players(self):
+        while self.count:
+            self.pop_player()
+
+    def player_dict(self, index: int) -> Dict:
+        """Mismo contenido que `Player.dict()`"""
+        return {
+            "name": self.names[index],
+            "color": self.colors[index],
+            "position": self.positions[index],
+            "stats": {"ladders": self.ladders[index], "snakes": self.snakes[index]},
+            "avatar": self.avatars[index]
+        }
+
+    def to_dict(self) -> Dict:
+        """Mismo contenido que `GameState.dict()` (formato del snapshot)"""
+        return {
+            "players": [self.player_dict(i) for i in range(self.count)],
+            "current_player_index": self.current_player_index,
+            "total_turns": self.total_turns,
+            "ladders_climbed": self.ladders_climbed,
+            "snakes_found": self.snakes_found,
+            "game_started": self.game_started,
+            "start_time": self.start_time
+        }
+
+    @classmethod
+    def from_model(cls, game_state) -> "GameRecord":
+        """Registro compacto a partir de un `GameState` ya validado"""
+        record = cls()
+        for player in game_state.players:
+            record.add_player(player.name, player.color, player.avatar, player.position,
+                              player.stats.ladders, player.stats.snakes)
+        record.current_player_index = game_state.current_player_index
+        record.total_turns = game_state.total_turns
+        record.ladders_climbed = game_state.ladders_climbed
+        record.snakes_found = game_state.snakes_found
+        record.game_started = game_state.game_started
+        record.start_time = game_state.start_time
+        return record
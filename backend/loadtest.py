@@ -0,0 +1,262 @@
+"""
+Prueba de carga con jugadores simulados concurrentes.
+
+Cada cliente simulado juega partidas completas con el flujo real de la API:
+inicia la partida, mueve con el dado del servidor, consulta el estado cada
+pocos movimientos y guarda el log al terminar. Al final se informa por
+endpoint del número de peticiones, rendimiento, latencias p50/p95/p99 y tasa
+de errores.
+
+Uso (desde backend/, con las dependencias de desarrollo: pip install -r requirements-dev.txt):
+    python loadtest.py                               # app en proceso (ASGI), 50 clientes, 30 s
+    python loadtest.py --clients 200 --duration 60
+    python loadtest.py --target http://localhost:3000  # servidor uvicorn ya arrancado
+    python app.py loadtest --clients 100             # mismo comando desde el punto de entrada del servidor
+
+Contra la app en proceso todo se ejecuta en un directorio temporal, así que
+los archivos de estado y de logs del servidor real no se tocan.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+DEFAULT_CLIENTS = 50
+DEFAULT_DURATION_S = 30.0
+DEFAULT_POLL_EVERY = 3      # Consultas de estado: una cada N movimientos
+MAX_MOVES_PER_GAME = 500    # Partidas que no terminan se cierran como abandonadas
+COLORS = ["ROJO", "VERDE", "NARANJA", "MORADO", "AMARILLO", "AZUL"]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 y máximo en milisegundos"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(q):
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+class LoadStats:
+    """Latencias y errores por endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.games_finished = 0
+        self.games_abandoned = 0
+
+    def record(self, endpoint: str, elapsed: float, error: Optional[str] = None):
+        self.latencies[endpoint].append(elapsed)
+        if error is not None:
+            self.errors[endpoint][error] += 1
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            failed = sum(self.errors[endpoint].values())
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "requests_per_s": round(len(samples) / elapsed, 1),
+                "error_rate": round(failed / len(samples), 4),
+                "errors": dict(self.errors[endpoint]),
+                **percentiles(samples)
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        failed = sum(sum(errors.values()) for errors in self.errors.values())
+        return {
+            "duration_s": round(elapsed, 2),
+            "requests": total,
+            "requests_per_s": round(total / elapsed, 1) if elapsed else 0.0,
+            "error_rate": round(failed / total, 4) if total else 0.0,
+            "games_finished": self.games_finished,
+            "games_abandoned": self.games_abandoned,
+            "latency": percentiles([s for samples in self.latencies.values() for s in samples]),
+            "endpoints": endpoints
+        }
+
+
+class SimulatedPlayer:
+    """Un cliente que juega partidas completas en su propia sala"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: LoadStats, index: int, run_id: str,
+                 poll_every: int, think_s: float, rng: random.Random):
+        self.client = client
+        self.stats = stats
+        self.game_id = f"lt-{run_id}-{index}"
+        self.poll_every = poll_every
+        self.think_s = think_s
+        self.rng = rng
+
+    async def call(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[Dict]:
+        """Petición medida; None si falla (el error queda contado)"""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(endpoint, time.perf_counter() - start, type(e).__name__)
+            return None
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            self.stats.record(endpoint, elapsed, str(response.status_code))
+            return None
+        self.stats.record(endpoint, elapsed)
+        return response.json()
+
+    async def play_game(self):
+        players = self.rng.randint(2, 6)
+        body = {"players": [{"name": f"Bot {i + 1}", "color": color}
+                            for i, color in enumerate(COLORS[:players])]}
+        # El endpoint de inicio es un GET con cuerpo JSON, como lo usa el frontend
+        if await self.call("start", "GET", "/api/game/start", params={"game_id": self.game_id}, json=body) is None:
+            return
+
+        victory = None
+        moves = 0
+        while victory is None and moves < MAX_MOVES_PER_GAME:
+            result = await self.call("move", "POST", "/api/game/move", params={"game_id": self.game_id}, json={})
+            moves += 1
+            if result is not None:
+                victory = result.get("victory")
+            if moves % self.poll_every == 0:
+                await self.call("state", "GET", "/api/game/state", params={"game_id": self.game_id})
+            if self.think_s:
+                await asyncio.sleep(self.think_s)
+
+        state = await self.call("state", "GET", "/api/game/state", params={"game_id": self.game_id})
+        positions = {p["color"]: p["position"] for p in state["players"]} if state else {}
+        await self.call("save_log", "POST", "/api/game/save_log", json={
+            "status": "finished" if victory else "abandoned",
+            "coordinates": positions,
+            "winner": victory["winner"] if victory else None
+        })
+        if victory:
+            self.stats.games_finished += 1
+        else:
+            self.stats.games_abandoned += 1
+
+    async def run(self, deadline: float, games: Optional[int]):
+        played = 0
+        while time.perf_counter() < deadline and (games is None or played < games):
+            await self.play_game()
+            played += 1
+
+
+async def run_load(client: httpx.AsyncClient, clients: int, duration: float, games: Optional[int],
+                   poll_every: int, think_s: float, ramp_up: float, seed: Optional[int]) -> Dict:
+    stats = LoadStats()
+    rng = random.Random(seed)
+    run_id = f"{rng.getrandbits(24):06x}"
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def launch(index: int):
+        # Arranque escalonado para no medir solo la avalancha inicial
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / clients)
+        player = SimulatedPlayer(client, stats, index, run_id, poll_every, think_s,
+                                 random.Random(rng.getrandbits(32)))
+        await player.run(deadline, games)
+
+    await asyncio.gather(*(launch(i) for i in range(clients)))
+    report = stats.report(time.perf_counter() - start)
+    report["clients"] = clients
+    return report
+
+
+async def run_in_process(args) -> Dict:
+    """Carga contra la app ASGI en este mismo proceso (sin red)"""
+    import app as server
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        await server.startup_event()
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        limits = httpx.Limits(max_connections=None)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits) as client:
+            return await run_load(client, args.clients, args.duration, args.games,
+                                  args.poll_every, args.think_ms / 1000, args.ramp_up, args.seed)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await server.shutdown_event()
+
+
+async def run_remote(args) -> Dict:
+    """Carga contra un servidor ya arrancado (por ejemplo uvicorn en local)"""
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.target, limits=limits, timeout=args.timeout) as client:
+        return await run_load(client, args.clients, args.duration, args.games,
+                              args.poll_every, args.think_ms / 1000, args.ramp_up, args.seed)
+
+
+def print_report(report: Dict):
+    print(f"👥 {report['clients']} clientes · {report['duration_s']} s · "
+          f"{report['requests']} peticiones ({report['requests_per_s']}/s) · "
+          f"errores {report['error_rate']:.2%}")
+    print(f"🏁 Partidas terminadas: {report['games_finished']} · abandonadas: {report['games_abandoned']}")
+    print(f"{'endpoint':<10} {'peticiones':>10} {'/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for endpoint, row in report["endpoints"].items():
+        print(f"{endpoint:<10} {row['requests']:>10} {row['requests_per_s']:>9} {row.get('p50_ms', 0):>9} "
+              f"{row.get('p95_ms', 0):>9} {row.get('p99_ms', 0):>9} {row['error_rate']:>8.2%}")
+        for error, count in row["errors"].items():
+            print(f"   ⚠️ {error}: {count}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga del juego de Escaleras y Serpientes")
+    parser.add_argument("--target", default="asgi", help="'asgi' (app en proceso) o URL base, p. ej. http://localhost:3000")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help="jugadores simulados concurrentes")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_S, help="segundos de carga")
+    parser.add_argument("--games", type=int, default=None, help="partidas por cliente (por defecto, hasta agotar el tiempo)")
+    parser.add_argument("--poll-every", type=int, default=DEFAULT_POLL_EVERY, help="consultar el estado cada N movimientos")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pausa entre movimientos de cada cliente")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="segundos para arrancar todos los clientes")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout por petición (solo con URL)")
+    parser.add_argument("--seed", type=int, default=None, help="semilla de los clientes simulados")
+    parser.add_argument("--output", default=None, help="guardar el informe en un archivo JSON")
+    args = parser.parse_args(argv)
+    if args.clients < 1 or args.poll_every < 1:
+        parser.error("--clients y --poll-every deben ser al menos 1")
+
+    print(f"🚦 Prueba de carga contra {'la app en proceso' if args.target == 'asgi' else args.target}...", flush=True)
+    if args.target == "asgi":
+        # Las rutas del servidor son relativas: el estado de la prueba va a un temporal
+        workdir = tempfile.mkdtemp(prefix="serpientes-load-")
+        original_cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            report = asyncio.run(run_in_process(args))
+        finally:
+            os.chdir(original_cwd)
+    else:
+        report = asyncio.run(run_remote(args))
+
+    report["meta"] = {"timestamp": datetime.utcnow().isoformat(), "target": args.target,
+                      "poll_every": args.poll_every, "think_ms": args.think_ms}
+    print_report(report)
+    if args.output:
+        output = Path(args.output).resolve()
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 Informe guardado en {output}")
+    return 1 if report["requests"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
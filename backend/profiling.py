@@ -0,0 +1,160 @@
+"""
+Perfilado opcional de las rutas calientes del servidor.
+
+Las funciones decoradas con `Profiler.profile(nombre)` cuestan una comprobación
+de un booleano mientras el perfilado está apagado. Encendido, se mide una de
+cada N llamadas (tiempo de pared y, si se pide, memoria con tracemalloc); las
+muestras se guardan en memoria para el resumen y se vuelcan por lotes a un
+archivo JSONL local.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+import tracemalloc
+from collections import deque
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SAMPLES_PER_NAME = 2000   # Muestras recientes por función usadas en el resumen
+FLUSH_INTERVAL_S = 5.0    # Cada cuánto se vuelcan las muestras al archivo
+
+
+class Profiler:
+    """Muestreo de tiempos y memoria por función, activable en caliente"""
+
+    def __init__(self, path: Path, sample_rate: float = 0.1):
+        self.path = path
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.trace_memory = False
+        self._lock = threading.Lock()
+        self._recent: Dict[str, deque] = {}
+        self._calls: Dict[str, int] = {}
+        self._pending: List[Dict] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                  trace_memory: Optional[bool] = None):
+        if sample_rate is not None:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+        if enabled is not None:
+            self.enabled = enabled
+        # tracemalloc ralentiza todas las asignaciones: solo mientras se use
+        wants_tracing = self.enabled and self.trace_memory
+        if wants_tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not wants_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def profile(self, name: str):
+        """Decorador para funciones síncronas"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._lock:
+                    self._calls[name] = self._calls.get(name, 0) + 1
+                if random.random() >= self.sample_rate:
+                    return func(*args, **kwargs)
+
+                tracing = tracemalloc.is_tracing()
+                if tracing:
+                    memory_before = tracemalloc.get_traced_memory()[0]
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    # Aproximado: la memoria trazada es global al proceso (incluye otros hilos)
+                    allocated = tracemalloc.get_traced_memory()[0] - memory_before if tracing else None
+                    self._record(name, elapsed, allocated)
+            return wrapper
+        return decorator
+
+    def _record(self, name: str, elapsed: float, allocated: Optional[int]):
+        sample = {"name": name, "ts": time.time(), "seconds": round(elapsed, 7)}
+        if allocated is not None:
+            sample["alloc_bytes"] = allocated
+        with self._lock:
+            recent = self._recent.get(name)
+            if recent is None:
+                recent = self._recent[name] = deque(maxlen=SAMPLES_PER_NAME)
+            recent.append((elapsed, allocated))
+            self._pending.append(sample)
+
+    def flush(self) -> int:
+        """Añade las muestras pendientes al archivo (se llama desde un hilo)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(sample, separators=(",", ":")) + "\n" for sample in pending))
+        except OSError as e:
+            print(f"⚠️ Error guardando muestras de perfilado: {e}")
+        return len(pending)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_S)
+            await asyncio.to_thread(self.flush)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene el volcado periódico escribiendo las últimas muestras"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._calls.clear()
+            self._pending.clear()
+
+    def summary(self) -> Dict:
+        """Percentiles de las muestras recientes de cada función"""
+        with self._lock:
+            recent = {name: list(samples) for name, samples in self._recent.items()}
+            calls = dict(self._calls)
+
+        functions = {}
+        for name, samples in recent.items():
+            times = sorted(elapsed for elapsed, _ in samples)
+            allocations = [allocated for _, allocated in samples if allocated is not None]
+
+            def pick(q):
+                return round(times[min(int(q * len(times)), len(times) - 1)] * 1000, 4)
+
+            functions[name] = {
+                "calls": calls.get(name, 0),
+                "samples": len(times),
+                "mean_ms": round(sum(times) / len(times) * 1000, 4),
+                "p50_ms": pick(0.50),
+                "p95_ms": pick(0.95),
+                "p99_ms": pick(0.99),
+                "max_ms": round(times[-1] * 1000, 4),
+                "mean_alloc_bytes": round(sum(allocations) / len(allocations)) if allocations else None
+            }
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "trace_memory": self.trace_memory,
+            "samples_file": str(self.path),
+            "functions": functions
+        }
@@ -0,0 +1,290 @@
+"""
+Repeticiones compactas de partidas y canal de espectadores.
+
+Una partida se codifica como una cabecera (semilla, jugadores y casillas con
+escalera o serpiente) seguida de un byte por tirada: jugador en los bits
+altos y dado en los 3 bajos. Como el tablero compilado determina el destino
+de cada tirada, avanzar hasta el turno N solo recorre esos bytes.
+
+Los cambios de jugadores a mitad de partida van en la misma secuencia con
+los valores del dado que no existen: 7 añade un jugador (seguido de su color
+y casilla inicial) y 0 quita uno. Así la repetición siempre coincide con la
+partida aunque se añadan y quiten jugadores.
+
+El registro en vivo (ReplayFeed) es de solo-añadir: `move_player` añade un
+byte y despierta a los espectadores, que leen la secuencia sin tomar el lock
+de la sala; cada lote de movimientos nuevos se codifica una sola vez para
+todos ellos.
+"""
+import asyncio
+import base64
+import struct
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from board import CompiledBoard, EFFECT_KIND_MASK, EFFECT_LADDER, EFFECT_SNAKE
+
+MAGIC = b"SRP"
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)           # La versión 1 no tiene cambios de jugadores: se lee igual
+HEADER = struct.Struct(">3sBBBQB")   # magic, versión, max_cell, jugadores, semilla, elementos
+NO_SEED = 0xFFFF_FFFF_FFFF_FFFF      # Tablero sin semilla (diseñado a mano o semilla fuera de rango)
+NO_COLOR = 0xFF
+STEPS_MASK = 0x07
+PLAYER_SHIFT = 3
+ADD_PLAYER = 0x07                    # Dado "7": jugador añadido (+ bytes de color y casilla)
+REMOVE_PLAYER = 0x00                 # Dado "0": jugador quitado
+MOVE, ADD, REMOVE = "move", "add", "remove"
+MEDIA_TYPE = "application/vnd.serpientes.replay"
+
+
+def encode_move(player_index: int, steps: int) -> int:
+    """Una tirada en un byte (6 jugadores y dados 1-6 caben de sobra)"""
+    return (player_index << PLAYER_SHIFT) | steps
+
+
+def encode_add_player(player_index: int, color: int, start: int) -> bytes:
+    return bytes(((player_index << PLAYER_SHIFT) | ADD_PLAYER, color, start))
+
+
+def encode_remove_player(player_index: int) -> bytes:
+    return bytes(((player_index << PLAYER_SHIFT) | REMOVE_PLAYER,))
+
+
+def iter_records(moves: bytes) -> Iterator[tuple]:
+    """(MOVE, jugador, dado), (ADD, jugador, color, casilla) o (REMOVE, jugador)"""
+    i, end = 0, len(moves)
+    while i < end:
+        byte = moves[i]
+        player, code = byte >> PLAYER_SHIFT, byte & STEPS_MASK
+        if code == ADD_PLAYER:
+            if i + 3 > end:
+                raise ValueError("Repetición truncada")
+            yield ADD, player, moves[i + 1], moves[i + 2]
+            i += 3
+            continue
+        yield (REMOVE, player) if code == REMOVE_PLAYER else (MOVE, player, code)
+        i += 1
+
+
+def count_moves(moves: bytes) -> int:
+    """Tiradas de la secuencia (sin los cambios de jugadores)"""
+    return sum(1 for record in iter_records(moves) if record[0] == MOVE)
+
+
+def encode_header(board: CompiledBoard, seed: Optional[int],
+                  players: Sequence[Tuple[int, int]]) -> bytes:
+    """Cabecera: semilla, (color, casilla inicial) por jugador y tabla de elementos"""
+    elements = [
+        (cell, board.dest[cell], board.effect[cell])
+        for cell in range(board.max_cell + 1) if board.dest[cell] != cell
+    ]
+    if seed is None or not 0 <= seed < NO_SEED:
+        seed = NO_SEED
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, board.max_cell, len(players), seed, len(elements))]
+    parts.extend(bytes(player) for player in players)
+    parts.extend(bytes(element) for element in elements)
+    return b"".join(parts)
+
+
+class Replay:
+    """Repetición decodificada: tablero compilado, jugadores iniciales y tiradas"""
+
+    __slots__ = ("max_cell", "seed", "players", "board", "moves")
+
+    def __init__(self, max_cell: int, seed: Optional[int], players: List[Tuple[int, int]],
+                 board: CompiledBoard, moves: bytes):
+        self.max_cell = max_cell
+        self.seed = seed
+        self.players = players
+        self.board = board
+        self.moves = moves
+
+    def seek(self, turn: int) -> Dict:
+        """Estado tras `turn` tiradas (y los cambios de jugadores previos a la siguiente)"""
+        return self._play(turn)[0]
+
+    def effect_hits(self) -> Counter:
+        """Veces que se cayó en cada efecto (código de escalera/serpiente) en toda la partida"""
+        return self._play(len(self.moves))[1]
+
+    def _play(self, turn: int) -> Tuple[Dict, Counter]:
+        total = count_moves(self.moves)
+        turn = max(0, min(turn, total))
+        positions = [start for _, start in self.players]
+        ladders = [0] * len(positions)
+        snakes = [0] * len(positions)
+        resolve = self.board.resolve
+        winner = None
+        current = played = 0
+        hits = Counter()
+        for record in iter_records(self.moves):
+            if record[0] == MOVE:
+                if played == turn:
+                    break
+                played += 1
+                _, player, steps = record
+                if player >= len(positions):
+                    # Versión 1: jugador añadido sin registro propio, empieza en la casilla 0
+                    missing = player + 1 - len(positions)
+                    positions.extend([0] * missing)
+                    ladders.extend([0] * missing)
+                    snakes.extend([0] * missing)
+                _, positions[player], code = resolve(positions[player], steps)
+                kind = code & EFFECT_KIND_MASK
+                if kind == EFFECT_LADDER:
+                    ladders[player] += 1
+                elif kind == EFFECT_SNAKE:
+                    snakes[player] += 1
+                if code:
+                    hits[code] += 1
+                if positions[player] == self.max_cell and winner is None:
+                    winner = player
+                current = (player + 1) % len(positions)
+            elif record[0] == ADD:
+                _, player, _, start = record
+                positions.insert(player, start)
+                ladders.insert(player, 0)
+                snakes.insert(player, 0)
+            else:
+                player = record[1]
+                if player < len(positions):
+                    del positions[player], ladders[player], snakes[player]
+                # Igual que en la partida: si el turno era del jugador quitado, vuelve al primero
+                if current >= len(positions):
+                    current = 0
+        return {
+            "turn": turn,
+            "total_turns": total,
+            "positions": positions,
+            "ladders": ladders,
+            "snakes": snakes,
+            "current_player_index": current,
+            "winner_index": winner
+        }, hits
+
+    def to_dict(self, colors: Sequence[str]) -> Dict:
+        """Vista JSON de la cabecera y las tiradas ([jugador, dado])"""
+        return {
+            "max_cell": self.max_cell,
+            "seed": self.seed,
+            "players": [
+                {"color": colors[color] if color < len(colors) else None, "start": start}
+                for color, start in self.players
+            ],
+            "ladders": {cell: self.board.dest[cell] for cell in range(self.max_cell + 1)
+                        if self.board.effect[cell] & EFFECT_KIND_MASK == EFFECT_LADDER},
+            "snakes": {cell: self.board.dest[cell] for cell in range(self.max_cell + 1)
+                       if self.board.effect[cell] & EFFECT_KIND_MASK == EFFECT_SNAKE},
+            "moves": [[record[1], record[2]] for record in iter_records(self.moves) if record[0] == MOVE],
+            "roster": self._roster(colors)
+        }
+
+    def _roster(self, colors: Sequence[str]) -> List[Dict]:
+        """Jugadores añadidos o quitados, con la tirada tras la que ocurrió"""
+        changes = []
+        turn = 0
+        for record in iter_records(self.moves):
+            if record[0] == MOVE:
+                turn += 1
+            elif record[0] == ADD:
+                _, player, color, start = record
+                changes.append({"turn": turn, "action": ADD, "player": player,
+                                "color": colors[color] if color < len(colors) else None, "start": start})
+            else:
+                changes.append({"turn": turn, "action": REMOVE, "player": record[1]})
+        return changes
+
+
+def decode(data: bytes) -> Replay:
+    """bytes -> Replay (ValueError si el formato no es válido)"""
+    if len(data) < HEADER.size:
+        raise ValueError("Repetición truncada")
+    magic, version, max_cell, player_count, seed, element_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version not in READABLE_VERSIONS:
+        raise ValueError("Formato de repetición no reconocido")
+    offset = HEADER.size
+    moves_offset = offset + player_count * 2 + element_count * 3
+    if len(data) < moves_offset:
+        raise ValueError("Repetición truncada")
+    players = [(data[offset + 2 * i], data[offset + 2 * i + 1]) for i in range(player_count)]
+    offset += player_count * 2
+    dest = bytearray(range(max_cell + 1))
+    effect = bytearray(max_cell + 1)
+    for i in range(element_count):
+        cell, end, code = data[offset + 3 * i:offset + 3 * i + 3]
+        dest[cell] = end
+        effect[cell] = code
+    board = CompiledBoard(max_cell, bytes(dest), bytes(effect))
+    return Replay(max_cell, None if seed == NO_SEED else seed, players, board, bytes(data[moves_offset:]))
+
+
+class ReplayFeed:
+    """Repetición en vivo de una sala: cabecera + tiradas, con espera para espectadores"""
+
+    def __init__(self):
+        self.epoch = 0
+        self.generation = 0   # Cambia cuando la secuencia se reemplaza (partida nueva o recarga)
+        self.header = b""
+        self.moves = bytearray()
+        self.turns = 0        # Tiradas en `moves` (sin contar los cambios de jugadores)
+        self.spectators = 0
+        # El Event (y su cola de espera) solo existe mientras alguien espera: la mayoría de salas no tiene espectadores
+        self._changed: Optional[asyncio.Event] = None
+        self._delta: Optional[Tuple[int, int, int, bytes]] = None  # (generación, desde, hasta, mensaje)
+
+    def _notify(self):
+        # Se despierta a todos los que esperan y los siguientes esperan un evento nuevo
+        changed, self._changed = self._changed, None
+        if changed is not None:
+            changed.set()
+
+    def reset(self, epoch: int, header: bytes, moves: bytes = b""):
+        self.epoch = epoch
+        self.generation += 1
+        self.header = header
+        self.moves = bytearray(moves)
+        self.turns = count_moves(self.moves)
+        self._delta = None
+        self._notify()
+
+    def append(self, player_index: int, steps: int):
+        """O(1) en el camino del turno: un byte y un aviso"""
+        self.moves.append(encode_move(player_index, steps))
+        self.turns += 1
+        self._notify()
+
+    def add_player(self, player_index: int, color: int, start: int):
+        self.moves += encode_add_player(player_index, color, start)
+        self._notify()
+
+    def remove_player(self, player_index: int):
+        self.moves += encode_remove_player(player_index)
+        self._notify()
+
+    def encoded(self) -> bytes:
+        return self.header + self.moves
+
+    async def wait(self, timeout: float) -> bool:
+        """Espera un cambio (False si vence el tiempo)"""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def delta(self, cursor: int, encode) -> bytes:
+        """Mensaje con los registros desde el byte `cursor`, compartido por los espectadores al día"""
+        end = len(self.moves)
+        cached = self._delta
+        if cached is None or cached[:3] != (self.generation, cursor, end):
+            message = encode("moves", {
+                "epoch": self.epoch,
+                "offset": cursor,
+                "turn": self.turns,
+                "data": base64.b64encode(self.moves[cursor:end]).decode("ascii")
+            })
+            cached = self._delta = (self.generation, cursor, end, message)
+        return cached[3]
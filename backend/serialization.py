@@ -0,0 +1,44 @@
+"""
+Serialización JSON rápida para las respuestas y archivos del juego.
+
+Usa orjson si está instalado (opcional) y, si no, el módulo json de la
+biblioteca estándar con salida compacta. Los dicts del estado de partida
+los construye GameRecord (game_record.py) sin pasar por `.dict()` de Pydantic.
+"""
+import json
+from datetime import datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS  # Escaleras y serpientes usan casillas enteras como clave
+
+    def dumps(obj: Any) -> bytes:
+        """Objeto -> JSON compacto en UTF-8"""
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    loads = orjson.loads
+    DecodeError = orjson.JSONDecodeError
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+    def dumps(obj: Any) -> bytes:
+        """Objeto -> JSON compacto en UTF-8"""
+        return _encoder.encode(obj).encode("utf-8")
+
+    loads = json.loads
+    DecodeError = json.JSONDecodeError
+
+BACKEND = "orjson" if orjson is not None else "json"
+
@@ -0,0 +1,172 @@
+"""
+Simulación masiva de partidas completas de Escaleras y Serpientes.
+
+Juega N partidas de 2 a 6 jugadores sobre un tablero compilado, vectorizando
+todas las partidas de un bloque con NumPy. Las tiradas salen del mismo dado
+que las partidas en vivo (`DiceStream`), sorteadas por lotes de una ronda
+entera. Los bloques se reparten en un pool
+de procesos para usar todos los núcleos y sus resultados parciales se pueden
+combinar (y emitir) a medida que terminan.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from analysis import transition_table
+from dice import DiceStream
+
+CHUNK_GAMES = 50_000      # Partidas por bloque de trabajo
+MAX_ROUNDS = 1000         # Rondas máximas antes de dar una partida por inacabada
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Pool de procesos compartido, creado la primera vez que se necesita"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def empty_stats(players: int) -> Dict:
+    """Acumuladores combinables de un conjunto de partidas"""
+    return {
+        "games": 0,
+        "players": players,
+        "unfinished": 0,
+        "wins_by_seat": [0] * players,
+        "ladders_by_seat": [0] * players,
+        "snakes_by_seat": [0] * players,
+        "turns_histogram": []
+    }
+
+
+def merge_stats(total: Dict, part: Dict) -> Dict:
+    """Suma los acumuladores de `part` sobre `total`"""
+    total["games"] += part["games"]
+    total["unfinished"] += part["unfinished"]
+    for key in ("wins_by_seat", "ladders_by_seat", "snakes_by_seat"):
+        total[key] = [a + b for a, b in zip(total[key], part[key])]
+    hist_a, hist_b = total["turns_histogram"], part["turns_histogram"]
+    if len(hist_a) < len(hist_b):
+        hist_a, hist_b = hist_b, hist_a
+    total["turns_histogram"] = [a + (hist_b[i] if i < len(hist_b) else 0) for i, a in enumerate(hist_a)]
+    return total
+
+
+def simulate_chunk(board, games: int, players: int, seed: Optional[int] = None, start: int = 1,
+                   max_rounds: int = MAX_ROUNDS) -> Dict:
+    """Juega un bloque de partidas completas; gana el primer jugador en llegar a la meta"""
+    max_cell = board.max_cell
+    dice = DiceStream(seed)
+    dest = transition_table(board)
+    cells = np.arange(max_cell + 1)
+    is_ladder = dest > cells
+    is_snake = dest < cells
+
+    positions = np.full((games, players), start, dtype=np.int16)
+    active = np.arange(games)
+    winners = np.full(games, -1, dtype=np.int8)
+    turns = np.zeros(games, dtype=np.int32)
+    ladders = np.zeros(players, dtype=np.int64)
+    snakes = np.zeros(players, dtype=np.int64)
+
+    for round_index in range(max_rounds):
+        # Tiradas de toda la ronda en un solo lote
+        rolls = dice.draw(active.size * players).reshape(active.size, players)
+        for seat in range(players):
+            landing = np.minimum(positions[:, seat] + rolls[:, seat], max_cell)
+            ladders[seat] += np.count_nonzero(is_ladder[landing])
+            snakes[seat] += np.count_nonzero(is_snake[landing])
+            positions[:, seat] = dest[landing]
+
+            done = positions[:, seat] == max_cell
+            if done.any():
+                finished = active[done]
+                winners[finished] = seat
+                turns[finished] = round_index * players + seat + 1
+                keep = ~done
+                active, positions, rolls = active[keep], positions[keep], rolls[keep]
+        if active.size == 0:
+            break
+
+    stats = empty_stats(players)
+    finished = winners >= 0
+    stats["games"] = games
+    stats["unfinished"] = int(games - finished.sum())
+    stats["wins_by_seat"] = np.bincount(winners[finished], minlength=players).tolist()
+    stats["ladders_by_seat"] = ladders.tolist()
+    stats["snakes_by_seat"] = snakes.tolist()
+    stats["turns_histogram"] = np.bincount(turns[finished]).tolist()
+    return stats
+
+
+def summarize(stats: Dict) -> Dict:
+    """Resumen legible: reparto de victorias por asiento, turnos y efectos por jugador"""
+    games = stats["games"]
+    players = stats["players"]
+    finished = games - stats["unfinished"]
+    histogram = np.asarray(stats["turns_histogram"], dtype=np.int64)
+    summary = {
+        "games": games,
+        "players": players,
+        "finished": finished,
+        "wins_by_seat": stats["wins_by_seat"],
+        "win_rate_by_seat": [round(w / finished, 4) if finished else 0.0 for w in stats["wins_by_seat"]],
+        "ladders_per_player": [round(v / games, 3) if games else 0.0 for v in stats["ladders_by_seat"]],
+        "snakes_per_player": [round(v / games, 3) if games else 0.0 for v in stats["snakes_by_seat"]]
+    }
+    if finished:
+        axis = np.arange(len(histogram))
+        cdf = np.cumsum(histogram) / finished
+        mean_turns = float((axis * histogram).sum() / finished)
+        summary["turns"] = {
+            "mean": round(mean_turns, 3),
+            "mean_rounds": round(mean_turns / players, 3),
+            "min": int(np.argmax(histogram > 0)),
+            "max": int(len(histogram) - 1),
+            **{f"p{q}": int(np.searchsorted(cdf, q / 100)) for q in (50, 90, 99)}
+        }
+    return summary
+
+
+def chunk_plan(games: int, seed: Optional[int], chunk_games: int = CHUNK_GAMES) -> List:
+    """Divide N partidas en bloques con semillas independientes y reproducibles"""
+    sizes = [chunk_games] * (games // chunk_games)
+    if games % chunk_games:
+        sizes.append(games % chunk_games)
+    # Semillas de 64 bits independientes por bloque (una por dado)
+    seeds = [int(child.generate_state(1, np.uint64)[0]) for child in np.random.SeedSequence(seed).spawn(len(sizes))]
+    return list(zip(sizes, seeds))
+
+
+def iter_simulation(board, games: int, players: int, seed: Optional[int] = None,
+                    parallel: bool = True) -> Iterator[Dict]:
+    """Ejecuta la simulación y va devolviendo los acumuladores de cada bloque al terminar"""
+    plan = chunk_plan(games, seed)
+    if not parallel or len(plan) == 1:
+        for size, chunk_seed in plan:
+            yield simulate_chunk(board, size, players, chunk_seed)
+        return
+    pool = get_pool()
+    futures = [pool.submit(simulate_chunk, board, size, players, chunk_seed) for size, chunk_seed in plan]
+    for future in as_completed(futures):
+        yield future.result()
+
+
+def simulate(board, games: int, players: int, seed: Optional[int] = None, parallel: bool = True) -> Dict:
+    """API Python: juega N partidas y devuelve las estadísticas agregadas"""
+    total = empty_stats(players)
+    for part in iter_simulation(board, games, players, seed, parallel):
+        merge_stats(total, part)
+    return summarize(total)
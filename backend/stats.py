@@ -0,0 +1,178 @@
+"""
+Estadísticas globales de Escaleras y Serpientes.
+
+Acumula contadores de todas las partidas terminadas (victorias por color y
+asiento, escaleras y serpientes por virtud y pecado, turnos y duración) al
+cerrarse cada partida, así todas las cifras agregadas cuentan la misma
+población; solo `moves` cuenta todos los movimientos, también los de
+partidas abandonadas. Las duraciones se guardan en histogramas
+de cubetas fijas, así que consultar las estadísticas cuesta lo mismo tenga el
+servidor diez partidas o diez millones.
+
+Los contadores son planos (`"wins_by_color:ROJO"`, `"turns_histogram:37"`...)
+para que el backend de estado los sume de forma atómica: cada worker acumula
+sus incrementos pendientes y el escritor en segundo plano los envía con
+`increment_counters`, así varios workers nunca se pisan el total.
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence
+
+MAX_SEATS = 6
+TURN_BUCKET_LIMIT = 500   # Turnos con cubeta propia; el resto va a la cubeta de desbordamiento
+# Límites superiores (segundos) de las cubetas de duración de partida
+DURATION_BUCKETS = (10, 30, 60, 120, 300, 600, 900, 1200, 1800, 2700, 3600, 7200, 14400, 86400)
+PERCENTILES = (50, 75, 90, 95, 99)
+
+
+def _bucket_percentile(histogram: Sequence[int], total: int, q: float) -> int:
+    """Índice de la primera cubeta cuya frecuencia acumulada alcanza q"""
+    target = q * total
+    running = 0
+    for index, count in enumerate(histogram):
+        running += count
+        if count and running >= target:
+            return index
+    return len(histogram) - 1
+
+
+class GlobalStats:
+    """Contadores incrementales de todas las partidas; se actualizan al confirmarse cada partida"""
+
+    def __init__(self, virtues: Sequence[str], sins: Sequence[str], colors: Sequence[str]):
+        self.virtues = list(virtues)
+        self.sins = list(sins)
+        self.colors = list(colors)
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}   # Totales conocidos (backend + pendientes de este worker)
+        self.pending: Dict[str, float] = {}    # Incrementos aún no enviados al backend
+        self.in_flight: Dict[str, float] = {}  # Incrementos enviándose ahora mismo
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending)
+
+    def _add(self, key: str, amount: float = 1):
+        self.counters[key] = self.counters.get(key, 0) + amount
+        self.pending[key] = self.pending.get(key, 0) + amount
+
+    def record_move(self):
+        """Cuenta un movimiento (de cualquier partida, termine o no)"""
+        with self._lock:
+            self._add("moves")
+
+    def record_finish(self, colors: Sequence[str], winner_seat: int, total_turns: int,
+                      duration_seconds: Optional[float] = None,
+                      ladder_hits: Optional[Dict[int, int]] = None,
+                      snake_hits: Optional[Dict[int, int]] = None):
+        """Cierra una partida terminada: participaciones, ganador, turnos, duración y
+        escaleras/serpientes de toda la partida por índice de virtud/pecado"""
+        with self._lock:
+            for index, hits in (ladder_hits or {}).items():
+                if index < len(self.virtues):
+                    self._add(f"ladders_by_virtue:{self.virtues[index]}", hits)
+            for index, hits in (snake_hits or {}).items():
+                if index < len(self.sins):
+                    self._add(f"snakes_by_sin:{self.sins[index]}", hits)
+            self._add("games_finished")
+            self._add("turns_total", total_turns)
+            for seat, color in enumerate(colors[:MAX_SEATS]):
+                self._add(f"games_by_seat:{seat}")
+                self._add(f"games_by_color:{color}")
+            self._add(f"wins_by_seat:{winner_seat}")
+            self._add(f"wins_by_color:{colors[winner_seat]}")
+            self._add(f"turns_histogram:{min(total_turns, TURN_BUCKET_LIMIT + 1)}")
+            if duration_seconds is not None:
+                self._add("timed_games")
+                self._add("duration_total", duration_seconds)
+                self._add(f"duration_histogram:{bisect_left(DURATION_BUCKETS, duration_seconds)}")
+
+    # --- Sincronización con el backend de estado ---
+    def take_pending(self) -> Dict[str, float]:
+        """Incrementos a enviar; quedan "en vuelo" hasta `finish_pending`"""
+        with self._lock:
+            self.in_flight, self.pending = self.pending, {}
+            return dict(self.in_flight)
+
+    def finish_pending(self, ok: bool):
+        """Cierra un envío; si falló, los incrementos vuelven a la cola"""
+        with self._lock:
+            if not ok:
+                for key, amount in self.in_flight.items():
+                    self.pending[key] = self.pending.get(key, 0) + amount
+            self.in_flight = {}
+
+    def load_counters(self, totals: Dict[str, float]):
+        """Totales del backend más lo que este worker aún no ha enviado"""
+        with self._lock:
+            counters = dict(totals)
+            for pending in (self.in_flight, self.pending):
+                for key, amount in pending.items():
+                    counters[key] = counters.get(key, 0) + amount
+            self.counters = counters
+
+    @property
+    def games_finished(self) -> int:
+        return int(self.counters.get("games_finished", 0))
+
+    def summary(self) -> Dict:
+        """Resumen agregado; el coste depende solo del número (fijo) de cubetas"""
+        with self._lock:
+            counters = self.counters
+
+            def count(key):
+                return counters.get(key, 0)
+
+            games = count("games_finished")
+            timed_games = count("timed_games")
+
+            def rate(wins, played):
+                return round(wins / played, 4) if played else 0.0
+
+            def ranking(prefix, names):
+                pairs = sorted(((name, count(f"{prefix}:{name}")) for name in names),
+                               key=lambda pair: pair[1], reverse=True)
+                return [{"name": name, "hits": hits} for name, hits in pairs]
+
+            colors = self.colors + sorted(
+                key.split(":", 1)[1] for key in counters
+                if key.startswith("games_by_color:") and key.split(":", 1)[1] not in self.colors
+            )
+            turns_histogram = [count(f"turns_histogram:{i}") for i in range(TURN_BUCKET_LIMIT + 2)]
+            duration_histogram = [count(f"duration_histogram:{i}") for i in range(len(DURATION_BUCKETS) + 1)]
+
+            result = {
+                "games_finished": games,
+                "moves": count("moves"),
+                "average_turns": round(count("turns_total") / games, 3) if games else None,
+                "win_rate_by_color": {
+                    color: {"games": count(f"games_by_color:{color}"),
+                            "wins": count(f"wins_by_color:{color}"),
+                            "win_rate": rate(count(f"wins_by_color:{color}"), count(f"games_by_color:{color}"))}
+                    for color in colors if count(f"games_by_color:{color}")
+                },
+                "win_rate_by_seat": [
+                    {"seat": seat + 1, "games": count(f"games_by_seat:{seat}"),
+                     "wins": count(f"wins_by_seat:{seat}"),
+                     "win_rate": rate(count(f"wins_by_seat:{seat}"), count(f"games_by_seat:{seat}"))}
+                    for seat in range(MAX_SEATS) if count(f"games_by_seat:{seat}")
+                ],
+                "ladders_by_virtue": ranking("ladders_by_virtue", self.virtues),
+                "snakes_by_sin": ranking("snakes_by_sin", self.sins),
+                "turns_percentiles": None,
+                "duration_percentiles_seconds": None,
+                "average_duration_seconds": None
+            }
+            if games:
+                result["turns_percentiles"] = {
+                    f"p{q}": _bucket_percentile(turns_histogram, games, q / 100) for q in PERCENTILES
+                }
+            if timed_games:
+                # El percentil de duración se informa como el límite superior de su cubeta
+                limits = list(DURATION_BUCKETS) + [None]
+                result["duration_percentiles_seconds"] = {
+                    f"p{q}": limits[_bucket_percentile(duration_histogram, timed_games, q / 100)]
+                    for q in PERCENTILES
+                }
+                result["average_duration_seconds"] = round(count("duration_total") / timed_games, 1)
+            return result
@@ -0,0 +1,802 @@
+"""
+Backends de persistencia del estado de las partidas.
+
+Cada backend guarda un snapshot por partida (con un número de versión) y el
+diario de movimientos de cada época:
+
+- JsonFileBackend: archivos JSON + diario append-only en disco (un solo proceso).
+- SqliteBackend: una base SQLite en modo WAL, compartible entre workers de la
+  misma máquina.
+- RedisBackend: cualquier servidor compatible con Redis, compartible entre
+  nodos. Acepta un cliente inyectado; FakeRedis sirve para pruebas locales.
+
+`compare_and_set` aplica concurrencia optimista: la escritura solo se acepta si
+la versión guardada es la que el worker leyó, así dos workers nunca pisan el
+mismo movimiento. Junto a cada snapshot se guarda un resumen ligero (jugadores,
+estado, turnos, versión, fecha) para listar partidas sin leer snapshots ni
+diarios. Los contadores globales (estadísticas) se guardan aparte y
+solo se suman con `increment_counters`, que es atómico en cada backend.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from serialization import dumps, loads
+
+try:
+    import redis
+    from redis.exceptions import WatchError
+except ImportError:  # Dependencia opcional: solo hace falta con STATE_BACKEND = "redis"
+    redis = None
+
+    class WatchError(Exception):
+        """Una clave vigilada cambió antes de EXEC"""
+
+
+def _number(raw) -> float:
+    """Valor de un contador leído como texto (Redis) conservando los enteros"""
+    if isinstance(raw, (int, float)):
+        return raw
+    try:
+        return int(raw)
+    except ValueError:
+        return float(raw)
+
+
+def _flat_counters(data: Dict) -> Dict[str, float]:
+    """Acepta también el formato anidado anterior ({"wins_by_color": {...}, "games_by_seat": [...]})"""
+    flat: Dict[str, float] = {}
+
+    def add(key, value):
+        if value:
+            flat[key] = flat.get(key, 0) + value
+
+    for name, value in data.items():
+        if isinstance(value, dict):
+            for key, count in value.items():
+                add(f"{name}:{key}", count)
+        elif isinstance(value, list):
+            for index, count in enumerate(value):
+                add(f"{name}:{index}", count)
+        elif isinstance(value, (int, float)):
+            add(name, value)
+    return flat
+
+
+def game_summary(data: Dict) -> Dict:
+    """Resumen de una partida a partir de su snapshot (lo que muestra el listado)"""
+    game_state = data.get("game_state", {})
+    return {
+        "total_players": len(game_state.get("players", [])),
+        "game_started": game_state.get("game_started", False),
+        "total_turns": game_state.get("total_turns", 0),
+        "version": data.get("version", 0),
+        "updated_at": time.time()
+    }
+
+
+def _advance_summary(summary: Optional[Dict], events: List[Dict]) -> Optional[Dict]:
+    """Turnos del diario posteriores al snapshot (None si no hay resumen que avanzar)"""
+    if summary is None or not events:
+        return None
+    summary = dict(summary)
+    summary["total_turns"] = max(summary["total_turns"], max(event["n"] for event in events))
+    summary["updated_at"] = time.time()
+    return summary
+
+
+def _rebuilt_summary(data: Dict, events: List[Dict]) -> Dict:
+    """Resumen de una partida guardada sin él (snapshot + diario posterior)"""
+    return _advance_summary(game_summary(data), events) or game_summary(data)
+
+
+class StateBackend(ABC):
+    """Interfaz común; los métodos son bloqueantes (llamarlos desde un hilo)"""
+
+    name = "base"
+    shared = False  # True si varios procesos pueden usar el mismo almacén a la vez
+
+    @abstractmethod
+    def load_all(self) -> Iterator[Tuple[str, Dict, List[Dict]]]:
+        """(game_id, snapshot, eventos de su época) de todas las partidas guardadas"""
+
+    @abstractmethod
+    def load(self, game_id: str) -> Optional[Tuple[Dict, List[Dict]]]:
+        """Snapshot y eventos de su época (None si la partida no existe)"""
+
+    @abstractmethod
+    def version(self, game_id: str) -> int:
+        """Versión guardada de la partida (0 si no existe)"""
+
+    @abstractmethod
+    def summaries(self) -> Dict[str, Dict]:
+        """Resumen de cada partida guardada (`game_summary`), sin leer snapshots ni diarios"""
+
+    @abstractmethod
+    def write_snapshot(self, game_id: str, data: Dict):
+        """Escribe el snapshot sin comprobar la versión"""
+
+    @abstractmethod
+    def append_events(self, game_id: str, events: List[Dict]):
+        """Añade eventos al diario de la partida"""
+
+    @abstractmethod
+    def read_events(self, game_id: str, epoch: int) -> List[Dict]:
+        """Eventos de una época, en orden de turno"""
+
+    @abstractmethod
+    def delete(self, game_id: str):
+        """Borra el snapshot (el diario se puede conservar como auditoría)"""
+
+    @abstractmethod
+    def compare_and_set(self, game_id: str, expected_version: int, data: Dict,
+                        events: List[Dict]) -> bool:
+        """Escribe snapshot y eventos solo si la versión guardada es `expected_version`"""
+
+    @abstractmethod
+    def increment_counters(self, deltas: Dict[str, float]):
+        """Suma `deltas` a los contadores globales de forma atómica"""
+
+    @abstractmethod
+    def load_counters(self) -> Dict[str, float]:
+        """Contadores globales actuales (planos: nombre -> valor)"""
+
+    def close(self):
+        pass
+
+
+# ============ ARCHIVOS JSON (UN SOLO PROCESO) ============
+class JsonFileBackend(StateBackend):
+    """Un snapshot `<id>.json` y un diario `<id>.journal` por partida"""
+
+    name = "json"
+
+    def __init__(self, state_dir: Path, archive_dir: Path, legacy_file: Optional[Path] = None,
+                 legacy_game_id: str = "default", counters_path: Optional[Path] = None):
+        self.state_dir = state_dir
+        self.archive_dir = archive_dir
+        self.counters_path = counters_path or state_dir.parent / "global_stats.json"
+        self.legacy_file = legacy_file
+        self.legacy_game_id = legacy_game_id
+        # Época registrada en cada diario abierto (solo lo usa el hilo del escritor)
+        self._journal_epochs: Dict[str, Optional[int]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._summaries: Optional[Dict[str, Dict]] = None  # Caché de summaries/, al listar por primera vez
+        self._summary_lock = threading.Lock()
+
+    def state_path(self, game_id: str) -> Path:
+        return self.state_dir / f"{game_id}.json"
+
+    def journal_path(self, game_id: str) -> Path:
+        return self.state_dir / f"{game_id}.journal"
+
+    def summary_path(self, game_id: str) -> Path:
+        return self.state_dir / "summaries" / f"{game_id}.json"
+
+    def _read_snapshot(self, path: Path) -> Dict:
+        with open(path, "rb") as f:
+            return loads(f.read())
+
+    def load_all(self) -> Iterator[Tuple[str, Dict, List[Dict]]]:
+        # Backup de la versión de una sola partida → sala por defecto
+        if (self.legacy_file is not None and self.legacy_file.exists()
+                and not self.state_path(self.legacy_game_id).exists()):
+            try:
+                data = self._read_snapshot(self.legacy_file)
+                print("🔄 Backup de partida única cargado en la sala por defecto")
+                yield self.legacy_game_id, data, []
+            except Exception as e:
+                print(f"⚠️ Error cargando backup previo: {e}")
+
+        if not self.state_dir.exists():
+            return
+        for path in self.state_dir.glob("*.json"):
+            try:
+                data = self._read_snapshot(path)
+            except Exception as e:
+                print(f"⚠️ Error cargando estado de {path.stem}: {e}")
+                continue
+            if "game_state" not in data:
+                continue  # No es un snapshot de partida
+            self._versions[path.stem] = data.get("version", 0)
+            yield path.stem, data, self.read_events(path.stem, data.get("epoch", 0))
+
+    def load(self, game_id: str) -> Optional[Tuple[Dict, List[Dict]]]:
+        try:
+            data = self._read_snapshot(self.state_path(game_id))
+        except FileNotFoundError:
+            return None
+        self._versions[game_id] = data.get("version", 0)
+        return data, self.read_events(game_id, data.get("epoch", 0))
+
+    def _write_summary(self, game_id: str, summary: Dict):
+        path = self.summary_path(game_id)
+        tmp_path = path.with_suffix(".json.tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(dumps(summary))
+        os.replace(tmp_path, path)
+        with self._summary_lock:
+            if self._summaries is not None:
+                self._summaries[game_id] = summary
+
+    def _read_summary(self, game_id: str) -> Optional[Dict]:
+        with self._summary_lock:
+            if self._summaries is not None:
+                return self._summaries.get(game_id)
+        try:
+            return self._read_snapshot(self.summary_path(game_id))
+        except (OSError, ValueError):
+            return None
+
+    def summaries(self) -> Dict[str, Dict]:
+        with self._summary_lock:
+            if self._summaries is not None:
+                return dict(self._summaries)
+        summaries = {}
+        if self.state_dir.exists():
+            for path in self.state_dir.glob("*.json"):
+                try:
+                    summaries[path.stem] = self._read_snapshot(self.summary_path(path.stem))
+                except (OSError, ValueError):
+                    # Partida guardada antes de que existieran los resúmenes: se crea una vez
+                    loaded = self.load(path.stem)
+                    if loaded is None or "game_state" not in loaded[0]:
+                        continue
+                    summary = _rebuilt_summary(*loaded)
+                    self._write_summary(path.stem, summary)
+                    summaries[path.stem] = summary
+        with self._summary_lock:
+            self._summaries = summaries
+            return dict(summaries)
+
+    def version(self, game_id: str) -> int:
+        if game_id not in self._versions:
+            try:
+                self._versions[game_id] = self._read_snapshot(self.state_path(game_id)).get("version", 0)
+            except (OSError, ValueError):
+                return 0
+        return self._versions[game_id]
+
+    def _current_journal_epoch(self, game_id: str) -> Optional[int]:
+        if game_id not in self._journal_epochs:
+            try:
+                with open(self.journal_path(game_id), "r", encoding="utf-8") as f:
+                    first = f.readline()
+                self._journal_epochs[game_id] = json.loads(first)["g"] if first else None
+            except (FileNotFoundError, json.JSONDecodeError, KeyError):
+                self._journal_epochs[game_id] = None
+        return self._journal_epochs[game_id]
+
+    def archive_journal(self, game_id: str):
+        """Mueve el diario de una partida terminada al archivo de auditoría"""
+        path = self.journal_path(game_id)
+        epoch = self._journal_epochs.pop(game_id, None)
+        if not path.exists():
+            return
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        os.replace(path, self.archive_dir / f"{game_id}-g{epoch}-{stamp}.journal")
+
+    def append_events(self, game_id: str, events: List[Dict]):
+        """Añade eventos al diario (append-only); una época nueva archiva el anterior"""
+        if not events:
+            return
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        f = None
+        try:
+            for event in events:
+                current = self._current_journal_epoch(game_id)
+                if current is not None and current != event["g"]:
+                    if f is not None:
+                        f.close()
+                        f = None
+                    self.archive_journal(game_id)
+                if f is None:
+                    f = open(self.journal_path(game_id), "ab")
+                    self._journal_epochs[game_id] = event["g"]
+                f.write(dumps(event) + b"\n")
+        finally:
+            if f is not None:
+                f.close()
+        summary = _advance_summary(self._read_summary(game_id), events)
+        if summary is not None:
+            self._write_summary(game_id, summary)
+
+    def read_events(self, game_id: str, epoch: int) -> List[Dict]:
+        events = []
+        try:
+            with open(self.journal_path(game_id), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Línea truncada por una caída: se ignora
+                    if event.get("g") == epoch:
+                        events.append(event)
+        except FileNotFoundError:
+            pass
+        return events
+
+    def write_snapshot(self, game_id: str, data: Dict):
+        """Escritura atómica (archivo temporal + rename)"""
+        path = self.state_path(game_id)
+        tmp_path = path.with_suffix(".json.tmp")
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(dumps(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._versions[game_id] = data.get("version", 0)
+        self._write_summary(game_id, game_summary(data))
+
+    def delete(self, game_id: str):
+        """Elimina el snapshot (el diario se conserva archivado)"""
+        self.archive_journal(game_id)
+        self.state_path(game_id).unlink(missing_ok=True)
+        self.summary_path(game_id).unlink(missing_ok=True)
+        self._versions.pop(game_id, None)
+        with self._summary_lock:
+            if self._summaries is not None:
+                self._summaries.pop(game_id, None)
+        if game_id == self.legacy_game_id and self.legacy_file is not None:
+            self.legacy_file.unlink(missing_ok=True)
+
+    def compare_and_set(self, game_id: str, expected_version: int, data: Dict,
+                        events: List[Dict]) -> bool:
+        with self._lock:
+            if self.version(game_id) != expected_version:
+                return False
+            self.append_events(game_id, events)
+            self.write_snapshot(game_id, data)
+            return True
+
+    def load_counters(self) -> Dict[str, float]:
+        try:
+            with open(self.counters_path, "rb") as f:
+                return _flat_counters(loads(f.read()))
+        except FileNotFoundError:
+            return {}
+
+    def increment_counters(self, deltas: Dict[str, float]):
+        """Lee, suma y reescribe de forma atómica (un solo proceso: basta el lock)"""
+        if not deltas:
+            return
+        with self._lock:
+            counters = self.load_counters()
+            for key, amount in deltas.items():
+                counters[key] = counters.get(key, 0) + amount
+            tmp_path = self.counters_path.with_suffix(".json.tmp")
+            self.counters_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(dumps(counters))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.counters_path)
+
+
+# ============ SQLITE EN MODO WAL (VARIOS WORKERS, UNA MÁQUINA) ============
+class SqliteBackend(StateBackend):
+    """Tablas `games` (snapshot + versión), `summaries`, `events` (diario por época) y `counters`"""
+
+    name = "sqlite"
+    shared = True
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS games ("
+        " game_id TEXT PRIMARY KEY, version INTEGER NOT NULL, epoch INTEGER NOT NULL,"
+        " data TEXT NOT NULL, updated_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS events ("
+        " game_id TEXT NOT NULL, epoch INTEGER NOT NULL, n INTEGER NOT NULL, data TEXT NOT NULL,"
+        " PRIMARY KEY (game_id, epoch, n))",
+        "CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value NUMERIC NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS summaries (game_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+    )
+
+    def __init__(self, path: Path, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()  # Una conexión por hilo
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+            # ✅ WAL: los lectores no bloquean al escritor; NORMAL basta con WAL
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    def load_all(self) -> Iterator[Tuple[str, Dict, List[Dict]]]:
+        rows = self._connect().execute("SELECT game_id, data FROM games").fetchall()
+        for game_id, raw in rows:
+            data = loads(raw)
+            yield game_id, data, self.read_events(game_id, data.get("epoch", 0))
+
+    def load(self, game_id: str) -> Optional[Tuple[Dict, List[Dict]]]:
+        row = self._connect().execute("SELECT data FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        if row is None:
+            return None
+        data = loads(row[0])
+        return data, self.read_events(game_id, data.get("epoch", 0))
+
+    def version(self, game_id: str) -> int:
+        row = self._connect().execute("SELECT version FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return row[0] if row else 0
+
+    def summaries(self) -> Dict[str, Dict]:
+        conn = self._connect()
+        # Partidas guardadas antes de que existiera la tabla: su resumen se crea una vez
+        missing = conn.execute(
+            "SELECT game_id FROM games WHERE game_id NOT IN (SELECT game_id FROM summaries)").fetchall()
+        for (game_id,) in missing:
+            loaded = self.load(game_id)
+            if loaded is not None:
+                summary = _rebuilt_summary(*loaded)
+                self._write_summary(conn, game_id, summary)
+        return {game_id: loads(raw) for game_id, raw in conn.execute("SELECT game_id, data FROM summaries")}
+
+    def _write_summary(self, conn, game_id: str, summary: Dict):
+        conn.execute("INSERT OR REPLACE INTO summaries (game_id, data) VALUES (?, ?)",
+                     (game_id, dumps(summary).decode("utf-8")))
+
+    def _upsert(self, conn, game_id: str, data: Dict):
+        conn.execute(
+            "INSERT INTO games (game_id, version, epoch, data, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(game_id) DO UPDATE SET version = excluded.version, epoch = excluded.epoch, "
+            "data = excluded.data, updated_at = excluded.updated_at",
+            (game_id, data.get("version", 0), data.get("epoch", 0), dumps(data).decode("utf-8"), time.time())
+        )
+        self._write_summary(conn, game_id, game_summary(data))
+
+    def _insert_events(self, conn, game_id: str, events: List[Dict]):
+        conn.executemany(
+            "INSERT OR REPLACE INTO events (game_id, epoch, n, data) VALUES (?, ?, ?, ?)",
+            [(game_id, event["g"], event["n"], dumps(event).decode("utf-8")) for event in events]
+        )
+
+    def write_snapshot(self, game_id: str, data: Dict):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN")
+            self._upsert(conn, game_id, data)
+
+    def append_events(self, game_id: str, events: List[Dict]):
+        if events:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                self._insert_events(conn, game_id, events)
+                row = conn.execute("SELECT data FROM summaries WHERE game_id = ?", (game_id,)).fetchone()
+                summary = _advance_summary(loads(row[0]) if row else None, events)
+                if summary is not None:
+                    self._write_summary(conn, game_id, summary)
+
+    def read_events(self, game_id: str, epoch: int) -> List[Dict]:
+        rows = self._connect().execute(
+            "SELECT data FROM events WHERE game_id = ? AND epoch = ? ORDER BY n", (game_id, epoch)
+        ).fetchall()
+        return [loads(row[0]) for row in rows]
+
+    def delete(self, game_id: str):
+        # Los eventos se conservan como auditoría, igual que el diario archivado
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+            conn.execute("DELETE FROM summaries WHERE game_id = ?", (game_id,))
+
+    def compare_and_set(self, game_id: str, expected_version: int, data: Dict,
+                        events: List[Dict]) -> bool:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")  # Reserva la escritura antes de leer la versión
+        try:
+            row = conn.execute("SELECT version FROM games WHERE game_id = ?", (game_id,)).fetchone()
+            if (row[0] if row else 0) != expected_version:
+                conn.execute("ROLLBACK")
+                return False
+            self._upsert(conn, game_id, data)
+            self._insert_events(conn, game_id, events)
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def load_counters(self) -> Dict[str, float]:
+        return dict(self._connect().execute("SELECT key, value FROM counters").fetchall())
+
+    def increment_counters(self, deltas: Dict[str, float]):
+        if deltas:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO counters (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                    list(deltas.items())
+                )
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ============ REDIS (VARIOS NODOS) ============
+class RedisBackend(StateBackend):
+    """Hash `game:<id>` (version, data), lista `events:<id>:<época>`, set `games` y hashes `summaries`
+    y `counters`"""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, client, prefix: str = "serpientes:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _game_key(self, game_id: str) -> str:
+        return f"{self.prefix}game:{game_id}"
+
+    def _events_key(self, game_id: str, epoch: int) -> str:
+        return f"{self.prefix}events:{game_id}:{epoch}"
+
+    def _index_key(self) -> str:
+        return f"{self.prefix}games"
+
+    def _counters_key(self) -> str:
+        return f"{self.prefix}counters"
+
+    def _summaries_key(self) -> str:
+        return f"{self.prefix}summaries"
+
+    def load_all(self) -> Iterator[Tuple[str, Dict, List[Dict]]]:
+        for game_id in sorted(self.client.smembers(self._index_key())):
+            loaded = self.load(game_id)
+            if loaded is not None:
+                yield (game_id, *loaded)
+
+    def load(self, game_id: str) -> Optional[Tuple[Dict, List[Dict]]]:
+        raw = self.client.hget(self._game_key(game_id), "data")
+        if raw is None:
+            return None
+        data = loads(raw)
+        return data, self.read_events(game_id, data.get("epoch", 0))
+
+    def version(self, game_id: str) -> int:
+        raw = self.client.hget(self._game_key(game_id), "version")
+        return int(raw) if raw is not None else 0
+
+    def summaries(self) -> Dict[str, Dict]:
+        summaries = {game_id: loads(raw) for game_id, raw in self.client.hgetall(self._summaries_key()).items()}
+        # Partidas guardadas antes de que existieran los resúmenes: se crean una vez
+        for game_id in self.client.smembers(self._index_key()) - summaries.keys():
+            loaded = self.load(game_id)
+            if loaded is not None:
+                summary = _rebuilt_summary(*loaded)
+                self.client.hset(self._summaries_key(), mapping={game_id: dumps(summary).decode("utf-8")})
+                summaries[game_id] = summary
+        return summaries
+
+    def _write(self, pipe, game_id: str, data: Dict, events: List[Dict]):
+        pipe.hset(self._game_key(game_id), mapping={
+            "version": data.get("version", 0),
+            "data": dumps(data).decode("utf-8")
+        })
+        pipe.sadd(self._index_key(), game_id)
+        pipe.hset(self._summaries_key(), mapping={game_id: dumps(game_summary(data)).decode("utf-8")})
+        for event in events:
+            pipe.rpush(self._events_key(game_id, event["g"]), dumps(event).decode("utf-8"))
+
+    def write_snapshot(self, game_id: str, data: Dict):
+        pipe = self.client.pipeline()
+        self._write(pipe, game_id, data, [])
+        pipe.execute()
+
+    def append_events(self, game_id: str, events: List[Dict]):
+        if events:
+            pipe = self.client.pipeline()
+            for event in events:
+                pipe.rpush(self._events_key(game_id, event["g"]), dumps(event).decode("utf-8"))
+            raw = self.client.hget(self._summaries_key(), game_id)
+            summary = _advance_summary(loads(raw) if raw is not None else None, events)
+            if summary is not None:
+                pipe.hset(self._summaries_key(), mapping={game_id: dumps(summary).decode("utf-8")})
+            pipe.execute()
+
+    def read_events(self, game_id: str, epoch: int) -> List[Dict]:
+        return [loads(raw) for raw in self.client.lrange(self._events_key(game_id, epoch), 0, -1)]
+
+    def delete(self, game_id: str):
+        pipe = self.client.pipeline()
+        pipe.delete(self._game_key(game_id))
+        pipe.srem(self._index_key(), game_id)
+        pipe.hdel(self._summaries_key(), game_id)
+        pipe.execute()
+
+    def compare_and_set(self, game_id: str, expected_version: int, data: Dict,
+                        events: List[Dict]) -> bool:
+        key = self._game_key(game_id)
+        pipe = self.client.pipeline()
+        try:
+            pipe.watch(key)  # WATCH/MULTI/EXEC: falla si otro nodo escribe entre medias
+            raw = pipe.hget(key, "version")
+            if (int(raw) if raw is not None else 0) != expected_version:
+                return False
+            pipe.multi()
+            self._write(pipe, game_id, data, events)
+            pipe.execute()
+            return True
+        except WatchError:
+            return False
+        finally:
+            pipe.reset()
+
+    def load_counters(self) -> Dict[str, float]:
+        return {key: _number(raw) for key, raw in self.client.hgetall(self._counters_key()).items()}
+
+    def increment_counters(self, deltas: Dict[str, float]):
+        if deltas:
+            key = self._counters_key()
+            pipe = self.client.pipeline()  # MULTI/EXEC: todos los incrementos o ninguno
+            for field, amount in deltas.items():
+                if isinstance(amount, int):
+                    pipe.hincrby(key, field, amount)
+                else:
+                    pipe.hincrbyfloat(key, field, amount)
+            pipe.execute()
+
+    def close(self):
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+
+class FakeRedis:
+    """Subconjunto en memoria de la API de redis-py (con WATCH/MULTI) para pruebas locales"""
+
+    def __init__(self):
+        self._data: Dict[str, object] = {}
+        self._revisions: Dict[str, int] = {}  # Cambios por clave, para WATCH
+        self._lock = threading.RLock()
+
+    def _touch(self, key: str):
+        self._revisions[key] = self._revisions.get(key, 0) + 1
+
+    def hget(self, key: str, field: str):
+        with self._lock:
+            return self._data.get(key, {}).get(field)
+
+    def hset(self, key: str, mapping: Dict):
+        with self._lock:
+            self._data.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+            self._touch(key)
+
+    def hgetall(self, key: str) -> Dict:
+        with self._lock:
+            return dict(self._data.get(key, {}))
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._data.get(key, {}).get(field, 0)) + amount
+            self.hset(key, {field: value})
+            return value
+
+    def hincrbyfloat(self, key: str, field: str, amount: float = 1.0) -> float:
+        with self._lock:
+            value = float(self._data.get(key, {}).get(field, 0)) + amount
+            self.hset(key, {field: repr(value)})
+            return value
+
+    def hdel(self, key: str, *fields):
+        with self._lock:
+            for field in fields:
+                self._data.get(key, {}).pop(field, None)
+            self._touch(key)
+
+    def sadd(self, key: str, *members):
+        with self._lock:
+            self._data.setdefault(key, set()).update(members)
+            self._touch(key)
+
+    def srem(self, key: str, *members):
+        with self._lock:
+            self._data.get(key, set()).difference_update(members)
+            self._touch(key)
+
+    def smembers(self, key: str):
+        with self._lock:
+            return set(self._data.get(key, set()))
+
+    def rpush(self, key: str, *values):
+        with self._lock:
+            self._data.setdefault(key, []).extend(values)
+            self._touch(key)
+
+    def lrange(self, key: str, start: int, end: int):
+        with self._lock:
+            values = self._data.get(key, [])
+            return list(values[start:] if end == -1 else values[start:end + 1])
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._touch(key)
+
+    def pipeline(self) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Pipeline de FakeRedis: inmediato tras WATCH, en cola tras MULTI o sin WATCH"""
+
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self.watched: Dict[str, int] = {}
+        self.queue: List[Tuple[str, tuple, dict]] = []
+        self.immediate = False
+
+    def watch(self, *keys):
+        with self.client._lock:
+            self.watched = {key: self.client._revisions.get(key, 0) for key in keys}
+        self.immediate = True
+
+    def multi(self):
+        self.immediate = False
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def call(*args, **kwargs):
+            if self.immediate:
+                return method(*args, **kwargs)
+            self.queue.append((name, args, kwargs))
+            return self
+        return call
+
+    def execute(self):
+        with self.client._lock:
+            for key, revision in self.watched.items():
+                if self.client._revisions.get(key, 0) != revision:
+                    self.reset()
+                    raise WatchError("Clave vigilada modificada")
+            results = [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.queue]
+        self.reset()
+        return results
+
+    def reset(self):
+        self.watched = {}
+        self.queue = []
+        self.immediate = False
+
+
+def create_backend(kind: str, state_dir: Path, archive_dir: Path, legacy_file: Optional[Path] = None,
+                   sqlite_path: Optional[Path] = None, redis_url: Optional[str] = None,
+                   counters_path: Optional[Path] = None) -> StateBackend:
+    """Backend según la configuración: "json", "sqlite", "redis" o "fakeredis" (pruebas)"""
+    if kind == "json":
+        return JsonFileBackend(state_dir, archive_dir, legacy_file, counters_path=counters_path)
+    if kind == "sqlite":
+        return SqliteBackend(sqlite_path or state_dir / "games.sqlite3")
+    if kind == "redis":
+        if redis is None:
+            raise RuntimeError("STATE_BACKEND=redis requiere el paquete 'redis' (pip install redis)")
+        return RedisBackend(redis.Redis.from_url(redis_url or "redis://localhost:6379/0", decode_responses=True))
+    if kind == "fakeredis":
+        return RedisBackend(FakeRedis())
+    raise ValueError(f"Backend de estado desconocido: {kind}")
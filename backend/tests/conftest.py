@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Los módulos del servidor se importan como en producción: desde backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def players():
+    """Jugadores de una partida nueva en las pruebas de la API"""
+    return [{"name": "Ana", "color": "ROJO"}, {"name": "Bo", "color": "AZUL"}]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Las rutas de estado del servidor son relativas al directorio de trabajo
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def api():
+    """Cliente HTTP contra la app en proceso (sin arrancar las tareas de fondo)"""
+    import httpx
+    import app as server
+
+    def client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+    return client
+
+
+@pytest.fixture
+def shared(workdir, monkeypatch):
+    """Backend compartido en memoria (FakeRedis) y contadores globales propios de la prueba"""
+    import app as server
+
+    backend = server.create_backend("fakeredis", workdir, workdir)
+    monkeypatch.setattr(server, "state_backend", backend)
+    monkeypatch.setattr(server, "global_stats", server.GlobalStats(server.VIRTUES, server.SINS,
+                                                                   server.PLAYER_COLORS))
+    return backend
@@ -0,0 +1,29 @@
+"""Analizador: la cadena de Markov exacta coincide con la simulación"""
+import numpy as np
+
+import analysis
+from board import compile_board
+
+VIRTUES = ["Oración"]
+SINS = ["Soberbia"]
+
+
+def test_exact_analysis_matches_simulation():
+    board = compile_board({5: {"end": 40, "virtue": "Oración"}}, {60: {"end": 10, "sin": "Soberbia"}},
+                          82, VIRTUES, SINS)
+    result = analysis.analyze_board(board, players=3, simulations=20000, seed=4)
+    exact = result["exact"]
+    assert (result["ladders"], result["snakes"]) == (1, 1)
+    assert np.isclose(sum(exact["distribution"]), 1.0, atol=1e-5)
+    assert exact["expected_turns"] == round(analysis.expected_turns_from(board), 3)
+    assert abs(result["simulation"]["mean_turns"] - exact["expected_turns"]) < 0.05 * exact["expected_turns"]
+    # Con más jugadores la partida acaba antes que la de uno solo
+    assert exact["expected_rounds"] < exact["expected_turns"]
+    assert exact["min_turns"] <= exact["percentiles"]["p10"] <= exact["percentiles"]["p90"]
+
+
+def test_ladders_shorten_and_snakes_lengthen_games():
+    empty = analysis.expected_turns_from(compile_board({}, {}, 82, VIRTUES, SINS))
+    ladder = analysis.expected_turns_from(compile_board({3: {"end": 70}}, {}, 82, VIRTUES, SINS))
+    snake = analysis.expected_turns_from(compile_board({}, {75: {"end": 2}}, 82, VIRTUES, SINS))
+    assert ladder < empty < snake
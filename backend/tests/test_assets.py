@@ -0,0 +1,33 @@
+"""Casillas del tablero con URL con hash: sin pérdida, inmutables y sin atlas por defecto"""
+import asyncio
+
+import app as server
+from assets import IMMUTABLE_CACHE, load_or_build_atlas
+
+
+async def board_and_tile(api):
+    async with api() as client:
+        board = (await client.get("/api/board")).json()
+        url = board["rows"][0]["cells"][0]["image"]
+        return board, await client.get(url)
+
+
+def test_tiles_are_served_unchanged_with_hashed_urls(workdir, api):
+    server.publish_static_assets()
+    board, tile = asyncio.run(board_and_tile(api))
+    assert board["atlas"] is None
+    cell = board["rows"][0]["cells"][0]
+    assert cell["image"].startswith("/assets/") and cell["sprite"] is None
+    assert tile.status_code == 200
+    assert tile.headers["cache-control"] == IMMUTABLE_CACHE
+    assert tile.content == (server.MAPA_DIR / f"{cell['number']:02d}.png").read_bytes()
+
+
+def test_atlas_is_cached_for_deploy_time_builds(workdir, tmp_path):
+    rows = [[1, 2], [4, 3]]
+    atlas = load_or_build_atlas(server.MAPA_DIR, rows, tmp_path / "cache", quantize=True)
+    assert set(atlas["cells"]) == {1, 2, 3, 4}
+    assert (tmp_path / "cache" / "board-atlas.png").read_bytes() == atlas["png"]
+    # Segunda llamada (arranque tras el despliegue): se lee de la caché sin reconstruir
+    again = load_or_build_atlas(server.MAPA_DIR, rows, tmp_path / "cache", quantize=True)
+    assert again["png"] == atlas["png"] and again["cells"] == atlas["cells"]
@@ -0,0 +1,100 @@
+"""Tablero: documento cacheado con ETag y gzip, generador acotado y tabla compilada"""
+import asyncio
+import gzip
+import json
+
+import app as server
+from board import GOAL_MARGIN
+
+
+async def fetch_board(api, players, game_id: str):
+    async with api() as client:
+        params = {"game_id": game_id}
+        await client.request("GET", "/api/game/start", params=params,
+                             json={"players": players, "seed": 21, "dice_seed": 1})
+        plain = await client.get("/api/board", params=params, headers={"Accept-Encoding": "identity"})
+        etag = plain.headers["etag"]
+        cached = await client.get("/api/board", params=params, headers={"If-None-Match": f"W/{etag}"})
+        # El cliente HTTP descomprime solo: se pide el cuerpo tal cual llega
+        async with client.stream("GET", "/api/board", params=params,
+                                 headers={"Accept-Encoding": "gzip"}) as response:
+            compressed = (response.headers, b"".join([chunk async for chunk in response.aiter_raw()]))
+        await client.request("GET", "/api/game/start", params=params,
+                             json={"players": players, "seed": 22, "dice_seed": 1})
+        changed = await client.get("/api/board", params=params, headers={"If-None-Match": etag})
+        return plain, cached, compressed, changed
+
+
+def test_board_revalidates_with_etag_and_serves_gzip(workdir, api, players):
+    plain, cached, (headers, raw), changed = asyncio.run(fetch_board(api, players, "tablero-etag"))
+    assert plain.status_code == 200 and "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+    assert cached.status_code == 304 and cached.headers["etag"] == plain.headers["etag"]
+
+    assert headers["content-encoding"] == "gzip" and headers["etag"] == plain.headers["etag"]
+    assert gzip.decompress(raw) == plain.content
+    assert json.loads(plain.content)["seed"] == 21
+
+    # Un tablero nuevo cambia el ETag: la copia del cliente deja de valer
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != plain.headers["etag"]
+    assert json.loads(changed.content)["seed"] == 22
+
+
+def test_generator_is_seeded_and_lands_in_the_target_range():
+    first = server.build_board(1234)
+    assert server.build_board(1234) == first
+    assert server.build_board(1235)["ladders"] != first["ladders"]
+
+    low, high = server.BOARD_TARGET_TURNS
+    for seed in range(20):
+        board = server.build_board(seed)
+        assert board["in_target"] and low <= board["expected_turns"] <= high
+        assert (len(board["ladders"]), len(board["snakes"])) == (6, 6)
+        # Ninguna casilla compartida, nada en la salida ni en las últimas casillas
+        server.validate_layout(board["ladders"], board["snakes"], server.MAX_CELL)
+        starts = list(board["ladders"]) + list(board["snakes"])
+        assert all(1 < start <= server.MAX_CELL - GOAL_MARGIN for start in starts)
+
+
+async def exercise_pool(pool):
+    async def filled():
+        while len(pool.boards) < pool.capacity:
+            await asyncio.sleep(0.01)
+
+    pool.start()
+    try:
+        await asyncio.wait_for(filled(), 10)
+        taken = [pool.take() for _ in range(pool.capacity + 1)]
+        # Vaciarse por debajo del mínimo despierta el relleno en segundo plano
+        await asyncio.wait_for(filled(), 10)
+    finally:
+        await pool.stop()
+    return taken
+
+
+def test_board_pool_serves_hits_and_refills_after_misses():
+    pool = server.BoardPool(capacity=4, low_water=1, batch=2)
+    taken = asyncio.run(exercise_pool(pool))
+    assert all(board is not None for board in taken[:4]) and taken[4] is None
+    metrics = pool.metrics()
+    assert (metrics["served"], metrics["misses"]) == (4, 1)
+    assert metrics["size"] == 4 and metrics["generated"] == 8
+    assert all(board["in_target"] for board in taken[:4])
+
+
+def test_compiled_board_resolves_like_the_layout():
+    board = server.build_board(77)
+    compiled = server.compile_board(board["ladders"], board["snakes"], server.MAX_CELL,
+                                    server.VIRTUES, server.SINS)
+    for position in range(1, server.MAX_CELL):
+        for steps in range(1, 7):
+            landing = min(position + steps, server.MAX_CELL)
+            element = board["ladders"].get(landing) or board["snakes"].get(landing)
+            expected_code = 0
+            if landing in board["ladders"]:
+                expected_code = server.EFFECT_LADDER | server.VIRTUES.index(element["virtue"])
+            elif landing in board["snakes"]:
+                expected_code = server.EFFECT_SNAKE | server.SINS.index(element["sin"])
+            end = element["end"] if element else landing
+            assert compiled.resolve(position, steps) == (landing, end, expected_code)
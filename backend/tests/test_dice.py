@@ -0,0 +1,33 @@
+"""Dado por partida: tiradas sueltas, lotes y saltos dan la misma secuencia"""
+import numpy as np
+
+import app as server
+import simulation
+from dice import DiceStream
+
+
+def test_batches_and_single_rolls_match():
+    single = DiceStream(12345)
+    rolls = [single.roll() for _ in range(200)]
+    assert rolls == DiceStream(12345).draw(200).tolist()
+    assert set(rolls) <= set(range(1, 7))
+
+
+def test_skip_and_snapshot_resume_the_stream():
+    dice = DiceStream(7)
+    head = [dice.roll() for _ in range(70)]
+    rest = [dice.roll() for _ in range(30)]
+    skipped = DiceStream(7)
+    skipped.skip(len(head))
+    assert [skipped.roll() for _ in range(30)] == rest
+    resumed = DiceStream.from_dict(dice.to_dict())
+    assert resumed.draw(5).tolist() == DiceStream(7).draw(105)[100:].tolist()
+
+
+def test_simulation_is_reproducible_per_seed():
+    room = server.GameRoom("dados-simulacion")
+    server.generate_game_elements(room, 5)
+    first = simulation.simulate(room.board, 3000, 3, seed=9, parallel=False)
+    assert first == simulation.simulate(room.board, 3000, 3, seed=9, parallel=False)
+    assert first["finished"] == 3000
+    assert np.isclose(sum(first["win_rate_by_seat"]), 1.0, atol=1e-3)
@@ -0,0 +1,40 @@
+"""Registro compacto de la partida: mismo contenido que los modelos Pydantic"""
+from datetime import datetime
+
+import pytest
+
+import app as server
+from game_record import GameRecord, MAX_PLAYERS
+
+
+def sample_record() -> GameRecord:
+    record = GameRecord()
+    record.add_player("Ana", "ROJO", "/img/JugadorRojo.png", position=12, ladders=2, snakes=1)
+    record.add_player("Luis", "VERDE", "/img/JugadorVerde.png", position=40, ladders=0, snakes=3)
+    record.current_player_index = 1
+    record.total_turns = 17
+    record.ladders_climbed = 2
+    record.snakes_found = 4
+    record.game_started = True
+    record.start_time = datetime(2026, 3, 4, 5, 6, 7)
+    return record
+
+
+def test_record_round_trips_through_the_snapshot_model():
+    record = sample_record()
+    model = server.GameState(**record.to_dict())
+    assert model.model_dump() == record.to_dict()
+    assert record.player_dict(0) == model.players[0].model_dump()
+    assert GameRecord.from_model(model).to_dict() == record.to_dict()
+
+
+def test_players_are_added_and_removed_from_the_end():
+    record = sample_record()
+    assert record.pop_player()["name"] == "Luis"
+    assert (record.count, record.names, record.positions[1], record.snakes[1]) == (1, ["Ana"], 0, 0)
+    while record.count < MAX_PLAYERS:
+        record.add_player("Bot", "AZUL")
+    with pytest.raises(ValueError):
+        record.add_player("Sobra", "AZUL")
+    record.clear_players()
+    assert record.count == 0 and record.to_dict()["players"] == []
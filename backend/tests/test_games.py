@@ -0,0 +1,35 @@
+"""El listado de partidas no cambia cuando una sala se desaloja de memoria"""
+import asyncio
+
+import pytest
+
+import app as server
+
+
+def by_id(listing):
+    return {game["game_id"]: {key: value for key, value in game.items() if key != "loaded"}
+            for game in listing["games"]}
+
+
+async def list_before_and_after_eviction(api, players, game_id: str, monkeypatch):
+    async with api() as client:
+        params = {"game_id": game_id}
+        await client.request("GET", "/api/game/start", params=params, json={"players": players})
+        for _ in range(3):
+            await client.post("/api/game/move", params=params, json={})
+        before = (await client.get("/api/games")).json()
+        await server.persistence.flush()
+        server.registry.remove(game_id)
+        # Listar usa los resúmenes del backend: ni snapshots ni diarios
+        monkeypatch.setattr(server.state_backend, "load", lambda game_id: pytest.fail("snapshot leído"))
+        monkeypatch.setattr(server.persistence, "flush", lambda: pytest.fail("volcado al listar"))
+        after = (await client.get("/api/games")).json()
+        return before, after
+
+
+def test_evicted_games_stay_listed(workdir, api, players, monkeypatch):
+    before, after = asyncio.run(list_before_and_after_eviction(api, players, "desalojada", monkeypatch))
+    assert by_id(after)["desalojada"] == by_id(before)["desalojada"] == {
+        "game_id": "desalojada", "total_players": 2, "game_started": True, "total_turns": 3}
+    assert after["total"] == before["total"]
+    assert [game["loaded"] for game in after["games"] if game["game_id"] == "desalojada"] == [False]
@@ -0,0 +1,29 @@
+"""Prueba de carga: los clientes simulados juegan partidas completas sin errores"""
+import asyncio
+
+import app as server
+import loadtest
+
+
+async def run(api, clients: int):
+    async with api() as client:
+        return await loadtest.run_load(client, clients, duration=30.0, games=1, poll_every=3,
+                                       think_s=0.0, ramp_up=0.0, seed=4)
+
+
+def test_simulated_players_finish_their_games(workdir, api, monkeypatch):
+    monkeypatch.setattr(server, "log_writer", server.LogWriter())
+    report = asyncio.run(run(api, 3))
+    assert report["clients"] == 3 and report["error_rate"] == 0.0
+    assert report["games_finished"] + report["games_abandoned"] == 3
+    assert set(report["endpoints"]) == {"start", "move", "state", "save_log"}
+    assert report["endpoints"]["start"]["requests"] == report["endpoints"]["save_log"]["requests"] == 3
+    assert report["requests"] == sum(row["requests"] for row in report["endpoints"].values())
+    latency = report["latency"]
+    assert latency["p50_ms"] <= latency["p95_ms"] <= latency["p99_ms"] <= latency["max_ms"]
+
+
+def test_percentiles_pick_from_sorted_samples():
+    assert loadtest.percentiles([]) == {}
+    samples = [i / 1000 for i in range(100, 0, -1)]
+    assert loadtest.percentiles(samples) == {"p50_ms": 51.0, "p95_ms": 96.0, "p99_ms": 100.0, "max_ms": 100.0}
@@ -0,0 +1,143 @@
+"""Índice de logs: paginación con cursor, filtros y lecturas que sobreviven a la rotación"""
+import asyncio
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import app as server
+
+
+def write_logs(path, entries):
+    with open(path, "ab") as f:
+        for entry in entries:
+            f.write(json.dumps(entry).encode() + b",\n")
+
+
+def sample(count, offset=0):
+    return [{"timestamp": f"2026-01-01T00:{(offset + i) // 60:02d}:{(offset + i) % 60:02d}",
+             "status": "victoria" if (offset + i) % 3 == 0 else "movimiento",
+             "winner": "rojo" if (offset + i) % 6 == 0 else None,
+             "n": offset + i} for i in range(count)]
+
+
+def test_cursor_pages_through_filtered_entries(tmp_path):
+    store = server.LogStore(tmp_path / "game_logs.json")
+    write_logs(store.path, sample(30))
+
+    seen, cursor = [], None
+    while True:
+        logs, cursor, count = store._query_current(4, cursor, "victoria", None, None, None)
+        seen = [entry["n"] for entry in logs] + seen
+        if cursor is None:
+            break
+    assert count == 30
+    assert sorted(seen) == [n for n in range(30) if n % 3 == 0]
+
+    logs, _, _ = store._query_current(10, None, None, "rojo", None, None)
+    assert [entry["n"] for entry in logs] == [24, 18, 12, 6, 0]
+    low = server.log_timestamp("2026-01-01T00:00:10")
+    high = server.log_timestamp("2026-01-01T00:00:12")
+    logs, _, _ = store._query_current(10, None, None, None, low, high)
+    assert [entry["n"] for entry in logs] == [12, 11, 10]
+
+
+def test_rotation_invalidates_cursors(tmp_path):
+    store = server.LogStore(tmp_path / "game_logs.json")
+    write_logs(store.path, sample(10))
+    _, cursor, _ = store._query_current(3, None, None, None, None, None)
+    os.rename(store.path, tmp_path / "rotado.json")
+    store.reset()
+    with pytest.raises(ValueError):
+        store._query_current(3, cursor, None, None, None, None)
+
+
+def test_rotation_during_a_query_reads_the_indexed_file(tmp_path, monkeypatch):
+    store = server.LogStore(tmp_path / "game_logs.json")
+    write_logs(store.path, sample(10))
+    read_entries = store._read_entries
+
+    # El log rota justo después de tomar el índice y antes de leer las líneas
+    def rotate_then_read(handle, offsets, selected):
+        os.rename(store.path, tmp_path / "rotado.json")
+        write_logs(store.path, sample(10, offset=100))
+        return read_entries(handle, offsets, selected)
+
+    monkeypatch.setattr(store, "_read_entries", rotate_then_read)
+    logs, _, _ = store._query_current(3, None, None, None, None, None)
+    assert [entry["n"] for entry in logs] == [9, 8, 7]
+
+
+@pytest.fixture
+def logs(workdir, monkeypatch):
+    """Índice y archivo de logs nuevos en el directorio temporal"""
+    monkeypatch.setattr(server, "log_store", server.LogStore())
+    archive = server.LogArchive()
+    monkeypatch.setattr(server, "log_archive", archive)
+    yield archive
+    archive.shutdown()
+
+
+async def save_logs(api, writer, count: int):
+    writer.start()
+    async with api() as client:
+        responses = await asyncio.gather(*[
+            client.post("/api/game/save_log", json={"status": "victoria" if i % 2 else "movimiento",
+                                                    "coordinates": {"n": i}, "winner": None})
+            for i in range(count)])
+    await writer.stop()
+    async with api() as client:
+        page = (await client.get("/api/game/logs", params={"limit": 5, "status": "victoria"})).json()
+    return [response.status_code for response in responses], page
+
+
+def test_saved_logs_are_written_in_batches_and_indexed(logs, api, monkeypatch):
+    writer = server.LogWriter()
+    monkeypatch.setattr(server, "log_writer", writer)
+    statuses, page = asyncio.run(save_logs(api, writer, 40))
+    assert statuses == [200] * 40
+    assert writer.written == 40 and writer.batches < 40
+    assert page["indexed_entries"] == 40
+    assert [entry["coordinates"]["n"] for entry in page["logs"]] == [31, 33, 35, 37, 39]
+
+
+async def overflow(writer):
+    # Sin escritor activo la cola se llena y el resto se rechaza
+    return [await writer.submit({"n": i}) for i in range(3)]
+
+
+def test_full_log_queue_rejects_entries(monkeypatch):
+    monkeypatch.setattr(server, "LOG_QUEUE_SIZE", 2)
+    monkeypatch.setattr(server, "LOG_ENQUEUE_TIMEOUT_S", 0.01)
+    writer = server.LogWriter()
+    assert asyncio.run(overflow(writer)) == [True, True, False]
+    assert writer.rejected == 1
+
+
+def test_rotated_logs_are_archived_and_paged_after_the_current_file(logs):
+    writer = server.LogWriter(max_bytes=1500)
+    entries = [{"timestamp": f"2026-01-01T00:00:{i:02d}", "status": "victoria" if i % 4 == 0 else "movimiento",
+                "winner": None, "n": i} for i in range(60)]
+    for start in range(0, 60, 10):
+        writer._write_batch(entries[start:start + 10])
+    writer._close()
+    logs._executor.submit(lambda: None).result()  # Espera a que se compriman los segmentos
+
+    assert len(logs.segments) >= 2
+    assert not list(server.Path(".").glob(server.LOG_BACKUP_PATTERN))
+    assert sum(meta["count"] for meta in logs.segments) + len(server.log_store.offsets) == 60
+    assert all(meta["compressed_bytes"] < meta["raw_bytes"] for meta in logs.segments)
+
+    def page_through(**filters):
+        seen, cursor = [], None
+        while True:
+            page = server.log_store.query(limit=7, cursor=cursor, **filters)
+            seen = [entry["n"] for entry in page["logs"]] + seen
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return seen
+
+    assert page_through() == list(range(60))
+    assert page_through(status="victoria") == list(range(0, 60, 4))
+    assert page_through(since=datetime(2026, 1, 1, 0, 0, 50)) == list(range(50, 60))
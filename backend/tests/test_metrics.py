@@ -0,0 +1,42 @@
+"""Métricas: formato de texto de Prometheus y latencia por plantilla de ruta"""
+import asyncio
+
+from metrics import CONTENT_TYPE, MetricsRegistry
+
+
+def test_exposition_format_accumulates_buckets():
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "Peticiones", ("route",))
+    latency = registry.histogram("demo_seconds", "Latencia", buckets=(0.1, 1.0))
+    registry.gauge("demo_rooms", "Salas", lambda: 3)
+    requests.inc("/a")
+    requests.inc("/a", amount=2)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == ["# HELP demo_requests_total Peticiones", "# TYPE demo_requests_total counter",
+                         'demo_requests_total{route="/a"} 3']
+    assert "# TYPE demo_seconds histogram" in lines
+    assert [line for line in lines if line.startswith("demo_seconds")] == [
+        'demo_seconds_bucket{le="0.1"} 1', 'demo_seconds_bucket{le="1"} 2', 'demo_seconds_bucket{le="+Inf"} 3',
+        "demo_seconds_sum 5.550000", "demo_seconds_count 3"]
+    assert lines[-1] == "demo_rooms 3"
+
+
+async def scrape(api):
+    async with api() as client:
+        await client.get("/api/board")
+        await client.get("/assets/no-existe.png")
+        return await client.get("/metrics")
+
+
+def test_metrics_endpoint_labels_requests_by_route_template(workdir, api):
+    response = asyncio.run(scrape(api))
+    assert response.headers["content-type"] == CONTENT_TYPE
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/board",status="200"}' in body
+    # Las rutas con parámetros se agrupan por plantilla, no por URL real
+    assert 'route="/assets/{filename}",status="404"' in body
+    assert "no-existe" not in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/board"}' in body
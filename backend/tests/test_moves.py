@@ -0,0 +1,53 @@
+"""La respuesta de un movimiento basta para actualizar al cliente sin pedir /state"""
+import asyncio
+
+import app as server
+
+
+async def move_and_fetch(api, players, game_id: str):
+    async with api() as client:
+        params = {"game_id": game_id}
+        await client.request("GET", "/api/game/start", params=params,
+                             json={"players": players, "seed": 8, "dice_seed": 1})
+        before = (await client.get("/api/game/state", params=params)).json()
+        queue = server.broadcaster.subscribe(game_id)
+        results = [(await client.post("/api/game/move", params=params, json={})).json() for _ in range(12)]
+        echo = queue.get_nowait()
+        server.broadcaster.unsubscribe(game_id, queue)
+        after = (await client.get("/api/game/state", params=params)).json()
+        return before, results, echo, after
+
+
+def test_move_result_carries_the_whole_delta(workdir, api, players):
+    before, results, echo, after = asyncio.run(move_and_fetch(api, players, "deltas"))
+    assert [result["version"] for result in results] == list(range(before["version"] + 1,
+                                                                   before["version"] + 13))
+    assert b'"version":%d' % results[0]["version"] in echo
+    last = results[-1]
+    assert last["version"] == after["version"]
+    assert after["players"][last["player_index"]]["stats"] == last["stats"]
+    for key in ("current_player_index", "total_turns", "ladders_climbed", "snakes_found"):
+        assert last[key] == after[key]
+
+
+async def move_with_steps(api, players, game_id: str):
+    async with api() as client:
+        params = {"game_id": game_id}
+        await client.request("GET", "/api/game/start", params=params, json={"players": players})
+        state = (await client.get("/api/game/state", params=params)).json()
+        response = await client.post("/api/game/move", params=params, json={"steps": 6})
+        return state, response
+
+
+def test_client_dice_is_rejected_by_default(workdir, api, players):
+    assert not server.CLIENT_DICE_ALLOWED
+    state, response = asyncio.run(move_with_steps(api, players, "sin-dado-cliente"))
+    assert state["client_dice"] is False
+    assert response.status_code == 400
+
+
+def test_client_dice_can_be_enabled(workdir, api, players, monkeypatch):
+    monkeypatch.setattr(server, "CLIENT_DICE_ALLOWED", True)
+    _, response = asyncio.run(move_with_steps(api, players, "dado-cliente"))
+    assert response.status_code == 200
+    assert response.json()["steps"] == 6
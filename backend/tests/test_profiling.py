@@ -0,0 +1,53 @@
+"""Perfilado: muestreo solo activo bajo demanda y cambiable solo con el token de administración"""
+import asyncio
+import tracemalloc
+
+import app as server
+from profiling import Profiler
+
+
+async def configure(api, headers=None):
+    async with api() as client:
+        response = await client.post("/api/profiling", headers=headers or {},
+                                     json={"enabled": True, "trace_memory": True})
+        return response.status_code
+
+
+def test_profiling_requires_admin_token(api, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", None)
+    assert asyncio.run(configure(api, {"X-Admin-Token": "cualquiera"})) == 403
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secreto")
+    assert asyncio.run(configure(api)) == 403
+    assert asyncio.run(configure(api, {"X-Admin-Token": "otro"})) == 403
+    assert not server.profiler.enabled
+    try:
+        assert asyncio.run(configure(api, {"X-Admin-Token": "secreto"})) == 200
+        assert server.profiler.enabled and server.profiler.trace_memory
+    finally:
+        server.profiler.configure(False, trace_memory=False)
+
+
+def test_profiler_samples_only_while_enabled(tmp_path):
+    profiler = Profiler(tmp_path / "muestras.jsonl", sample_rate=1.0)
+
+    @profiler.profile("suma")
+    def add(a, b):
+        return a + b
+
+    assert add(1, 2) == 3
+    assert profiler.summary()["functions"] == {}
+
+    profiler.configure(enabled=True, trace_memory=True)
+    try:
+        assert [add(i, i) for i in range(10)] == [2 * i for i in range(10)]
+    finally:
+        profiler.configure(enabled=False)
+    assert not tracemalloc.is_tracing()
+
+    function = profiler.summary()["functions"]["suma"]
+    assert function["calls"] == function["samples"] == 10
+    assert function["p50_ms"] <= function["p99_ms"] <= function["max_ms"]
+    assert function["mean_alloc_bytes"] is not None
+    assert profiler.flush() == 10
+    assert len((tmp_path / "muestras.jsonl").read_text().splitlines()) == 10
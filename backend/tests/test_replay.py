@@ -0,0 +1,97 @@
+"""La repetición reproduce la partida: seek(último turno) coincide con /api/game/state"""
+import asyncio
+
+import app as server
+
+
+def assert_replay_matches(state, seek):
+    assert seek["total_turns"] == state["total_turns"]
+    assert seek["positions"] == [player["position"] for player in state["players"]]
+    assert seek["ladders"] == [player["stats"]["ladders"] for player in state["players"]]
+    assert seek["snakes"] == [player["stats"]["snakes"] for player in state["players"]]
+    assert seek["current_player_index"] == state["current_player_index"]
+
+
+async def play(api, players, game_id: str):
+    async with api() as client:
+        params = {"game_id": game_id}
+
+        async def move(times):
+            for _ in range(times):
+                response = await client.post("/api/game/move", params=params, json={})
+                assert response.status_code == 200
+
+        async def check():
+            state = (await client.get("/api/game/state", params=params)).json()
+            seek = (await client.get("/api/game/replay/seek",
+                                     params={**params, "turn": state["total_turns"]})).json()
+            assert_replay_matches(state, seek)
+            return state
+
+        response = await client.request("GET", "/api/game/start", params=params,
+                                        json={"players": players, "seed": 11, "dice_seed": 5})
+        assert response.status_code == 200
+        await client.post("/api/game/add_player", params=params)
+        await move(6)
+        await check()
+        await client.post("/api/game/remove_player", params=params)
+        await client.post("/api/game/add_player", params=params)
+        await move(3)
+        before = await check()
+        assert len(before["players"]) == 3
+
+        # Desalojo y recarga desde el backend: la repetición se restaura con la partida
+        await server.persistence.flush()
+        server.registry.remove(game_id)
+        after = await check()
+        assert after["players"] == before["players"]
+        await move(2)
+        await check()
+        await server.persistence.flush()
+
+
+def test_replay_matches_state_across_roster_changes_and_reload(workdir, api, players):
+    asyncio.run(play(api, players, "replay-test"))
+
+    # Arranque en frío: la sala se reconstruye solo con lo guardado
+    room = server.GameStateManager.load_room("replay-test")
+    seek = server.replay.decode(room.replay.encoded()).seek(10 ** 6)
+    state = server.loads(room.state_document())
+    assert_replay_matches(state, seek)
+
+
+async def fetch_replay_edges(api, players, game_id: str):
+    async with api() as client:
+        params = {"game_id": game_id}
+        await client.request("GET", "/api/game/start", params=params,
+                             json={"players": players, "seed": 11, "dice_seed": 5})
+        for _ in range(4):
+            await client.post("/api/game/move", params=params, json={})
+        first = await client.get("/api/game/replay", params=params)
+        etag = first.headers["etag"]
+        revalidated = [(await client.get("/api/game/replay", params=params,
+                                         headers={"If-None-Match": header})).status_code
+                       for header in (f'"otra", {etag}', f"W/{etag}", "*", '"otra"')]
+        beyond = await client.get("/api/game/replay/seek", params={**params, "turn": 5})
+
+        # Una repetición archivada dañada es un 400, no un error del servidor
+        server.write_replay(server.replay_path(game_id, 99), b"no es una repeticion")
+        damaged = await client.get("/api/game/replay/seek", params={**params, "turn": 0, "epoch": 99})
+        return first, revalidated, beyond, damaged
+
+
+def test_replay_revalidation_and_seek_errors(workdir, api, players):
+    first, revalidated, beyond, damaged = asyncio.run(fetch_replay_edges(api, players, "replay-bordes"))
+    assert revalidated == [304, 304, 304, 200]
+    assert beyond.status_code == 404
+    assert damaged.status_code == 400
+
+    # Codificar y decodificar conserva tablero, jugadores y tiradas
+    played = server.replay.decode(first.content)
+    room = server.registry.rooms["replay-bordes"]
+    document = played.to_dict(server.PLAYER_COLORS)
+    assert [player for player, _ in document["moves"]] == [0, 1, 0, 1]
+    assert all(1 <= steps <= 6 for _, steps in document["moves"])
+    assert [player["color"] for player in document["players"]] == [player["color"] for player in players]
+    assert played.board.dest == room.board.dest and played.board.effect == room.board.effect
+    assert played.seek(4) == server.replay.decode(room.replay.encoded()).seek(4)
@@ -0,0 +1,41 @@
+"""Respuestas pre-codificadas: mismo contenido que el camino con Pydantic"""
+import asyncio
+from datetime import datetime
+
+import app as server
+from serialization import dumps, loads
+
+
+def test_dumps_handles_board_keys_and_dates():
+    when = datetime(2026, 1, 2, 3, 4, 5)
+    assert loads(dumps({5: {"end": 25}, "at": when})) == {"5": {"end": 25}, "at": when.isoformat()}
+
+
+async def play(api, players, game_id: str):
+    async with api() as client:
+        params = {"game_id": game_id}
+        await client.request("GET", "/api/game/start", params=params,
+                             json={"players": players, "seed": 8, "dice_seed": 3})
+        for _ in range(7):
+            await client.post("/api/game/move", params=params, json={})
+        state = await client.get("/api/game/state", params=params)
+        current = await client.get("/api/game/current_player", params=params)
+        return state, current
+
+
+def test_cached_state_matches_the_pydantic_model(workdir, api, players):
+    state, current = asyncio.run(play(api, players, "serializacion"))
+    room = server.registry.rooms["serializacion"]
+    model = server.GameState(**room.game_state.to_dict())
+    expected = loads(dumps(model.model_dump()))
+
+    document = state.json()
+    assert state.headers["content-type"].startswith("application/json")
+    assert {key: document[key] for key in expected} == expected
+    assert document["current_player"] == expected["players"][model.current_player_index]
+    assert current.json()["current_player"] == document["current_player"]
+
+    # Los fragmentos cacheados coinciden con una codificación desde cero
+    cached = room.state_document()
+    room.invalidate_state()
+    assert room.state_document() == cached
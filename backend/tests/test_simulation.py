@@ -0,0 +1,43 @@
+"""Simulación masiva: resultados reproducibles, en bloque o por streaming"""
+import asyncio
+import json
+
+import simulation
+from board import compile_board
+
+BOARD = {"ladders": {"4": 30, "20": 55}, "snakes": {"50": 12, "70": 33}}
+
+
+async def simulate_over_api(api, **extra):
+    async with api() as client:
+        request = {"games": 4000, "players": 3, "seed": 8, **BOARD, **extra}
+        return await client.post("/api/simulate", json=request)
+
+
+def test_simulate_endpoint_is_reproducible_and_streams_the_same_result(workdir, api):
+    first = asyncio.run(simulate_over_api(api)).json()
+    assert asyncio.run(simulate_over_api(api)).json() == first
+    assert first["board"] == {"source": "request"}
+    assert first["games"] == 4000 and sum(first["wins_by_seat"]) == first["finished"]
+
+    lines = [json.loads(line) for line in asyncio.run(simulate_over_api(api, stream=True)).text.splitlines()]
+    assert [line["type"] for line in lines] == ["progress", "done"]
+    done = {key: value for key, value in lines[-1].items() if key != "type"}
+    assert done == first
+
+
+def test_invalid_boards_are_rejected(workdir, api):
+    response = asyncio.run(simulate_over_api(api, ladders={"40": 10}))
+    assert response.status_code == 400
+
+
+def test_chunks_merge_into_the_whole_run():
+    board = compile_board({4: {"end": 30}}, {50: {"end": 12}}, 82, [], [])
+    plan = simulation.chunk_plan(2500, 5, chunk_games=1000)
+    assert [size for size, _ in plan] == [1000, 1000, 500]
+    total = simulation.empty_stats(2)
+    for size, chunk_seed in plan:
+        simulation.merge_stats(total, simulation.simulate_chunk(board, size, 2, chunk_seed))
+    summary = simulation.summarize(total)
+    assert summary["games"] == 2500 and summary["finished"] == 2500
+    assert sum(summary["wins_by_seat"]) == 2500
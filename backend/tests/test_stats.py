@@ -0,0 +1,95 @@
+"""Virtudes y pecados globales: cuentan solo partidas terminadas, al cerrarse"""
+import asyncio
+
+import app as server
+
+
+def effect_totals():
+    summary = server.global_stats.summary()
+    return (sum(entry["hits"] for entry in summary["ladders_by_virtue"]),
+            sum(entry["hits"] for entry in summary["snakes_by_sin"]))
+
+
+async def play(api, players, game_id: str, until_victory: bool, moves: int = 2000):
+    async with api() as client:
+        params = {"game_id": game_id}
+        response = await client.request("GET", "/api/game/start", params=params,
+                                        json={"players": players, "seed": 3, "dice_seed": 9})
+        assert response.status_code == 200
+        await client.post("/api/game/add_player", params=params)
+        for turn in range(moves):
+            if turn == 5:
+                await client.post("/api/game/remove_player", params=params)
+            result = (await client.post("/api/game/move", params=params, json={})).json()
+            if until_victory and result["victory"]:
+                break
+        return (await client.get("/api/game/state", params=params)).json()
+
+
+def test_abandoned_game_adds_no_virtues_or_sins(workdir, api, players):
+    before = effect_totals()
+    state = asyncio.run(play(api, players, "abandonada", until_victory=False, moves=12))
+    assert state["ladders_climbed"] + state["snakes_found"] > 0
+    assert effect_totals() == before
+
+
+def test_finished_game_counts_every_ladder_and_snake(workdir, api, players):
+    before = effect_totals()
+    state = asyncio.run(play(api, players, "terminada", until_victory=True))
+    ladders, snakes = effect_totals()
+    assert (ladders - before[0], snakes - before[1]) == (state["ladders_climbed"], state["snakes_found"])
+
+
+async def play_with_conflicts(api, players, game_id: str, monkeypatch):
+    async with api() as client:
+        params = {"game_id": game_id}
+        response = await client.request("GET", "/api/game/start", params=params,
+                                        json={"players": players, "seed": 3, "dice_seed": 9})
+        assert response.status_code == 200
+
+        # El primer intento de cada movimiento pierde la carrera contra otro worker
+        commit = server.persistence.commit
+        attempts = []
+
+        async def lose_first_attempt(room):
+            attempts.append(room.version)
+            if len(attempts) % 2:
+                return False
+            return await commit(room)
+
+        monkeypatch.setattr(server.persistence, "commit", lose_first_attempt)
+        for _ in range(2000):
+            result = (await client.post("/api/game/move", params=params, json={})).json()
+            if result["victory"]:
+                break
+        state = (await client.get("/api/game/state", params=params)).json()
+        await server.persistence.flush()
+        stats = (await client.get("/api/stats/global")).json()
+        return state, stats, len(attempts)
+
+
+def test_retried_moves_are_counted_once(shared, api, players, monkeypatch):
+    state, stats, attempts = asyncio.run(play_with_conflicts(api, players, "reintentos", monkeypatch))
+    assert attempts == 2 * state["total_turns"]
+    assert stats["moves"] == state["total_turns"]
+    assert stats["games_finished"] == 1
+    assert sum(entry["hits"] for entry in stats["ladders_by_virtue"]) == state["ladders_climbed"]
+    # Los totales viven en el backend, no en la memoria de este worker
+    assert shared.load_counters()["moves"] == state["total_turns"]
+
+
+def test_room_counts_survive_reload_and_match_the_replay(workdir, api, players):
+    asyncio.run(play(api, players, "recarga", until_victory=False, moves=40))
+    room = server.registry.rooms["recarga"]
+    assert room.ladder_hits or room.snake_hits
+    assert (room.ladder_hits, room.snake_hits) == server.replayed_effect_hits(room)
+
+    asyncio.run(server.persistence.flush())
+    reloaded = server.GameStateManager.load_room("recarga")
+    assert (reloaded.ladder_hits, reloaded.snake_hits) == (room.ladder_hits, room.snake_hits)
+
+    # Snapshots anteriores sin contadores: se recuentan desde la repetición guardada
+    legacy = server.GameStateManager.snapshot(room)
+    del legacy["effect_hits"]
+    restored = server.GameStateManager.room_from_data("recarga", legacy, [])
+    assert (restored.ladder_hits, restored.snake_hits) == (room.ladder_hits, room.snake_hits)
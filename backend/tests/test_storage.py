@@ -0,0 +1,149 @@
+"""Contrato de los backends de estado: compare-and-set con versiones"""
+import pytest
+
+from storage import FakeRedis, RedisBackend, StateBackend, WatchError, create_backend
+
+
+def snapshot(version, turn=0):
+    return {"game_id": "g", "epoch": 1, "version": version, "game_state": {"total_turns": turn}}
+
+
+def move(turn):
+    return {"g": 1, "n": turn, "p": 0, "s": 3, "to": 4, "fx": None}
+
+
+@pytest.fixture(params=["json", "sqlite", "fakeredis"])
+def backend(request, tmp_path):
+    backend = create_backend(request.param, tmp_path / "states", tmp_path / "archive",
+                             sqlite_path=tmp_path / "games.sqlite3")
+    yield backend
+    backend.close()
+
+
+def test_backend_is_abstract():
+    class Incomplete(StateBackend):
+        def load(self, game_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_compare_and_set_rejects_stale_version(backend):
+    assert backend.compare_and_set("g", 0, snapshot(1, 1), [move(1)])
+    assert not backend.compare_and_set("g", 0, snapshot(1, 9), [move(9)])
+    assert backend.version("g") == 1
+    data, events = backend.load("g")
+    assert data["game_state"]["total_turns"] == 1
+    assert [event["n"] for event in events] == [1]
+
+    assert backend.compare_and_set("g", 1, snapshot(2, 2), [move(2)])
+    assert backend.version("g") == 2
+    assert [event["n"] for event in backend.read_events("g", 1)] == [1, 2]
+
+
+class RacingRedis(FakeRedis):
+    """FakeRedis que ejecuta `race` justo después de leer la versión vigilada"""
+
+    def __init__(self):
+        super().__init__()
+        self.race = None
+
+    def hget(self, key, field):
+        value = super().hget(key, field)
+        if field == "version" and self.race is not None:
+            race, self.race = self.race, None
+            race()
+        return value
+
+
+def test_redis_two_workers_share_versions():
+    client = FakeRedis()
+    worker_a, worker_b = RedisBackend(client), RedisBackend(client)
+    assert worker_a.compare_and_set("g", 0, snapshot(1, 1), [move(1)])
+    # B no ha visto la escritura de A: su versión esperada ya no vale
+    assert not worker_b.compare_and_set("g", 0, snapshot(1, 1), [move(1)])
+    assert worker_b.version("g") == 1
+    assert worker_b.compare_and_set("g", 1, snapshot(2, 2), [move(2)])
+    assert [event["n"] for event in worker_a.read_events("g", 1)] == [1, 2]
+    assert list(worker_a.load_all())[0][0] == "g"
+
+
+def test_redis_write_between_watch_and_exec_is_a_conflict():
+    client = RacingRedis()
+    worker_a, worker_b = RedisBackend(client), RedisBackend(client)
+    results = []
+    # B confirma entre el WATCH/HGET de A y su EXEC: A lee versión 0, pero EXEC debe fallar
+    client.race = lambda: results.append(worker_b.compare_and_set("g", 0, snapshot(1, 5), [move(5)]))
+
+    assert not worker_a.compare_and_set("g", 0, snapshot(1, 1), [move(1)])
+    assert results == [True]
+    data, events = worker_a.load("g")
+    assert data["game_state"]["total_turns"] == 5
+    assert [event["n"] for event in events] == [5]
+
+
+def test_fake_pipeline_raises_watch_error():
+    client = FakeRedis()
+    pipe = client.pipeline()
+    pipe.watch("k")
+    pipe.multi()
+    pipe.hset("k", mapping={"version": 1})
+    client.hset("k", mapping={"version": 2})
+    with pytest.raises(WatchError):
+        pipe.execute()
+    assert client.hget("k", "version") == "2"
+
+
+def test_counters_are_incremented_not_overwritten(backend):
+    assert backend.load_counters() == {}
+    backend.increment_counters({"moves": 2, "duration_total": 1.5})
+    backend.increment_counters({"moves": 3, "wins_by_color:ROJO": 1})
+    assert backend.load_counters() == {"moves": 5, "duration_total": 1.5, "wins_by_color:ROJO": 1}
+
+
+def test_sqlite_workers_add_to_the_same_counters(tmp_path):
+    worker_a, worker_b = (create_backend("sqlite", tmp_path, tmp_path, sqlite_path=tmp_path / "g.sqlite3")
+                          for _ in range(2))
+    # Cada worker solo envía sus incrementos: ninguno pisa el total del otro
+    worker_a.increment_counters({"games_finished": 40})
+    worker_b.increment_counters({"games_finished": 36})
+    assert worker_a.load_counters() == {"games_finished": 76}
+    worker_a.close()
+    worker_b.close()
+
+
+def test_json_counters_read_the_legacy_nested_file(tmp_path):
+    (tmp_path / "global_stats.json").write_text(
+        '{"moves": 7, "wins_by_color": {"ROJO": 2}, "games_by_seat": [3, 0, 1]}', encoding="utf-8")
+    backend = create_backend("json", tmp_path / "states", tmp_path / "archive")
+    backend.increment_counters({"moves": 1})
+    assert backend.load_counters() == {"moves": 8, "wins_by_color:ROJO": 2,
+                                       "games_by_seat:0": 3, "games_by_seat:2": 1}
+
+
+def test_summaries_follow_snapshots_and_journal(backend):
+    assert backend.summaries() == {}
+    backend.write_snapshot("b", snapshot(1))
+    assert backend.compare_and_set("a", 0, snapshot(1, 1), [move(1)])
+    backend.append_events("a", [move(2), move(3)])
+    summaries = backend.summaries()
+    assert sorted(summaries) == ["a", "b"]
+    assert summaries["a"]["total_turns"] == 3 and summaries["a"]["version"] == 1
+    backend.delete("b")
+    assert sorted(backend.summaries()) == ["a"]
+
+
+def test_summaries_are_rebuilt_once_for_older_saves(backend, monkeypatch):
+    backend.write_snapshot("viejo", snapshot(2, 4))
+    backend.append_events("viejo", [move(5)])
+    # Guardado anterior a los resúmenes: se borra el suyo y se reconstruye al listar
+    if isinstance(backend, RedisBackend):
+        backend.client.hdel(backend._summaries_key(), "viejo")
+    elif backend.name == "sqlite":
+        backend._connect().execute("DELETE FROM summaries")
+    else:
+        backend.summary_path("viejo").unlink()
+    assert backend.summaries()["viejo"]["total_turns"] == 5
+    monkeypatch.setattr(backend, "load", lambda game_id: pytest.fail("el listado no debe leer snapshots"))
+    assert backend.summaries()["viejo"]["total_turns"] == 5
@@ -0,0 +1,36 @@
+"""Backend compartido: los clientes SSE ven los movimientos confirmados en otro worker"""
+import asyncio
+
+import app as server
+
+
+async def move_on_other_worker(api, players, game_id: str):
+    async with api() as client:
+        params = {"game_id": game_id}
+        response = await client.request("GET", "/api/game/start", params=params,
+                                        json={"players": players, "seed": 4, "dice_seed": 2})
+        assert response.status_code == 200
+        room = server.registry.rooms[game_id]
+        queue = server.broadcaster.subscribe(game_id)
+        generation = room.replay.generation
+        assert await server.backend_sync.run_once() == 0
+
+        # Otro worker carga la partida, mueve y confirma: aquí solo cambia la versión del backend
+        other = server.GameStateManager.load_room(game_id)
+        server.move_player(other, 3)
+        assert await server.persistence.commit(other)
+
+        assert await server.backend_sync.run_once() == 1
+        message = queue.get_nowait()
+        server.broadcaster.unsubscribe(game_id, queue)
+        return room, other, message, generation
+
+
+def test_subscribers_receive_moves_from_other_workers(shared, api, players):
+    room, other, message, generation = asyncio.run(move_on_other_worker(api, players, "compartida"))
+    assert message.startswith(b"event: sync\n")
+    assert room.version == other.version
+    assert list(room.game_state.positions) == list(other.game_state.positions)
+    # Los espectadores se despiertan con la repetición recargada
+    assert room.replay.generation != generation
+    assert room.replay.turns == 1
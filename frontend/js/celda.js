@@ -2,6 +2,25 @@
 // 🧱 celda.js — Renderizado del tablero con reglas (versión corregida)
 // =============================
 
+import { assetUrl } from './config.js';
+
+/**
+ * Capa de fondo que muestra el recorte [x, y, ancho, alto] del atlas del tablero.
+ * Se escala en porcentajes para ajustarse al tamaño real de la celda.
+ */
+function atlasSprite(atlas, sprite) {
+    const [x, y, w, h] = sprite;
+    const layer = document.createElement("div");
+    layer.style.position = "absolute";
+    layer.style.inset = "0";
+    layer.style.zIndex = "-1"; // ← Detrás del texto y avatar
+    layer.style.backgroundImage = `url("${assetUrl(atlas.url)}")`;
+    layer.style.backgroundRepeat = "no-repeat";
+    layer.style.backgroundSize = `${(atlas.width / w) * 100}% ${(atlas.height / h) * 100}%`;
+    layer.style.backgroundPosition = `${atlas.width === w ? 0 : (x / (atlas.width - w)) * 100}% ${atlas.height === h ? 0 : (y / (atlas.height - h)) * 100}%`;
+    return layer;
+}
+
 export function renderBoard(boardData, players, container) {
     if (!container) {
         console.error("❌ Contenedor del tablero no encontrado");
@@ -42,10 +61,12 @@ export function renderBoard(boardData, players, container) {
                 cellDiv.classList.add("especial");
             }
 
-            // Imagen de fondo (opcional)
-            if (cell.image) {
+            // Imagen de fondo: recorte del atlas (una sola descarga) o imagen suelta
+            if (boardData.atlas && cell.sprite) {
+                cellDiv.appendChild(atlasSprite(boardData.atlas, cell.sprite));
+            } else if (cell.image) {
                 const img = document.createElement("img");
-                img.src = cell.image;
+                img.src = assetUrl(cell.image);
                 img.alt = "";
                 img.style.width = "100%";
                 img.style.height = "100%";
@@ -0,0 +1,17 @@
+// =============================
+// ⚙️ config.js — Dirección del servidor
+// =============================
+
+// Si la página la sirve el propio backend se usan rutas relativas;
+// desde otro servidor de desarrollo (p. ej. Live Server) se apunta al backend local.
+export const SERVER_ORIGIN = window.location.port === "3000" ? "" : "http://localhost:3000";
+export const API_BASE = `${SERVER_ORIGIN}/api`;
+
+/**
+ * Convierte una ruta del servidor ("/assets/...") en una URL utilizable desde el frontend.
+ * @param {string} path - Ruta devuelta por la API
+ * @returns {string}
+ */
+export function assetUrl(path) {
+    return path && path.startsWith("/") ? `${SERVER_ORIGIN}${path}` : path;
+}
@@ -2,6 +2,8 @@
 // MÓDULO DE ARRANQUE - inicio.js
 // ==============================
 
+import { API_BASE } from './config.js';
+
 // Estado inicial de jugadores (solo colores)
 const jugadores = [
   { color: "ROJO", activo: true },
@@ -64,7 +66,7 @@ async function comenzarJuego() {
       avatar: `/img/${j.color}.png` // Opcional
     }));
 
-    const response = await fetch("http://localhost:3000/api/game/start", {
+    const response = await fetch(`${API_BASE}/game/start`, {
       method: "GET",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ players: playerData })
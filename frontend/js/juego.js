@@ -4,12 +4,13 @@
 
 import { renderPlayersList, renderPlayerAvatars } from './players.js';
 import { renderBoard } from './celda.js';
-
-const API_BASE = "http://localhost:3000/api";
+import { API_BASE } from './config.js';
 
 // Declarar variables globales (pero no asignarlas aún)
 let boardContainer, playersList, diceInput;
 let gameState = null;
+let assetManifest = null;  // Recursos con hash que publica /api/board
+let eventSource = null;
 
 // =============================
 // 📥 Cargar estado y renderizar
@@ -31,6 +32,10 @@ async function loadGameState() {
         if (!res.ok) throw new Error(`HTTP ${res.status}`);
         gameState = await res.json();
 
+        // El dado físico solo se acepta si el servidor lo permite; si no, tira el servidor
+        diceInput.disabled = !gameState.client_dice;
+        if (diceInput.disabled) diceInput.value = "";
+
         // Renderizar lista de jugadores
         renderPlayersList(
             gameState.players,
@@ -41,10 +46,11 @@ async function loadGameState() {
         // Cargar y renderizar tablero
         const boardRes = await fetch(`${API_BASE}/board`);
         const boardData = await boardRes.json();
+        assetManifest = boardData.assets || null;
         renderBoard(boardData, gameState.players, boardContainer);
 
         // Renderizar avatares en el tablero
-        renderPlayerAvatars(gameState.players, boardContainer);
+        renderPlayerAvatars(gameState.players, boardContainer, assetManifest);
         
     } catch (err) {
         console.error("Error al cargar el juego:", err);
@@ -62,9 +68,11 @@ async function movePlayerManual() {
         return;
     }
 
-    const steps = parseInt(diceInput.value);
-    if (isNaN(steps) || steps < 1 || steps > 6) {
-        alert("Ingresa un número entre 1 y 6.");
+    // Campo vacío: tira el servidor con el dado de la partida
+    const raw = diceInput.value.trim();
+    const steps = raw === "" ? null : parseInt(raw);
+    if (steps !== null && (isNaN(steps) || steps < 1 || steps > 6)) {
+        alert("Ingresa un número entre 1 y 6 o deja el campo vacío para tirar el dado.");
         return;
     }
 
@@ -72,7 +80,7 @@ async function movePlayerManual() {
         const res = await fetch(`${API_BASE}/game/move`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ steps })
+            body: JSON.stringify(steps === null ? {} : { steps })
         });
 
         if (!res.ok) {
@@ -83,22 +91,68 @@ async function movePlayerManual() {
         const result = await res.json();
         alert(result.message);
 
-        if (result.victory) {
-            alert(result.victory.message);
-        }
-
-        await loadGameState(); // Actualizar todo
+        // Se aplica ya; el eco que llega por SSE trae la misma versión y se ignora
+        applyMoveDelta(result);
     } catch (err) {
         console.error("Error al mover:", err);
         alert("⚠️ " + err.message);
     }
 }
 
+// =============================
+// 📡 Actualizaciones en tiempo real (SSE)
+// =============================
+function applyMoveDelta(delta) {
+    // Ya aplicado (respuesta del POST y su eco SSE llevan la misma versión)
+    if (gameState && delta.version <= gameState.version) return;
+
+    // Falta un cambio intermedio o el jugador no existe aquí: se pide el estado completo
+    if (!gameState || delta.version !== gameState.version + 1 || !gameState.players[delta.player_index]) {
+        loadGameState();
+        return;
+    }
+
+    // Solo cambia un jugador y los contadores: no hace falta pedir el estado completo
+    const player = gameState.players[delta.player_index];
+    player.position = delta.new_position;
+    player.stats = delta.stats;
+    gameState.current_player_index = delta.current_player_index;
+    gameState.total_turns = delta.total_turns;
+    gameState.ladders_climbed = delta.ladders_climbed;
+    gameState.snakes_found = delta.snakes_found;
+    gameState.version = delta.version;
+
+    if (delta.victory) {
+        alert(delta.victory.message);
+    }
+
+    renderPlayersList(gameState.players, gameState.current_player_index, playersList);
+    renderPlayerAvatars(gameState.players, boardContainer, assetManifest);
+}
+
+function subscribeToGameEvents() {
+    if (eventSource) eventSource.close();
+    eventSource = new EventSource(`${API_BASE}/game/events`);
+
+    eventSource.addEventListener("move", (e) => applyMoveDelta(JSON.parse(e.data)));
+
+    // Cambios estructurales: se recarga el estado (y el tablero si cambió)
+    // "sync": otro servidor cambió la partida (backend de estado compartido)
+    ["start", "add_player", "remove_player", "reset", "sync"].forEach(type => {
+        eventSource.addEventListener(type, () => loadGameState());
+    });
+
+    eventSource.onerror = () => {
+        console.warn("⚠️ Conexión SSE interrumpida, reintentando...");
+    };
+}
+
 // =============================
 // 🚀 Iniciar
 // =============================
 document.addEventListener("DOMContentLoaded", () => {
     loadGameState();
+    subscribeToGameEvents();
     
     // Añadir listener al botón después de que el DOM esté listo
     const moveButton = document.getElementById("moveButton");
@@ -2,6 +2,8 @@
 // 👥 players.js — Renderizado de jugadores y avatares
 // =============================
 
+import { assetUrl } from './config.js';
+
 /**
  * Renderiza la lista de jugadores en el panel lateral.
  * @param {Array} players - Lista de jugadores del estado del juego
@@ -36,12 +38,24 @@ export function renderPlayersList(players, currentPlayerIndex, container) {
     });
 }
 
+/**
+ * URL del avatar de un jugador: la versión con hash del manifiesto (caché inmutable) si existe.
+ * @param {Object} player - Jugador del estado del juego
+ * @param {Object} manifest - Nombre original -> URL con hash (campo "assets" de /api/board)
+ * @returns {string}
+ */
+function avatarUrl(player, manifest) {
+    const name = `Jugador${player.color}.png`;
+    return assetUrl((manifest && manifest[name]) || `/img/${name}`);
+}
+
 /**
  * Renderiza los avatares de los jugadores directamente en el tablero.
  * @param {Array} players - Lista de jugadores
  * @param {HTMLElement} boardContainer - Contenedor del tablero
+ * @param {Object} manifest - Manifiesto de recursos con hash (opcional)
  */
-export function renderPlayerAvatars(players, boardContainer) {
+export function renderPlayerAvatars(players, boardContainer, manifest) {
     if (!boardContainer || !players) return;
 
     // Primero, eliminar avatares anteriores
@@ -58,7 +72,7 @@ export function renderPlayerAvatars(players, boardContainer) {
         // Crear avatar
         const avatar = document.createElement("img");
         avatar.className = "player-avatar";
-        avatar.src = `http://localhost:3000/img/Jugador${player.color}.png`; // URL completa
+        avatar.src = avatarUrl(player, manifest);
         avatar.alt = player.name;
         avatar.title = `${player.name} - Posición ${player.position}`;
         